@@ -0,0 +1,56 @@
+import numpy as np
+import constants
+
+
+def candidate_scores(embeddings: np.ndarray, descriptions: list, indicators: set) -> np.ndarray:
+    """
+    Scores how likely each pair of tasks is to be related, without running a classifier.
+
+    The score is the cosine similarity of the two descriptions, plus a bonus when
+    either description contains an ordering keyword such as "after" or "before".
+
+    :param embeddings: Matrix of L2-normalized description embeddings, one row per task.
+    :param descriptions: List of task descriptions, aligned with embeddings.
+    :param indicators: Set of ordering keywords.
+    :return: Symmetric matrix of shape (n, n). The diagonal is -inf.
+    """
+    scores = embeddings @ embeddings.T
+
+    has_indicator = np.array(
+        [any(indicator in description.lower() for indicator in indicators) for description in descriptions],
+        dtype=np.float32,
+    )
+    scores += constants.PRUNING.KEYWORD_BONUS * np.maximum(has_indicator[:, None], has_indicator[None, :])
+
+    np.fill_diagonal(scores, -np.inf)
+    return scores
+
+
+def select_candidates(
+    embeddings: np.ndarray,
+    descriptions: list,
+    indicators: set,
+    top_k: int = constants.PRUNING.TOP_K,
+) -> set[tuple[int, int]]:
+    """
+    Keeps the top_k most likely partners of every task.
+
+    :param embeddings: Matrix of L2-normalized description embeddings, one row per task.
+    :param descriptions: List of task descriptions, aligned with embeddings.
+    :param indicators: Set of ordering keywords.
+    :param top_k: Number of candidates kept per task. None keeps every pair.
+    :return: Set of ordered (i, j) index pairs, containing both orderings of every kept pair.
+    """
+    n = len(descriptions)
+    if top_k is None or top_k >= n - 1:
+        return {(i, j) for i in range(n) for j in range(n) if i != j}
+
+    scores = candidate_scores(embeddings, descriptions, indicators)
+    nearest = np.argpartition(-scores, top_k, axis=1)[:, :top_k]
+
+    candidates = set()
+    for i, row in enumerate(nearest):
+        for j in row.tolist():
+            candidates.add((i, j))
+            candidates.add((j, i))
+    return candidates
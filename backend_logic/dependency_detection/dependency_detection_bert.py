@@ -1,197 +1,253 @@
-from transformers import pipeline
+import logging
+import constants
+from backend_logic.dependency_detection.model_registry import registry
+from backend_logic.dependency_detection.quantization import apply_backend, load_device
+from backend_logic.dependency_detection.nli_scoring import NLIScorer
+from backend_logic.dependency_detection.detect_dependencies import candidate_pairs
 
-# # Initialize the zero-shot classifier
-# classifier = pipeline("zero-shot-classification", model="cross-encoder/nli-roberta-base")
-classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+
+def _load_classifier():
+    from transformers import pipeline
+
+    # return pipeline("zero-shot-classification", model="cross-encoder/nli-roberta-base")
+    return apply_backend(pipeline("zero-shot-classification", model=constants.MODELS.NLI_MODEL, device=load_device()))
+
+
+# Zero-shot classifier, loaded on first use and shared with other requests
+registry.register(constants.MODELS.NLI_MODEL, _load_classifier)
+
+# Scores are cached per (premise, hypothesis) and shared between runs
+scorer = NLIScorer(constants.MODELS.NLI_MODEL)
+
+logger = logging.getLogger(__name__)
 
 # Specific Thresholds
 SPECIAL_THRESHOLD = 0.984
 SUPER_SPECIAL_THRESHOLD = 0.95
 
 
-print()
+def build_hypotheses(task_A, task_B) -> tuple[list[str], list[str], list[str], list[str]]:
+    """
+    Builds the candidate hypotheses scored for one ordered pair of tasks.
+
+    :return: Tuple of (A relying on B, B relying on A, all development tasks, all modules) hypotheses.
+    """
+
+    # hypotheses1 = [
+    #     f"{task_A} must be completed after {task_B}.",
+    #     f"{task_A} cannot start until {task_B} is finished.",
+    #     f"{task_A} is dependent on the completion of {task_B}.",
+    #     f"Finish {task_B} before starting {task_A}.",
+    #     f"{task_A} is blocked until {task_B} is completed.",
+    #     f"{task_A} follows {task_B} in the development sequence.",
+    #     f"{task_A} requires {task_B} to be finished first.",
+    #     f"Before beginning {task_A}, {task_B} must be completed.",
+    #     f"{task_A} is part of the pipeline and comes after {task_B}.",
+    #     f"{task_B} is a prerequisite for {task_A}.",
+    #     f"{task_A} is scheduled after {task_B} in the workflow.",
+    #     f"{task_A} cannot be tested until {task_B} is done."
+    # ]
+
+    # hypotheses2 = [
+    #     f"{task_B} must be completed before {task_A} starts.",
+    #     f"{task_B} is a prerequisite for {task_A}.",
+    #     f"{task_B} enables {task_A}.",
+    #     f"Complete {task_B} to unlock {task_A}.",
+    #     f"{task_B} is a required step before {task_A}.",
+    #     f"{task_A} follows {task_B} in the pipeline.",
+    #     f"{task_A} depends on the success of {task_B}.",
+    #     f"{task_A} relies on {task_B} being finalized.",
+    #     f"{task_B} ensures {task_A} can proceed.",
+    #     f"Before {task_A}, {task_B} must be fully implemented."
+    # ]
+
+    # all_developments = [
+    #     f"{task_A} must be completed after all development tasks are finished.",
+    #     f"Do not start {task_A} until all prior tasks are completed.",
+    #     f"{task_A} is the final step after all tasks are implemented.",
+    #     f"Before beginning {task_A}, ensure all tasks are finalized.",
+    #     f"{task_A} requires the entire development cycle to be completed first."
+    # ]
+
+    # all_modules = [
+    #     f"{task_A} depends on the successful completion of all modules.",
+    #     f"{task_A} cannot proceed until all modules are implemented.",
+    #     f"All modules must be completed before {task_A} starts.",
+    #     f"{task_A} follows the completion of all necessary modules.",
+    #     f"{task_A} is scheduled after all major components are integrated."
+    # ]
+
+
+    # Hypotheses for A relying on B
+    hypotheses1 = [
+        f"Start {task_A} after the {task_B} is finished.",
+        f"Work on {task_A} after completing the {task_B}.",
+        f"Ensure {task_A} is done after the {task_B} is finalized.",
+        f"Begin {task_A} only after the {task_B} is completed.",
+        f"Proceed with {task_A} after the {task_B} is functional.",
+        f"Implement {task_A} when the {task_B} is done.",
+        f"Execute {task_A} after finishing the {task_B}.",
+        f"Develop {task_A} after achieving {task_B}'s goals.",
+        f"Focus on {task_A} after wrapping up {task_B}.",
+        f"Ensure {task_A} starts after the completion of {task_B}.",
+        f"Finalize {task_A} only after completing the {task_B}.",
+        f"Launch {task_A} once the {task_B} is operational.",
+        f"Work on {task_A} after successfully completing the {task_B}.",
+        f"Wait until the {task_B} is finished before starting {task_A}.",
+        f"Postpone {task_A} until the {task_B} is ready.",
+        f"Do not begin {task_A} until the {task_B} is functional.",
+        f"Complete {task_A} following the {task_B}.",
+        f"Start {task_A} as soon as the {task_B} is done.",
+        f"Continue to {task_A} after completing the {task_B}.",
+        f"Only begin {task_A} once the {task_B} has been finalized.",
+        f"Begin {task_A} after resolving {task_B} requirements.",
+        f"Proceed with {task_A} once the {task_B} has been successfully completed.",
+        f"Postpone {task_A} until the {task_B} reaches completion.",
+        f"Ensure {task_A} follows the completion of the {task_B}.",
+        f"Execute {task_A} only after finishing the {task_B}.",
+        f"Start working on {task_A} only after {task_B} is finalized.",
+        f"Ensure {task_A} is dependent on the finalization of {task_B}.",
+        f"Delay {task_A} until the {task_B} is fully operational.",
+        f"Start {task_A} after confirming the success of the {task_B}.",
+        f"Ensure {task_A} begins when {task_B} has been completed.",
+        f"Allow {task_A} to commence once the {task_B} is finalized.",
+        f"Set {task_A} to follow after the successful execution of {task_B}.",
+        f"Ensure {task_A} starts only when the {task_B} goals are met.",
+        f"Postpone {task_A} to ensure {task_B} is completed first.",
+        f"Make sure {task_A} aligns with the completion of {task_B}.",
+        f"Plan {task_A} for after the {task_B} concludes.",
+        f"Start {task_A} following the resolution of {task_B}.",
+        f"Execute {task_A} only once the {task_B} is resolved.",
+        f"Ensure {task_A} is carried out after {task_B} is accomplished.",
+        f"Perform {task_A} after all {task_B} are completed.",
+        f"Complete {task_A} after all {task_B} tasks are finished.",
+        f"Perform {task_A} once all {task_B} tasks are completed.",
+        f"Do not start {task_A} until all {task_B} tasks are done."
+    ]
+
+    # Hypotheses for B relying on A
+    hypotheses2 = [
+        f"Complete {task_A} before starting the {task_B}.",
+        f"Work on {task_A} prior to {task_B}.",
+        f"Ensure {task_A} is done before the {task_B} can proceed.",
+        f"Start {task_A} earlier than the {task_B}.",
+        f"Finish {task_A} before {task_B} begins.",
+        f"Develop {task_A} as a prerequisite to {task_B}.",
+        f"Focus on {task_A} before considering the {task_B}.",
+        f"Complete {task_A} so the {task_B} can start.",
+        f"Implement {task_A} first, then proceed to {task_B}.",
+        f"Prioritize {task_A} to enable the {task_B}.",
+        f"Ensure {task_A} is finalized before starting the {task_B}.",
+        f"Begin {task_A} well before {task_B} can proceed.",
+        f"Prepare {task_A} as a necessary step for the {task_B}.",
+        f"Complete {task_A} to unlock progress on the {task_B}.",
+        f"Do not proceed with {task_B} until {task_A} is complete.",
+        f"Work on {task_A} as a requirement for {task_B}.",
+        f"Complete {task_A} ahead of the {task_B} schedule.",
+        f"Ensure {task_A} readiness before the {task_B} is initiated.",
+        f"Finalize {task_A} as a critical step preceding {task_B}.",
+        f"Wrap up {task_A} before {task_B} begins.",
+        f"Achieve completion of {task_A} to set up {task_B}.",
+        f"Make {task_A} the first priority to unblock {task_B}.",
+        f"Focus on finishing {task_A} so that {task_B} can start.",
+        f"Complete {task_A} to ensure a smooth start for {task_B}.",
+        f"Plan {task_A} to precede the {task_B}.",
+        f"Ensure {task_A} is the foundation for the {task_B}.",
+        f"Prepare {task_A} as a key enabler of {task_B}.",
+        f"Complete {task_A} as an essential condition for {task_B}.",
+        f"Work on {task_A} as a necessary precursor to {task_B}.",
+        f"Focus on completing {task_A} to support the {task_B}.",
+        f"Ensure {task_A} readiness well before {task_B} can begin.",
+        f"Achieve {task_A} milestones to unlock {task_B} progress.",
+        f"Ensure {task_A} is finalized ahead of the {task_B} deadline."
+    ]
+
+    all_developments = [
+        f"Perform {task_A} after all development tasks are completed."]
+        # f"Do not start {task_A} until all development tasks are done.",
+        # f"Ensure {task_A} is done after all other development tasks are completed."
+    # ]
+
+    all_modules = [
+        # f"{task_A} depends on the successful completion of all modules.",
+        f"Perform {task_A} after all modules are constructed."
+    ]
+
+    return hypotheses1, hypotheses2, all_developments, all_modules
+
+
+# Number of hypotheses build_hypotheses makes per pair of tasks
+HYPOTHESES_PER_PAIR = sum(len(hypotheses) for hypotheses in build_hypotheses("A", "B"))
 
 
 # Function to detect dependencies
-def detect_dependencies(tasks: dict, threshold: float=0.95, dependencies: dict=None) -> dict[str, str]:
+def detect_dependencies(tasks: dict, threshold: float=0.95, dependencies: dict=None, top_k: int=constants.PRUNING.TOP_K) -> dict[str, str]:
     """
     Detects dependencies between tasks based on sentence similarity.
 
     :param tasks: Dictionary where keys are task names and values are task descriptions.
     :param threshold: Similarity score threshold for determining dependencies.
+    :param dependencies: Dictionary mapping each task to dependencies that are already known.
+    :param top_k: Number of candidate partners sent to the classifier per task. None checks every pair.
     :return: Dictionary mapping each task to its detected dependencies.
     """
     
     if dependencies is None:
         dependencies = {task_id: [] for task_id in tasks.keys()}
 
-    for task_A, description_A in tasks.items():
-        for task_B, description_B in tasks.items():                
-            if (task_A in dependencies[task_B] or task_B in dependencies[task_A] or task_A == task_B):
-                continue
+    # Only pairs that pass the cheap embedding prefilter reach the classifier
+    task_list = list(tasks.keys())
+    candidates = {
+        (task_list[i], task_list[j]) for i, j in candidate_pairs(list(tasks.values()), top_k)
+    }
 
-            # hypotheses1 = [
-            #     f"{task_A} must be completed after {task_B}.",
-            #     f"{task_A} cannot start until {task_B} is finished.",
-            #     f"{task_A} is dependent on the completion of {task_B}.",
-            #     f"Finish {task_B} before starting {task_A}.",
-            #     f"{task_A} is blocked until {task_B} is completed.",
-            #     f"{task_A} follows {task_B} in the development sequence.",
-            #     f"{task_A} requires {task_B} to be finished first.",
-            #     f"Before beginning {task_A}, {task_B} must be completed.",
-            #     f"{task_A} is part of the pipeline and comes after {task_B}.",
-            #     f"{task_B} is a prerequisite for {task_A}.",
-            #     f"{task_A} is scheduled after {task_B} in the workflow.",
-            #     f"{task_A} cannot be tested until {task_B} is done."
-            # ]
-            
-            # hypotheses2 = [
-            #     f"{task_B} must be completed before {task_A} starts.",
-            #     f"{task_B} is a prerequisite for {task_A}.",
-            #     f"{task_B} enables {task_A}.",
-            #     f"Complete {task_B} to unlock {task_A}.",
-            #     f"{task_B} is a required step before {task_A}.",
-            #     f"{task_A} follows {task_B} in the pipeline.",
-            #     f"{task_A} depends on the success of {task_B}.",
-            #     f"{task_A} relies on {task_B} being finalized.",
-            #     f"{task_B} ensures {task_A} can proceed.",
-            #     f"Before {task_A}, {task_B} must be fully implemented."
-            # ]
-
-            # all_developments = [
-            #     f"{task_A} must be completed after all development tasks are finished.",
-            #     f"Do not start {task_A} until all prior tasks are completed.",
-            #     f"{task_A} is the final step after all tasks are implemented.",
-            #     f"Before beginning {task_A}, ensure all tasks are finalized.",
-            #     f"{task_A} requires the entire development cycle to be completed first."
-            # ]
-            
-            # all_modules = [
-            #     f"{task_A} depends on the successful completion of all modules.",
-            #     f"{task_A} cannot proceed until all modules are implemented.",
-            #     f"All modules must be completed before {task_A} starts.",
-            #     f"{task_A} follows the completion of all necessary modules.",
-            #     f"{task_A} is scheduled after all major components are integrated."
-            # ]
-
-
-            # Hypotheses for A relying on B        
-            hypotheses1 = [
-                f"Start {task_A} after the {task_B} is finished.",
-                f"Work on {task_A} after completing the {task_B}.",
-                f"Ensure {task_A} is done after the {task_B} is finalized.",
-                f"Begin {task_A} only after the {task_B} is completed.",
-                f"Proceed with {task_A} after the {task_B} is functional.",
-                f"Implement {task_A} when the {task_B} is done.",
-                f"Execute {task_A} after finishing the {task_B}.",
-                f"Develop {task_A} after achieving {task_B}'s goals.",
-                f"Focus on {task_A} after wrapping up {task_B}.",
-                f"Ensure {task_A} starts after the completion of {task_B}.",
-                f"Finalize {task_A} only after completing the {task_B}.",
-                f"Launch {task_A} once the {task_B} is operational.",
-                f"Work on {task_A} after successfully completing the {task_B}.",
-                f"Wait until the {task_B} is finished before starting {task_A}.",
-                f"Postpone {task_A} until the {task_B} is ready.",
-                f"Do not begin {task_A} until the {task_B} is functional.",
-                f"Complete {task_A} following the {task_B}.",
-                f"Start {task_A} as soon as the {task_B} is done.",
-                f"Continue to {task_A} after completing the {task_B}.",
-                f"Only begin {task_A} once the {task_B} has been finalized.",
-                f"Begin {task_A} after resolving {task_B} requirements.",
-                f"Proceed with {task_A} once the {task_B} has been successfully completed.",
-                f"Postpone {task_A} until the {task_B} reaches completion.",
-                f"Ensure {task_A} follows the completion of the {task_B}.",
-                f"Execute {task_A} only after finishing the {task_B}.",
-                f"Start working on {task_A} only after {task_B} is finalized.",
-                f"Ensure {task_A} is dependent on the finalization of {task_B}.",
-                f"Delay {task_A} until the {task_B} is fully operational.",
-                f"Start {task_A} after confirming the success of the {task_B}.",
-                f"Ensure {task_A} begins when {task_B} has been completed.",
-                f"Allow {task_A} to commence once the {task_B} is finalized.",
-                f"Set {task_A} to follow after the successful execution of {task_B}.",
-                f"Ensure {task_A} starts only when the {task_B} goals are met.",
-                f"Postpone {task_A} to ensure {task_B} is completed first.",
-                f"Make sure {task_A} aligns with the completion of {task_B}.",
-                f"Plan {task_A} for after the {task_B} concludes.",
-                f"Start {task_A} following the resolution of {task_B}.",
-                f"Execute {task_A} only once the {task_B} is resolved.",
-                f"Ensure {task_A} is carried out after {task_B} is accomplished.",
-                f"Perform {task_A} after all {task_B} are completed.",
-                f"Complete {task_A} after all {task_B} tasks are finished.",
-                f"Perform {task_A} once all {task_B} tasks are completed.",
-                f"Do not start {task_A} until all {task_B} tasks are done."
-            ]
-
-            # Hypotheses for B relying on A
-            hypotheses2 = [
-                f"Complete {task_A} before starting the {task_B}.",
-                f"Work on {task_A} prior to {task_B}.",
-                f"Ensure {task_A} is done before the {task_B} can proceed.",
-                f"Start {task_A} earlier than the {task_B}.",
-                f"Finish {task_A} before {task_B} begins.",
-                f"Develop {task_A} as a prerequisite to {task_B}.",
-                f"Focus on {task_A} before considering the {task_B}.",
-                f"Complete {task_A} so the {task_B} can start.",
-                f"Implement {task_A} first, then proceed to {task_B}.",
-                f"Prioritize {task_A} to enable the {task_B}.",
-                f"Ensure {task_A} is finalized before starting the {task_B}.",
-                f"Begin {task_A} well before {task_B} can proceed.",
-                f"Prepare {task_A} as a necessary step for the {task_B}.",
-                f"Complete {task_A} to unlock progress on the {task_B}.",
-                f"Do not proceed with {task_B} until {task_A} is complete.",
-                f"Work on {task_A} as a requirement for {task_B}.",
-                f"Complete {task_A} ahead of the {task_B} schedule.",
-                f"Ensure {task_A} readiness before the {task_B} is initiated.",
-                f"Finalize {task_A} as a critical step preceding {task_B}.",
-                f"Wrap up {task_A} before {task_B} begins.",
-                f"Achieve completion of {task_A} to set up {task_B}.",
-                f"Make {task_A} the first priority to unblock {task_B}.",
-                f"Focus on finishing {task_A} so that {task_B} can start.",
-                f"Complete {task_A} to ensure a smooth start for {task_B}.",
-                f"Plan {task_A} to precede the {task_B}.",
-                f"Ensure {task_A} is the foundation for the {task_B}.",
-                f"Prepare {task_A} as a key enabler of {task_B}.",
-                f"Complete {task_A} as an essential condition for {task_B}.",
-                f"Work on {task_A} as a necessary precursor to {task_B}.",
-                f"Focus on completing {task_A} to support the {task_B}.",
-                f"Ensure {task_A} readiness well before {task_B} can begin.",
-                f"Achieve {task_A} milestones to unlock {task_B} progress.",
-                f"Ensure {task_A} is finalized ahead of the {task_B} deadline."
-            ]
-            
-            all_developments = [
-                f"Perform {task_A} after all development tasks are completed."]
-                # f"Do not start {task_A} until all development tasks are done.",
-                # f"Ensure {task_A} is done after all other development tasks are completed."
-            # ]
-            
-            all_modules = [
-                # f"{task_A} depends on the successful completion of all modules.",
-                f"Perform {task_A} after all modules are constructed."
-            ]
+    ordered = [(task_A, task_B) for task_A in tasks.keys() for task_B in tasks.keys() if (task_A, task_B) in candidates]
+    scorer.score([(task_id, label) for task_id in tasks.keys() for label in ("development", "module")])
+
+    # Candidate pairs pre-scored per batched pass. A chunk fills at most half the cache,
+    # so its scores are still cached when the loop below reads them
+    chunk_size = max(scorer.cache_size // (2 * HYPOTHESES_PER_PAIR), 1)
+
+    # Tasks whose special case already added their dependencies
+    finished = set()
+
+    for start in range(0, len(ordered), chunk_size):
+        chunk = ordered[start : start + chunk_size]
+        scorer.score([
+            (tasks[task_A], hypothesis)
+            for task_A, task_B in chunk
+            for hypotheses in build_hypotheses(task_A, task_B)
+            for hypothesis in hypotheses
+        ])
+
+        for task_A, task_B in chunk:
+            description_A = tasks[task_A]
+            if (task_A in finished or task_A in dependencies[task_B] or task_B in dependencies[task_A]):
+                continue
 
+            hypotheses1, hypotheses2, all_developments, all_modules = build_hypotheses(task_A, task_B)
 
             # Result of A relying on B
-            result1 = classifier(
+            result1 = scorer.classify(
                 description_A,
                 candidate_labels=hypotheses1,
                 multi_label=True
             )
             
             # Result of B relying on A
-            result2 = classifier(
+            result2 = scorer.classify(
                 description_A,
                 candidate_labels=hypotheses2,
                 multi_label=True
             )
             
-            all_dev_results = classifier(
+            all_dev_results = scorer.classify(
                 description_A,
                 candidate_labels=all_developments,
                 multi_label=False
             )
             
-            all_mod_results = classifier(
+            all_mod_results = scorer.classify(
                 description_A,
                 candidate_labels=all_modules,
                 multi_label=False
@@ -207,11 +263,14 @@ def detect_dependencies(tasks: dict, threshold: float=0.95, dependencies: dict=N
             appliedResultAllTasks = max(appliedResult_all_dev, appliedResult_all_mod)
             dev_task = True if (appliedResultAllTasks == appliedResult_all_dev) else False
 
-            # Print the dependency being tested along with the max score and the hypotheses that the score was achieved with
-            print(f"Testing dependency: {task_A} -> {task_B}")
-            print(f"Max score for {task_A} depending on {task_B}: {appliedResult1} with hypothesis: {result1['labels'][0]}")
-            print(f"Max score for {task_B} depending on {task_A}: {appliedResult2} with hypothesis: {result2['labels'][0]}")
-            print(f"Max score for {task_A} depending on all {"development tasks" if dev_task else "modules"} : {appliedResultAllTasks} with hypothesis: {all_dev_results['labels'][0] if dev_task else all_mod_results['labels'][0]}")
+            # Log the dependency being tested along with the max score and the hypotheses that the score was achieved with
+            if logger.isEnabledFor(logging.DEBUG):
+                kind = "development tasks" if dev_task else "modules"
+                all_label = all_dev_results['labels'][0] if dev_task else all_mod_results['labels'][0]
+                logger.debug("Testing dependency: %s -> %s", task_A, task_B)
+                logger.debug("Max score for %s depending on %s: %s with hypothesis: %s", task_A, task_B, appliedResult1, result1['labels'][0])
+                logger.debug("Max score for %s depending on %s: %s with hypothesis: %s", task_B, task_A, appliedResult2, result2['labels'][0])
+                logger.debug("Max score for %s depending on all %s: %s with hypothesis: %s", task_A, kind, appliedResultAllTasks, all_label)
             
             # Standard dependencies
             if appliedResult1 > appliedResult2 and appliedResult1 > threshold:
@@ -225,17 +284,16 @@ def detect_dependencies(tasks: dict, threshold: float=0.95, dependencies: dict=N
             if appliedResultAllTasks > SPECIAL_THRESHOLD:
                 for potential_task_id in tasks.keys():
 
-                    score = classifier(potential_task_id, candidate_labels=("development" if dev_task else "module"), multi_label=True)['scores'][0]
-                    print(f"Testing special case dependency: {task_A} -> {potential_task_id}")
-                    print(f"Max score for {potential_task_id} being a {"development" if dev_task else "module"} : {score}\n")
+                    score = scorer.classify(potential_task_id, candidate_labels=("development" if dev_task else "module"), multi_label=True)['scores'][0]
+                    logger.debug("Testing special case dependency: %s -> %s", task_A, potential_task_id)
+                    logger.debug("Max score for %s being a %s: %s", potential_task_id, "development" if dev_task else "module", score)
 
                     if potential_task_id != task_A and score > SUPER_SPECIAL_THRESHOLD:
                     # if potential_task_id != task_A and ("development" in potential_task_id.lower() or "module" in potential_task_id.lower()):
                         dependencies[task_A].append(potential_task_id)
                         skip = True
 
-            print()
             if (skip):
-                break
+                finished.add(task_A)
 
     return dependencies
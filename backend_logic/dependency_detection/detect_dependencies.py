@@ -1,13 +1,43 @@
-from sentence_transformers import SentenceTransformer, util
-from transformers import pipeline
+import logging
+import threading
+from typing import Callable
+from collections import OrderedDict
+import numpy as np
 import constants
+from backend_logic.dependency_detection.candidate_pruning import select_candidates
+from backend_logic.dependency_detection.embedding_store import EmbeddingStore
+from backend_logic.dependency_detection.graph_postprocessing import postprocess_dependencies
+from backend_logic.dependency_detection.inference_pool import get_pool
+from backend_logic.dependency_detection.model_registry import registry
+from backend_logic.dependency_detection.quantization import apply_backend, backend_model_name, load_device
 
-# Load primary sentence transformer model for similarity detection
-similarity_model = SentenceTransformer("sentence-transformers/all-mpnet-base-v2")
+logger = logging.getLogger(__name__)
 
-# Load secondary model for dependency classification (text classification)
-dependency_classifier = pipeline("zero-shot-classification", model="distilbert-base-uncased")
-# dependency_classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+
+def _load_similarity_model():
+    from sentence_transformers import SentenceTransformer
+
+    return apply_backend(SentenceTransformer(constants.MODELS.SIMILARITY_MODEL, device=load_device()))
+
+
+def _load_dependency_classifier():
+    from transformers import pipeline
+
+    # return pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+    return apply_backend(pipeline("zero-shot-classification", model=constants.MODELS.DEPENDENCY_CLASSIFIER_MODEL, device=load_device()))
+
+
+# Primary sentence transformer model for similarity detection, loaded on first use
+registry.register(constants.MODELS.SIMILARITY_MODEL, _load_similarity_model)
+
+# Secondary model for dependency classification (text classification), loaded on first use
+registry.register(constants.MODELS.DEPENDENCY_CLASSIFIER_MODEL, _load_dependency_classifier)
+
+# Embeddings persist across runs, so only new or edited text is encoded. Pair hypotheses far outnumber
+# descriptions, so they are kept in a store of their own where they never evict description embeddings
+_embedding_store = None
+_hypothesis_store = None
+_embedding_store_lock = threading.Lock()
 
 # Dependency Indicators
 A_TO_B_INDICATORS = {"after", "once", "following", "subsequent", "then"}
@@ -16,92 +46,333 @@ B_TO_A_INDICATORS = {"before", "prior", "previous", "preceding", "earlier"}
 # Labels for dependency classification
 DEPENDENCY_LABELS = ["dependency", "independent", "sequence", "requirement"]
 
-# Function to detect dependencies
-def detect_dependencies(tasks: dict, dependencies: dict = None) -> dict:
+# Number of texts embedded per forward pass
+ENCODE_BATCH_SIZE = 64
+
+# Number of pair hypotheses embedded between progress reports
+PROGRESS_CHUNK_SIZE = 1024
+
+# Classifier results are reused across runs, keyed by description
+CLASSIFICATION_CACHE_SIZE = 10000
+_classification_cache: OrderedDict[str, bool] = OrderedDict()
+_classification_lock = threading.Lock()
+
+def _open_store(path: str, capacity: int) -> EmbeddingStore:
+    similarity_model = registry.get(constants.MODELS.SIMILARITY_MODEL)
+    return EmbeddingStore(
+        backend_model_name(constants.MODELS.SIMILARITY_MODEL),
+        similarity_model.get_sentence_embedding_dimension(),
+        path,
+        capacity,
+    )
+
+
+def get_embedding_store() -> EmbeddingStore:
+    """Returns the shared store of description embeddings, opening it on first use."""
+    global _embedding_store
+
+    with _embedding_store_lock:
+        if _embedding_store is None:
+            _embedding_store = _open_store(constants.EMBEDDINGS.CACHE_DIR, constants.EMBEDDINGS.CAPACITY)
+
+    return _embedding_store
+
+
+def get_hypothesis_store() -> EmbeddingStore:
+    """Returns the shared store of pair hypothesis embeddings, opening it on first use."""
+    global _hypothesis_store
+
+    with _embedding_store_lock:
+        if _hypothesis_store is None:
+            _hypothesis_store = _open_store(
+                constants.EMBEDDINGS.HYPOTHESIS_CACHE_DIR, constants.EMBEDDINGS.HYPOTHESIS_CAPACITY
+            )
+
+    return _hypothesis_store
+
+
+def _flush_stores():
+    get_embedding_store().flush()
+    get_hypothesis_store().flush()
+
+
+def _encode(texts: list) -> np.ndarray:
+    similarity_model = registry.get(constants.MODELS.SIMILARITY_MODEL)
+    return similarity_model.encode(
+        texts,
+        batch_size=ENCODE_BATCH_SIZE,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+    )
+
+
+def encode_descriptions(descriptions: list) -> np.ndarray:
+    """
+    Encodes a list of texts, embedding only those missing from the embedding store in a single batched call.
+
+    :param descriptions: List of strings to embed.
+    :return: Matrix of shape (len(descriptions), dim) with L2-normalized rows.
+    """
+    pool = get_pool()
+    return get_embedding_store().encode(descriptions, pool.encode if pool else _encode)
+
+
+def encode_hypotheses(hypotheses: list) -> np.ndarray:
+    """
+    Encodes pair hypotheses like encode_descriptions, through the hypothesis store.
+
+    :param hypotheses: List of strings to embed.
+    :return: Matrix of shape (len(hypotheses), dim) with L2-normalized rows.
+    """
+    pool = get_pool()
+    return get_hypothesis_store().encode(hypotheses, pool.encode if pool else _encode)
+
+
+def classify_descriptions(descriptions: list) -> dict:
+    """
+    Runs the dependency classifier once per unique description, reusing results from earlier runs.
+
+    :param descriptions: List of task descriptions.
+    :return: Dictionary mapping each description to whether it reads as a dependency.
+    """
+    unique = list(dict.fromkeys(descriptions))
+    classified = {}
+
+    with _classification_lock:
+        for description in unique:
+            if description in _classification_cache:
+                _classification_cache.move_to_end(description)
+                classified[description] = _classification_cache[description]
+
+    missing = [description for description in unique if description not in classified]
+
+    if missing:
+        dependency_classifier = registry.get(constants.MODELS.DEPENDENCY_CLASSIFIER_MODEL)
+        results = dependency_classifier(missing, candidate_labels=DEPENDENCY_LABELS, multi_label=True)
+        if isinstance(results, dict):
+            results = [results]
+
+        with _classification_lock:
+            for description, result in zip(missing, results):
+                classified[description] = result["scores"][0] > constants.THRESHOLDS.WEAK_THRESHOLD
+                _classification_cache[description] = classified[description]
+
+            while len(_classification_cache) > CLASSIFICATION_CACHE_SIZE:
+                _classification_cache.popitem(last=False)
+
+    return classified
+
+
+def pair_similarities(
+    task_list: list,
+    descriptions: list,
+    pairs: list,
+    names: dict = None,
+    progress: Callable[[int, int], None] = None,
+) -> np.ndarray:
+    """
+    Scores ordered task pairs against their dependency hypotheses.
+
+    Entry k is the cosine similarity between the description of task i and
+    "Complete {task i} before completing {task j}." for (i, j) = pairs[k].
+
+    :param task_list: List of task IDs.
+    :param descriptions: List of task descriptions, aligned with task_list.
+    :param pairs: List of (i, j) index pairs into task_list.
+    :param names: Optional dictionary mapping task IDs to the names used in hypotheses.
+    :param progress: Optional callback called with (pairs scored, total pairs) as scoring advances.
+    :return: Array of similarities aligned with pairs.
+    """
+    scores = np.zeros(len(pairs), dtype=np.float32)
+    if not pairs:
+        return scores
+
+    names = names or {}
+    labels = [names.get(task, task) for task in task_list]
+    description_embeddings = encode_descriptions(descriptions)
+
+    for start in range(0, len(pairs), PROGRESS_CHUNK_SIZE):
+        chunk = pairs[start : start + PROGRESS_CHUNK_SIZE]
+        rows = np.asarray([i for i, _ in chunk])
+        hypotheses = [f"Complete {labels[i]} before completing {labels[j]}." for i, j in chunk]
+        hypothesis_embeddings = encode_hypotheses(hypotheses)
+
+        # Rows are normalized, so the row-wise dot product is the cosine similarity
+        scores[start : start + len(chunk)] = np.einsum(
+            "ij,ij->i", description_embeddings[rows], hypothesis_embeddings
+        )
+
+        if progress:
+            progress(start + len(chunk), len(pairs))
+
+    return scores
+
+
+def _apply_pair(
+    dependencies: dict,
+    task_A,
+    task_B,
+    description_A: str,
+    description_B: str,
+    similarity_A_B: float,
+    similarity_B_A: float,
+    is_dependency_A_B: bool,
+    is_dependency_B_A: bool,
+):
+    """Adds the dependency implied by one ordered pair of tasks, if any."""
+    # Check for strong dependencies
+    if similarity_A_B > similarity_B_A and similarity_A_B >= constants.THRESHOLDS.STRONG_THRESHOLD:
+        dependencies[task_A].add(task_B)
+        logger.debug("Strong dependency: %s → %s (similarity %.4f)", task_A, task_B, similarity_A_B)
+    elif similarity_B_A > similarity_A_B and similarity_B_A >= constants.THRESHOLDS.STRONG_THRESHOLD:
+        dependencies[task_B].add(task_A)
+        logger.debug("Strong dependency: %s → %s (similarity %.4f)", task_B, task_A, similarity_B_A)
+    # Check for weak dependencies using both indicators and secondary model verification
+    elif (
+        similarity_A_B > similarity_B_A and similarity_A_B >= constants.THRESHOLDS.WEAK_THRESHOLD and 
+        any(ind in description_A.lower() for ind in A_TO_B_INDICATORS) and is_dependency_A_B
+    ):
+        dependencies[task_A].add(task_B)
+        logger.debug("Weak dependency: %s → %s (similarity %.4f)", task_A, task_B, similarity_A_B)
+    elif (
+        similarity_B_A > similarity_A_B and similarity_B_A >= constants.THRESHOLDS.WEAK_THRESHOLD and 
+        any(ind in description_B.lower() for ind in B_TO_A_INDICATORS) and is_dependency_B_A
+    ):
+        dependencies[task_B].add(task_A)
+        logger.debug("Weak dependency: %s → %s (similarity %.4f)", task_B, task_A, similarity_B_A)
+    else:
+        logger.debug("No dependency: %s → %s (similarity %.4f)", task_A, task_B, similarity_A_B)
+
+
+def candidate_pairs(descriptions: list, top_k: int = constants.PRUNING.TOP_K) -> list[tuple[int, int]]:
+    """
+    Returns the ordered index pairs worth scoring, keeping the top_k most likely partners of every task.
+
+    :param descriptions: List of task descriptions.
+    :param top_k: Number of candidates kept per task. None keeps every pair.
+    :return: Sorted list of (i, j) index pairs, containing both orderings of every kept pair.
+    """
+    embeddings = encode_descriptions(descriptions) if top_k is not None else None
+    return sorted(
+        select_candidates(embeddings, descriptions, A_TO_B_INDICATORS | B_TO_A_INDICATORS, top_k)
+    )
+
+
+def detect_raw_dependencies(
+    tasks: dict,
+    dependencies: dict = None,
+    names: dict = None,
+    top_k: int = constants.PRUNING.TOP_K,
+    progress: Callable[[int, int], None] = None,
+) -> dict:
+    """
+    Scores every candidate pair and returns the edges the models found, before cycles are broken and transitive edges removed.
+    Takes the same arguments as detect_dependencies.
+
+    :return: Dictionary where keys are task IDs and values are sets of dependency task IDs.
+    """
+    if dependencies is None:
+        dependencies = {task_id: set() for task_id in tasks.keys()}  # Use sets to avoid duplicate dependencies
+
+    task_list = list(tasks.keys())
+    descriptions = list(tasks.values())
+
+    pairs = candidate_pairs(descriptions, top_k)
+    similarities = dict(zip(pairs, pair_similarities(task_list, descriptions, pairs, names, progress).tolist()))
+    is_dependency = classify_descriptions(descriptions)
+
+    for i, j in pairs:
+        _apply_pair(
+            dependencies,
+            task_list[i],
+            task_list[j],
+            descriptions[i],
+            descriptions[j],
+            similarities[(i, j)],
+            similarities[(j, i)],
+            is_dependency[descriptions[i]],
+            is_dependency[descriptions[j]],
+        )
+
+    _flush_stores()
+
+    return dependencies
+
+
+def detect_dependencies(
+    tasks: dict,
+    dependencies: dict = None,
+    names: dict = None,
+    top_k: int = constants.PRUNING.TOP_K,
+    progress: Callable[[int, int], None] = None,
+) -> dict:
     """
     Detects dependencies between tasks based on their descriptions using similarity and text classification models.
+
+    Every description and hypothesis is embedded once in a batched call, and the
+    classifier runs once per task rather than once per pair. Only the top_k most
+    similar partners of each task are scored.
     
     :param tasks: Dictionary where keys are task IDs and values are task descriptions.
     :param dependencies: Dictionary where keys are task IDs and values are lists of dependent task IDs.
+    :param names: Optional dictionary mapping task IDs to the names used in hypotheses. Defaults to the IDs themselves.
+    :param top_k: Number of candidate partners scored per task. None scores every pair.
+    :param progress: Optional callback called with (pairs scored, total pairs) as scoring advances. Exceptions it raises abort detection.
     :return: Dictionary where keys are task IDs and values are lists of dependent task IDs.
     """
-    
-    if dependencies is None:
-        dependencies = {task_id: set() for task_id in tasks.keys()}  # Use sets to avoid duplicate dependencies
+    return postprocess_dependencies(detect_raw_dependencies(tasks, dependencies, names, top_k, progress))
+
+
+def detect_task_dependencies(
+    task_id,
+    tasks: dict,
+    detected: dict = None,
+    names: dict = None,
+    top_k: int = constants.PRUNING.TOP_K,
+) -> tuple[dict, dict]:
+    """
+    Re-scores only the pairs involving one new or edited task and merges the result into an existing dependency graph.
+
+    Edges touching the task are dropped and re-detected against every other task in
+    the project, so the model work is linear in the number of tasks. The merge happens
+    on the unreduced graph and the whole graph is reduced afterwards, so an edge that was
+    only implied through the task, such as A → C in A → B → C, comes back if B's edges go.
+
+    :param task_id: ID of the task that was created or updated. Must be a key of tasks.
+    :param tasks: Dictionary where keys are task IDs and values are task descriptions.
+    :param detected: Existing unreduced graph, as returned by detect_raw_dependencies or by an earlier call.
+    :param names: Optional dictionary mapping task IDs to the names used in hypotheses. Defaults to the IDs themselves.
+    :param top_k: Number of candidate partners scored for the task. None scores every pair.
+    :return: The merged unreduced graph, to pass to the next call, and the reduced graph, as returned by detect_dependencies.
+    """
+    detected = detected or {}
+    merged = {
+        task: {dep for dep in detected.get(task, ()) if dep in tasks and dep != task_id}
+        for task in tasks.keys()
+    }
+    merged[task_id] = set()
 
     task_list = list(tasks.keys())
     descriptions = list(tasks.values())
+    t = task_list.index(task_id)
+
+    pairs = [pair for pair in candidate_pairs(descriptions, top_k) if t in pair]
+    similarities = dict(zip(pairs, pair_similarities(task_list, descriptions, pairs, names).tolist()))
+    is_dependency = classify_descriptions(descriptions)
+
+    for i, j in pairs:
+        _apply_pair(
+            merged,
+            task_list[i],
+            task_list[j],
+            descriptions[i],
+            descriptions[j],
+            similarities[(i, j)],
+            similarities[(j, i)],
+            is_dependency[descriptions[i]],
+            is_dependency[descriptions[j]],
+        )
+
+    _flush_stores()
 
-    for i, task_A in enumerate(task_list):
-        for j, task_B in enumerate(task_list):
-            if task_A == task_B:
-                continue
-
-            # Define hypotheses for dependency detection in both directions
-            hypothesis_A_B = f"Complete {task_A} before completing {task_B}."
-            hypothesis_B_A = f"Complete {task_B} before completing {task_A}."
-
-            # Compute similarity scores in both directions
-            similarity_A_B = util.pytorch_cos_sim(
-                similarity_model.encode(descriptions[i], convert_to_tensor=True),
-                similarity_model.encode(hypothesis_A_B, convert_to_tensor=True)
-            ).item()
-
-            similarity_B_A = util.pytorch_cos_sim(
-                similarity_model.encode(descriptions[j], convert_to_tensor=True),
-                similarity_model.encode(hypothesis_B_A, convert_to_tensor=True)
-            ).item()
-
-            # Verify dependency classification using the secondary model
-            dependency_check_A_B = dependency_classifier(descriptions[i], candidate_labels=DEPENDENCY_LABELS, multi_label=True)
-            dependency_check_B_A = dependency_classifier(descriptions[j], candidate_labels=DEPENDENCY_LABELS, multi_label=True)
-
-            # Extract confidence scores
-            is_dependency_A_B = dependency_check_A_B["scores"][0] > constants.WEAK_THRESHOLD  # Confidence threshold
-            is_dependency_B_A = dependency_check_B_A["scores"][0] > constants.WEAK_THRESHOLD  # Confidence threshold
-
-            # Check for strong dependencies
-            if similarity_A_B > similarity_B_A and similarity_A_B >= constants.STRONG_THRESHOLD:
-                dependencies[task_A].add(task_B)
-                print(f"✅ Strong Dependency: {task_A} → {task_B} (Similarity: {similarity_A_B:.4f})")
-            elif similarity_B_A > similarity_A_B and similarity_B_A >= constants.STRONG_THRESHOLD:
-                dependencies[task_B].add(task_A)
-                print(f"✅ Strong Dependency: {task_B} → {task_A} (Similarity: {similarity_B_A:.4f})")
-            # Check for weak dependencies using both indicators and secondary model verification
-            elif (
-                similarity_A_B > similarity_B_A and similarity_A_B >= constants.WEAK_THRESHOLD and 
-                any(ind in descriptions[i].lower() for ind in A_TO_B_INDICATORS) and is_dependency_A_B
-            ):
-                dependencies[task_A].add(task_B)
-                print(f"⚠️ Weak Dependency: {task_A} → {task_B} (Similarity: {similarity_A_B:.4f})")
-            elif (
-                similarity_B_A > similarity_A_B and similarity_B_A >= constants.WEAK_THRESHOLD and 
-                any(ind in descriptions[j].lower() for ind in B_TO_A_INDICATORS) and is_dependency_B_A
-            ):
-                dependencies[task_B].add(task_A)
-                print(f"⚠️ Weak Dependency: {task_B} → {task_A} (Similarity: {similarity_B_A:.4f})")
-            else:
-                print(f"❌ No dependency: {task_A} → {task_B} (Similarity: {similarity_A_B:.4f})")
-
-    # Remove indirect dependencies (transitive reduction)
-    for task in list(dependencies.keys()):
-        direct_deps = dependencies[task].copy()
-        for dep in direct_deps:
-            if dep in dependencies:
-                dependencies[task] -= dependencies[dep]  # Remove transitive dependencies
-                
-                # Organize dependencies so that tasks with no dependencies are listed first
-                sorted_tasks = sorted(dependencies.keys(), key=lambda task: len(dependencies[task]))
-                organized_dependencies = {task: dependencies[task] for task in sorted_tasks}
-                dependencies.clear()
-                dependencies.update(organized_dependencies)
-                
-                # Ensure that tasks with dependencies are listed after their dependencies
-                for task in list(dependencies.keys()):
-                    for dep in dependencies[task]:
-                        if dep in dependencies and task in dependencies[dep]:
-                            dependencies[dep].remove(task)
-                            dependencies[task].add(dep)
-
-    # Convert sets back to lists for consistency
-    return {task: list(deps) for task, deps in dependencies.items()}
\ No newline at end of file
+    return merged, postprocess_dependencies(merged)
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+import numpy as np
+import constants
+
+
+class EmbeddingStore:
+    """
+    On-disk cache of sentence embeddings keyed by (model name, hash of the text).
+
+    Vectors live in a memory-mapped float32 matrix with one row per slot, and a JSON
+    index maps each key to its slot in least-recently-used order. Once the store is
+    full, the least recently used slot is overwritten.
+
+    Attributes:
+        model_name (str): Name of the model the embeddings were produced with.
+        dim (int): Size of each embedding vector.
+        capacity (int): Maximum number of embeddings kept on disk.
+        hits (int): Number of texts served from the store.
+        misses (int): Number of texts that had to be encoded.
+        evictions (int): Number of embeddings dropped to make room for new ones.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        dim: int,
+        path: str = constants.EMBEDDINGS.CACHE_DIR,
+        capacity: int = constants.EMBEDDINGS.CAPACITY,
+    ):
+        self.model_name = model_name
+        self.dim = dim
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(path, exist_ok=True)
+        slug = model_name.replace("/", "__")
+        self._matrix_path = os.path.join(path, f"{slug}.f32")
+        self._index_path = os.path.join(path, f"{slug}.index.json")
+
+        self._lock = threading.Lock()
+        self._index: OrderedDict[str, int] = OrderedDict()
+        self._free_slots: list[int] = []
+        self._load()
+
+    def _load(self):
+        """Open the matrix file and index, starting fresh if either is missing or stale."""
+        index = None
+        if os.path.exists(self._index_path) and os.path.exists(self._matrix_path):
+            with open(self._index_path, "r") as file:
+                index = json.load(file)
+
+            if (
+                index.get("model") != self.model_name
+                or index.get("dim") != self.dim
+                or index.get("capacity") != self.capacity
+            ):
+                index = None
+
+        self._matrix = np.memmap(
+            self._matrix_path,
+            dtype=np.float32,
+            mode="r+" if index else "w+",
+            shape=(self.capacity, self.dim),
+        )
+
+        if index:
+            self._index = OrderedDict((key, slot) for key, slot in index["slots"])
+
+        used = set(self._index.values())
+        self._free_slots = [slot for slot in range(self.capacity - 1, -1, -1) if slot not in used]
+
+    def key(self, text: str) -> str:
+        """Return the cache key for a text under this store's model."""
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _allocate(self) -> int:
+        """Return a free slot, evicting the least recently used entry if needed."""
+        if self._free_slots:
+            return self._free_slots.pop()
+
+        _, slot = self._index.popitem(last=False)
+        self.evictions += 1
+        return slot
+
+    def encode(self, texts: list, encoder: Callable[[list], np.ndarray]) -> np.ndarray:
+        """
+        Return embeddings for texts, only encoding the ones that are not already stored.
+
+        :param texts: List of strings to embed.
+        :param encoder: Function that embeds a list of strings into a (len, dim) matrix.
+        :return: Matrix of shape (len(texts), dim), aligned with texts.
+        """
+        embeddings = np.empty((len(texts), self.dim), dtype=np.float32)
+        missing: OrderedDict[str, list[int]] = OrderedDict()
+
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = self.key(text)
+                slot = self._index.get(key)
+                if slot is None:
+                    missing.setdefault(text, []).append(i)
+                    continue
+
+                self._index.move_to_end(key)
+                embeddings[i] = self._matrix[slot]
+                self.hits += 1
+
+        if not missing:
+            return embeddings
+
+        encoded = np.asarray(encoder(list(missing.keys())), dtype=np.float32)
+
+        with self._lock:
+            self.misses += sum(len(positions) for positions in missing.values())
+            for vector, (text, positions) in zip(encoded, missing.items()):
+                embeddings[positions] = vector
+
+                key = self.key(text)
+                slot = self._index.get(key)
+                if slot is None:
+                    slot = self._allocate()
+                self._matrix[slot] = vector
+                self._index[key] = slot
+                self._index.move_to_end(key)
+
+        return embeddings
+
+    def flush(self):
+        """Write the matrix and index to disk."""
+        with self._lock:
+            self._matrix.flush()
+            index = {
+                "model": self.model_name,
+                "dim": self.dim,
+                "capacity": self.capacity,
+                "slots": list(self._index.items()),
+            }
+
+            temp_path = self._index_path + ".tmp"
+            with open(temp_path, "w") as file:
+                json.dump(index, file)
+            os.replace(temp_path, self._index_path)
+
+    def stats(self) -> dict:
+        """Return the size of the store and its hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model_name,
+                "size": len(self._index),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
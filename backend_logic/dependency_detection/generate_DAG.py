@@ -1,8 +1,11 @@
+import logging
 import os
 import networkx as nx
 import matplotlib.pyplot as plt
 import constants
 
+logger = logging.getLogger(__name__)
+
 
 def generate_DAG(dependencies: dict, title="dag.png", durations: dict = None):
     """
@@ -76,4 +79,4 @@ def generate_DAG(dependencies: dict, title="dag.png", durations: dict = None):
     plt.savefig(save_path, format="png")
     plt.close()  # Close the plot to prevent it from displaying
 
-    print(f"DAG saved as {title} in {constants.DAG_PATH}")
+    logger.info("DAG saved as %s in %s", title, constants.DAG_PATH)
@@ -0,0 +1,132 @@
+def _index_graph(dependencies: dict) -> tuple[list, list[list[int]]]:
+    """Map tasks to integers and build an adjacency list of task -> dependency edges."""
+    nodes = list(dependencies.keys())
+    position = {task: i for i, task in enumerate(nodes)}
+
+    for deps in dependencies.values():
+        for dep in deps:
+            if dep not in position:
+                position[dep] = len(nodes)
+                nodes.append(dep)
+
+    adjacency = [[] for _ in nodes]
+    for task, deps in dependencies.items():
+        i = position[task]
+        adjacency[i] = list(dict.fromkeys(position[dep] for dep in deps if position[dep] != i))
+
+    return nodes, adjacency
+
+
+def break_cycles(adjacency: list[list[int]]) -> list[tuple[int, int]]:
+    """
+    Remove the back edges found by a depth-first search, which leaves a DAG.
+
+    :param adjacency: Adjacency list, modified in place.
+    :return: List of removed (task, dependency) edges.
+    """
+    WHITE, GRAY, BLACK = 0, 1, 2
+    color = [WHITE] * len(adjacency)
+    removed = []
+
+    for root in range(len(adjacency)):
+        if color[root] != WHITE:
+            continue
+
+        color[root] = GRAY
+        stack = [(root, 0)]
+        while stack:
+            node, next_child = stack[-1]
+            children = adjacency[node]
+
+            if next_child == len(children):
+                color[node] = BLACK
+                stack.pop()
+                continue
+
+            stack[-1] = (node, next_child + 1)
+            child = children[next_child]
+            if color[child] == WHITE:
+                color[child] = GRAY
+                stack.append((child, 0))
+            elif color[child] == GRAY:
+                removed.append((node, child))
+
+    # Back edges are only dropped once the traversal no longer walks these lists
+    back_edges = set(removed)
+    for node in {node for node, _ in removed}:
+        adjacency[node] = [child for child in adjacency[node] if (node, child) not in back_edges]
+
+    return removed
+
+
+def topological_order(adjacency: list[list[int]]) -> list[int]:
+    """
+    Order a DAG so that every task comes after all of its dependencies (Kahn's algorithm).
+
+    :param adjacency: Acyclic adjacency list of task -> dependency edges.
+    :return: List of node indices.
+    """
+    dependents = [[] for _ in adjacency]
+    remaining = [len(children) for children in adjacency]
+    for node, children in enumerate(adjacency):
+        for child in children:
+            dependents[child].append(node)
+
+    order = [node for node, count in enumerate(remaining) if count == 0]
+    for node in order:
+        for dependent in dependents[node]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                order.append(dependent)
+
+    return order
+
+
+def transitive_reduction(adjacency: list[list[int]], order: list[int]) -> list[list[int]]:
+    """
+    Keep only the edges of a DAG that are not implied by a longer path.
+
+    Nodes are visited in topological order, so the reachability set of every dependency
+    is known before its dependents. Reachability sets are stored as integer bitsets.
+
+    :param adjacency: Acyclic adjacency list of task -> dependency edges.
+    :param order: Topological order of the nodes, dependencies first.
+    :return: Reduced adjacency list.
+    """
+    rank = [0] * len(adjacency)
+    for i, node in enumerate(order):
+        rank[node] = i
+
+    reachable = [0] * len(adjacency)
+    reduced = [[] for _ in adjacency]
+
+    for node in order:
+        covered = 0
+        # Closest dependencies first, so anything they reach is already covered
+        for child in sorted(adjacency[node], key=rank.__getitem__, reverse=True):
+            if covered >> child & 1:
+                continue
+            reduced[node].append(child)
+            covered |= reachable[child] | (1 << child)
+        reachable[node] = covered
+
+    return reduced
+
+
+def postprocess_dependencies(dependencies: dict) -> dict:
+    """
+    Break cycles, remove transitive dependencies and order tasks so that tasks with no dependencies come first.
+
+    :param dependencies: Dictionary where keys are task IDs and values are iterables of dependency task IDs.
+    :return: Dictionary where keys are task IDs, in topological order, and values are lists of direct dependency task IDs.
+    """
+    nodes, adjacency = _index_graph(dependencies)
+    break_cycles(adjacency)
+    order = topological_order(adjacency)
+    reduced = transitive_reduction(adjacency, order)
+
+    return {
+        nodes[node]: [nodes[child] for child in reduced[node]]
+        for node in order
+        if nodes[node] in dependencies
+    }
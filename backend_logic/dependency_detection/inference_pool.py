@@ -0,0 +1,146 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from typing import Optional
+
+import numpy as np
+import constants
+
+# Set in worker processes so they never start a pool of their own
+_in_worker = False
+
+_pool = None
+_pool_lock = threading.Lock()
+_threads_configured = False
+
+
+def configure_torch_threads(threads: Optional[int], interop_threads: Optional[int]):
+    """
+    Pin the intra-op and inter-op thread counts torch uses in this process.
+    None leaves the torch default. Inter-op threads can only be set before torch runs any parallel work.
+    """
+    import torch
+
+    if threads:
+        torch.set_num_threads(threads)
+    if interop_threads:
+        try:
+            torch.set_interop_threads(interop_threads)
+        except RuntimeError:
+            pass
+
+
+def _init_worker(threads: Optional[int], interop_threads: Optional[int]):
+    global _in_worker
+    _in_worker = True
+    configure_torch_threads(threads, interop_threads)
+
+    # Importing the detectors registers their model loaders in this process
+    import backend_logic.dependency_detection.detect_dependencies  # noqa: F401
+    import backend_logic.dependency_detection.dependency_detection_bert  # noqa: F401
+
+
+def _score_nli_shard(model_name: str, pairs: list, batch_size: int) -> list:
+    from backend_logic.dependency_detection.nli_scoring import run_nli_model
+
+    return run_nli_model(model_name, pairs, batch_size)
+
+
+def _encode_shard(texts: list) -> np.ndarray:
+    from backend_logic.dependency_detection.detect_dependencies import _encode
+
+    return _encode(texts)
+
+
+class InferencePool:
+    """
+    Shards model inference across worker processes. Each worker holds its own copy of every model it uses.
+
+    Attributes:
+        workers (int): Number of worker processes.
+        threads (int, optional): Intra-op torch threads per worker.
+        interop_threads (int, optional): Inter-op torch threads per worker.
+        shard_size (int): Number of items sent to a worker at a time.
+    """
+
+    def __init__(
+        self,
+        workers: int = constants.INFERENCE.WORKERS,
+        threads: Optional[int] = constants.INFERENCE.THREADS_PER_WORKER,
+        interop_threads: Optional[int] = constants.INFERENCE.INTEROP_THREADS,
+        shard_size: int = constants.INFERENCE.SHARD_SIZE,
+    ):
+        self.workers = workers
+        self.threads = threads
+        self.interop_threads = interop_threads
+        self.shard_size = shard_size
+
+        # Spawned workers do not inherit the parent's torch thread pools
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(threads, interop_threads),
+        )
+
+    def _map(self, function, items: list, *args, progress=None) -> list:
+        """Run function over shards of items and return the result of every shard, in order."""
+        shards = [items[start : start + self.shard_size] for start in range(0, len(items), self.shard_size)]
+        futures = {
+            self._executor.submit(function, shard, *args): i for i, shard in enumerate(shards)
+        }
+
+        results = [None] * len(shards)
+        done = 0
+        try:
+            for future in as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                done += len(shards[i])
+                if progress:
+                    progress(done, len(items))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+        return results
+
+    def score_nli(self, model_name: str, pairs: list, batch_size: int, progress=None) -> list:
+        """Return (contradiction, entailment) logits for every (premise, label) pair."""
+        shards = self._map(partial(_score_nli_shard, model_name), pairs, batch_size, progress=progress)
+        return [logits for shard in shards for logits in shard]
+
+    def encode(self, texts: list) -> np.ndarray:
+        """Return normalized similarity-model embeddings for every text."""
+        shards = self._map(_encode_shard, texts)
+        return np.concatenate(shards) if shards else np.zeros((0, 0), dtype=np.float32)
+
+    def shutdown(self):
+        self._executor.shutdown(cancel_futures=True)
+
+
+def get_pool() -> Optional[InferencePool]:
+    """
+    Return the shared inference pool, starting it on first use.
+    Returns None when INFERENCE.WORKERS is 0 or inside a worker, in which case inference runs in this process.
+    """
+    global _pool, _threads_configured
+
+    if _in_worker:
+        return None
+
+    if not constants.INFERENCE.WORKERS:
+        # In-process inference still honours the configured thread counts
+        if not _threads_configured:
+            _threads_configured = True
+            configure_torch_threads(
+                constants.INFERENCE.THREADS_PER_WORKER, constants.INFERENCE.INTEROP_THREADS
+            )
+        return None
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = InferencePool()
+    return _pool
@@ -0,0 +1,157 @@
+import gc
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable
+
+import constants
+
+logger = logging.getLogger(__name__)
+
+
+def _rss_bytes() -> int:
+    """Return the resident set size of this process, or 0 where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _parameter_bytes(model: Any) -> int:
+    """Return the size of the weights of a torch module or transformers pipeline."""
+    module = getattr(model, "model", model)
+    if not hasattr(module, "parameters"):
+        return 0
+
+    size = sum(p.numel() * p.element_size() for p in module.parameters())
+    if hasattr(module, "buffers"):
+        size += sum(b.numel() * b.element_size() for b in module.buffers())
+    return size
+
+
+class _Entry:
+    def __init__(self, loader: Callable[[], Any]):
+        self.loader = loader
+        self.model = None
+        self.lock = threading.Lock()
+        self.load_seconds = 0.0
+        self.parameter_bytes = 0
+        self.rss_delta_bytes = 0
+        self.loads = 0
+        self.uses = 0
+        self.last_used = 0.0
+
+
+class ModelRegistry:
+    """
+    Loads models on first use and shares one instance of each across requests and threads.
+
+    Models are registered by name with a loader function and are only constructed the
+    first time get() is called. Models that have not been used for idle_timeout seconds
+    are released by a background reaper thread and reloaded on their next use.
+
+    Attributes:
+        idle_timeout (float, optional): Seconds a model may go unused before it is unloaded. None disables unloading.
+    """
+
+    def __init__(self, idle_timeout: float = constants.MODELS.IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._entries: dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        """Register a loader for a model name. Registering an existing name keeps the original."""
+        with self._lock:
+            self._entries.setdefault(name, _Entry(loader))
+
+    def get(self, name: str) -> Any:
+        """Return the shared instance of a model, loading it if needed."""
+        entry = self._entries[name]
+
+        with entry.lock:
+            if entry.model is None:
+                rss_before = _rss_bytes()
+                started = time.perf_counter()
+
+                entry.model = entry.loader()
+
+                entry.load_seconds = time.perf_counter() - started
+                entry.rss_delta_bytes = max(_rss_bytes() - rss_before, 0)
+                entry.parameter_bytes = _parameter_bytes(entry.model)
+                entry.loads += 1
+                logger.info(
+                    "Loaded model %s in %.2fs (%.0f MiB of weights)",
+                    name,
+                    entry.load_seconds,
+                    entry.parameter_bytes / 2**20,
+                    extra={"model": name, "load_seconds": entry.load_seconds, "parameter_bytes": entry.parameter_bytes},
+                )
+
+            entry.uses += 1
+            entry.last_used = time.monotonic()
+            model = entry.model
+
+        self._start_reaper()
+        return model
+
+    def unload(self, name: str) -> bool:
+        """Release a model. Threads already holding it keep working with their reference."""
+        entry = self._entries[name]
+
+        with entry.lock:
+            if entry.model is None:
+                return False
+            entry.model = None
+
+        gc.collect()
+        return True
+
+    def unload_idle(self, timeout: float = None) -> list[str]:
+        """Release every model that has not been used for timeout seconds and return their names."""
+        timeout = self.idle_timeout if timeout is None else timeout
+        now = time.monotonic()
+
+        return [
+            name
+            for name, entry in list(self._entries.items())
+            if entry.model is not None
+            and now - entry.last_used >= timeout
+            and self.unload(name)
+        ]
+
+    def _start_reaper(self):
+        if self.idle_timeout is None or self._reaper is not None:
+            return
+
+        with self._lock:
+            if self._reaper is not None:
+                return
+
+            def reap():
+                while True:
+                    time.sleep(max(self.idle_timeout / 2, 1))
+                    self.unload_idle()
+
+            self._reaper = threading.Thread(target=reap, name="model-reaper", daemon=True)
+            self._reaper.start()
+
+    def stats(self) -> dict:
+        """Return load time, memory and usage for every registered model."""
+        return {
+            name: {
+                "loaded": entry.model is not None,
+                "load_seconds": entry.load_seconds,
+                "parameter_bytes": entry.parameter_bytes,
+                "rss_delta_bytes": entry.rss_delta_bytes,
+                "loads": entry.loads,
+                "uses": entry.uses,
+            }
+            for name, entry in self._entries.items()
+        }
+
+
+# Shared by every detector in the process
+registry = ModelRegistry()
@@ -0,0 +1,147 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import constants
+from backend_logic.dependency_detection.model_registry import registry
+from backend_logic.dependency_detection.inference_pool import get_pool
+
+# Template the zero-shot pipeline wraps every candidate label in
+HYPOTHESIS_TEMPLATE = "This example is {}."
+
+
+def run_nli_model(
+    model_name: str,
+    pairs: list[tuple[str, str]],
+    batch_size: int = constants.MODELS.NLI_BATCH_SIZE,
+    progress=None,
+) -> list[tuple[float, float]]:
+    """
+    Run a zero-shot NLI model over (premise, label) pairs in this process.
+
+    :param model_name: Registry name of the zero-shot-classification pipeline to use.
+    :param pairs: List of (premise, candidate label) tuples. Labels are wrapped in HYPOTHESIS_TEMPLATE.
+    :param batch_size: Number of pairs sent through the model per forward pass.
+    :param progress: Optional callback called with (pairs scored, total pairs) after each batch.
+    :return: List of (contradiction logit, entailment logit) tuples, aligned with pairs.
+    """
+    import torch
+
+    classifier = registry.get(model_name)
+    entailment_id = classifier.entailment_id
+    contradiction_id = -1 if entailment_id == 0 else 0
+
+    # Sorting by length keeps the padding inside each batch small
+    order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][0]) + len(pairs[i][1]))
+    results = [None] * len(pairs)
+
+    for start in range(0, len(order), batch_size):
+        batch = order[start : start + batch_size]
+        inputs = classifier.tokenizer(
+            [pairs[i][0] for i in batch],
+            [HYPOTHESIS_TEMPLATE.format(pairs[i][1]) for i in batch],
+            padding=True,
+            truncation="only_first",
+            return_tensors="pt",
+        )
+
+        with torch.inference_mode():
+            logits = classifier.model(**inputs).logits
+
+        logits = logits[:, [contradiction_id, entailment_id]].float().cpu().numpy()
+        for i, (contradiction, entailment) in zip(batch, logits.tolist()):
+            results[i] = (contradiction, entailment)
+
+        if progress:
+            progress(min(start + batch_size, len(order)), len(order))
+
+    return results
+
+
+class NLIScorer:
+    """
+    Scores (premise, hypothesis) pairs with a zero-shot NLI model in large padded batches.
+
+    The contradiction and entailment logits of every pair are cached, so repeated
+    lookups (such as the special case checks in dependency_detection_bert) never run
+    the model twice for the same pair. Scores match those of the transformers
+    zero-shot-classification pipeline.
+
+    Attributes:
+        model_name (str): Registry name of the zero-shot-classification pipeline to use.
+        batch_size (int): Number of pairs sent through the model per forward pass.
+        cache_size (int): Maximum number of pairs whose logits are kept.
+    """
+
+    def __init__(
+        self,
+        model_name: str = constants.MODELS.NLI_MODEL,
+        batch_size: int = constants.MODELS.NLI_BATCH_SIZE,
+        cache_size: int = constants.MODELS.NLI_CACHE_SIZE,
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple[str, str], tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def score(self, pairs: list[tuple[str, str]], progress=None) -> list[tuple[float, float]]:
+        """
+        Run the model over every (premise, label) pair that is not cached yet.
+
+        :param pairs: List of (premise, candidate label) tuples. Labels are wrapped in HYPOTHESIS_TEMPLATE.
+        :param progress: Optional callback called with (pairs scored, total pairs) after each batch.
+        :return: List of (contradiction logit, entailment logit) tuples, aligned with pairs. They are returned
+            rather than read back from the cache, since another thread may evict them in between.
+        """
+        found = {}
+        with self._lock:
+            for pair in pairs:
+                if pair in self._cache:
+                    self._cache.move_to_end(pair)
+                    found[pair] = self._cache[pair]
+        missing = list(dict.fromkeys(pair for pair in pairs if pair not in found))
+
+        if missing:
+            pool = get_pool()
+            if pool:
+                logits = pool.score_nli(self.model_name, missing, self.batch_size, progress)
+            else:
+                logits = run_nli_model(self.model_name, missing, self.batch_size, progress)
+
+            with self._lock:
+                for pair, (contradiction, entailment) in zip(missing, logits):
+                    found[pair] = self._cache[pair] = (contradiction, entailment)
+
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return [found[pair] for pair in pairs]
+
+    def classify(self, premise: str, candidate_labels, multi_label: bool = False) -> dict:
+        """
+        Rank candidate labels for a premise, scoring any pairs that are not cached yet.
+
+        :param premise: Text to classify.
+        :param candidate_labels: Label or list of labels.
+        :param multi_label: Whether each label is scored independently.
+        :return: Dictionary shaped like the zero-shot pipeline output, with labels and scores sorted by score.
+        """
+        if isinstance(candidate_labels, str):
+            candidate_labels = [label.strip() for label in candidate_labels.split(",") if label.strip()]
+
+        logits = np.array(self.score([(premise, label) for label in candidate_labels]))
+
+        if multi_label or len(candidate_labels) == 1:
+            exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+            scores = exp[:, 1] / exp.sum(axis=1)
+        else:
+            exp = np.exp(logits[:, 1] - logits[:, 1].max())
+            scores = exp / exp.sum()
+
+        order = np.argsort(-scores, kind="stable")
+        return {
+            "sequence": premise,
+            "labels": [candidate_labels[i] for i in order],
+            "scores": [float(scores[i]) for i in order],
+        }
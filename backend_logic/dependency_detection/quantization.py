@@ -0,0 +1,44 @@
+from typing import Any
+
+import constants
+
+BACKENDS = ("fp32", "int8")
+
+
+def get_backend() -> str:
+    backend = constants.INFERENCE.BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend!r}, expected one of {BACKENDS}")
+    return backend
+
+
+def apply_backend(model: Any) -> Any:
+    """
+    Convert a freshly loaded model to the configured inference backend.
+
+    int8 replaces every nn.Linear with a dynamically quantized one: weights are stored as int8
+    and activations are quantized on the fly, which mostly speeds up the large transformer
+    projections on CPU. Works on torch modules and on transformers pipelines.
+
+    :param model: torch module (such as a SentenceTransformer) or pipeline with a .model attribute, loaded on load_device().
+    :return: The same model, converted in place.
+    """
+    if get_backend() == "fp32":
+        return model
+
+    import torch
+
+    module = getattr(model, "model", model)
+    torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
+def load_device():
+    """Device to load models on. Quantized kernels only run on CPU, otherwise the library picks."""
+    return "cpu" if get_backend() == "int8" else None
+
+
+def backend_model_name(model_name: str) -> str:
+    """Name outputs of a model are cached under, so results of different backends never mix."""
+    backend = get_backend()
+    return model_name if backend == "fp32" else f"{model_name}@{backend}"
@@ -1,7 +1,10 @@
+import logging
 import sqlite3
 import os
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 def backup_sqlite_with_api(db_file_path: str, backup_dir: str):
     """
     Backs up an SQLite database using SQLite's built-in backup API for consistency.
@@ -11,7 +14,7 @@ def backup_sqlite_with_api(db_file_path: str, backup_dir: str):
         backup_dir (str): Directory where the backup will be stored.
     """
     if not os.path.exists(db_file_path):
-        print(f"Error: Database file {db_file_path} does not exist.")
+        logger.error("Database file %s does not exist", db_file_path)
         return
     
     # Ensure backup directory exists
@@ -31,12 +34,43 @@ def backup_sqlite_with_api(db_file_path: str, backup_dir: str):
         with backup_conn:
             conn.backup(backup_conn)
         
-        print(f"Backup successful: {backup_file}")
+        logger.info("Backup successful: %s", backup_file)
+    except sqlite3.Error as e:
+        logger.error("Error occurred during backup: %s", e)
+    finally:
+        conn.close()
+        backup_conn.close()
+
+def backup_database(backup_dir: str):
+    """
+    Backs up the application's SQLite database through its engine, so the backup sees the
+    same configuration (WAL included) as every other connection.
+
+    Args:
+        backup_dir (str): Directory where the backup will be stored.
+    """
+    from services.db_service import engine
+
+    if engine.dialect.name != "sqlite":
+        logger.error("Only SQLite databases can be backed up, not %s", engine.dialect.name)
+        return
+
+    os.makedirs(backup_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    backup_file = os.path.join(backup_dir, f"sqlite_backup_{timestamp}.db")
+
+    conn = engine.raw_connection()
+    backup_conn = sqlite3.connect(backup_file)
+    try:
+        with backup_conn:
+            conn.driver_connection.backup(backup_conn)
+        logger.info("Backup successful: %s", backup_file)
     except sqlite3.Error as e:
-        print(f"Error occurred during backup: {e}")
+        logger.error("Error occurred during backup: %s", e)
     finally:
         conn.close()
         backup_conn.close()
 
 # Example usage:
-# backup_sqlite_with_api('/path/to/database.db', '/path/to/backup/directory')
\ No newline at end of file
+# backup_sqlite_with_api('/path/to/database.db', '/path/to/backup/directory')
+# backup_database('/path/to/backup/directory')
\ No newline at end of file
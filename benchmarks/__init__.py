@@ -0,0 +1 @@
+""" Standalone benchmark and evaluation scripts. Run them from the repository root, e.g. `python -m benchmarks.pruning_recall`. """
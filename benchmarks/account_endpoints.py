@@ -0,0 +1,61 @@
+"""
+Checks that /accounts/self and /verify-login answer for company members on the async session, both when
+the account is loaded and when it comes from the principal cache, and that they report manager correctly.
+Runs the app against a temporary SQLite database, never the app's own. Exits with status 1 on any failure.
+
+Usage: python -m benchmarks.account_endpoints
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as directory:
+        # Read when the database engine is created, so it must be set before the app is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'check.db')}"
+
+        from fastapi.testclient import TestClient
+
+        import main as app_module
+        from models import Account, Company
+        from services import create_access_token, principal_cache
+        from services.db_service import SessionLocal
+
+        with SessionLocal() as db:
+            manager = Account(name="Manager", email=f"{uuid.uuid4()}@check", password_hash="x")
+            db.add(manager)
+            db.flush()
+            company = Company(name="Check", founding_member=manager.id)
+            db.add(company)
+            db.flush()
+            manager.company_id = company.id
+            member = Account(
+                name="Member", email=f"{uuid.uuid4()}@check", password_hash="x",
+                company_id=company.id, manager_id=manager.id,
+            )
+            unaffiliated = Account(name="Solo", email=f"{uuid.uuid4()}@check", password_hash="x")
+            db.add_all([member, unaffiliated])
+            db.commit()
+            accounts = [(manager.id, True), (member.id, False), (unaffiliated.id, False)]
+
+        failures = 0
+        principal_cache.clear()
+        with TestClient(app_module.app) as client:
+            for account_id, is_manager in accounts:
+                headers = {"Authorization": f"Bearer {create_access_token({'sub': account_id})}"}
+                # The first request loads the account, the later ones are served from the principal cache
+                for path in ("/accounts/self", "/verify-login", "/accounts/self"):
+                    response = client.get(path, headers=headers)
+                    ok = response.status_code == 200 and response.json()["manager"] is is_manager
+                    failures += not ok
+                    print(f"{'ok' if ok else 'FAIL':>4} {path:<15} {account_id} {response.status_code}")
+
+        print(f"{failures} failures")
+        return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
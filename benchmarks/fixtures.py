@@ -0,0 +1,39 @@
+"""
+Fixed task sets shared by the benchmark scripts.
+"""
+
+SAMPLE_PROJECT = {
+    "Requirements Gathering": "Interview stakeholders and write down the requirements before any design work starts.",
+    "Database Schema": "Design the database schema once the requirements are agreed on.",
+    "Authentication Module": "Build login, logout and token refresh after the database schema is in place.",
+    "Task API": "Implement the task endpoints following the database schema.",
+    "Project API": "Implement the project endpoints following the database schema.",
+    "Frontend Scaffolding": "Set up the frontend project, routing and build tooling.",
+    "Dashboard UI": "Build the dashboard screens once the task API and project API are available.",
+    "Login UI": "Build the login screen after the authentication module is finished.",
+    "Notifications": "Push task changes to connected clients after the task API is done.",
+    "Dependency Detection": "Detect dependencies between tasks using the task descriptions.",
+    "Prioritization Engine": "Order tasks using the detected dependencies, then estimate completion times.",
+    "Email Service": "Send invitation and password emails to new accounts.",
+    "Company Accounts": "Let companies register and invite employees after the authentication module exists.",
+    "Logging": "Add structured logging to every service prior to the load tests.",
+    "Load Testing": "Run load tests against the API before the release.",
+    "Security Review": "Review authentication and data access before the release.",
+    "Documentation": "Document every endpoint following the API freeze.",
+    "Integration Testing": "Test the full flow from login to dashboard after all development tasks are completed.",
+    "Deployment Pipeline": "Automate builds and deployments to staging and production.",
+    "Release": "Ship the release once integration testing, load testing and the security review are done.",
+}
+
+
+def synthetic_project(size: int) -> dict[str, str]:
+    """
+    Build a project of the given size by repeating the sample project with numbered task names.
+    """
+    names = list(SAMPLE_PROJECT.keys())
+    project = {}
+    for i in range(size):
+        name = names[i % len(names)]
+        suffix = f" {i // len(names) + 1}" if i >= len(names) else ""
+        project[name + suffix] = SAMPLE_PROJECT[name]
+    return project
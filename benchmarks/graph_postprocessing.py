@@ -0,0 +1,65 @@
+"""
+Times the dependency graph post-processor on large random graphs and checks it against networkx.
+
+Usage: python -m benchmarks.graph_postprocessing [--nodes 10000] [--degree 3] [--cycles 50] [--seed 0]
+"""
+
+import argparse
+import random
+import time
+
+import networkx as nx
+
+from backend_logic.dependency_detection.graph_postprocessing import postprocess_dependencies
+
+
+def random_dependencies(nodes: int, degree: int, cycles: int, seed: int) -> dict[int, set[int]]:
+    """Build a random DAG with roughly degree dependencies per task, then add back edges to create cycles."""
+    rng = random.Random(seed)
+    dependencies = {task: set() for task in range(nodes)}
+
+    for task in range(1, nodes):
+        window = max(0, task - 50)
+        dependencies[task].update(rng.randint(window, task - 1) for _ in range(degree))
+
+    for _ in range(cycles):
+        task = rng.randrange(nodes - 1)
+        dependencies[task].add(rng.randrange(task + 1, nodes))
+
+    return dependencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=10000)
+    parser.add_argument("--degree", type=int, default=3)
+    parser.add_argument("--cycles", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    dependencies = random_dependencies(args.nodes, args.degree, args.cycles, args.seed)
+    edges = sum(len(deps) for deps in dependencies.values())
+    print(f"{args.nodes} nodes, {edges} edges, {args.cycles} injected back edges")
+
+    started = time.perf_counter()
+    result = postprocess_dependencies(dependencies)
+    seconds = time.perf_counter() - started
+    kept = sum(len(deps) for deps in result.values())
+    print(f"postprocess_dependencies: {seconds:.3f}s, {kept} edges kept")
+
+    graph = nx.DiGraph()
+    graph.add_nodes_from(result)
+    graph.add_edges_from((task, dep) for task, deps in result.items() for dep in deps)
+
+    started = time.perf_counter()
+    reference = nx.transitive_reduction(graph)
+    seconds = time.perf_counter() - started
+    print(f"networkx transitive_reduction of the result: {seconds:.3f}s")
+
+    assert nx.is_directed_acyclic_graph(graph), "result has a cycle"
+    assert set(reference.edges()) == set(graph.edges()), "result is not transitively reduced"
+    print("result is acyclic and transitively reduced")
+
+
+if __name__ == "__main__":
+    main()
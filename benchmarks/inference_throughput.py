@@ -0,0 +1,75 @@
+"""
+Reports NLI scoring throughput for several worker process x torch thread configurations.
+
+Usage: python -m benchmarks.inference_throughput [--configs 1x8 2x4 4x2 8x1] [--size 20] [--shard-size 256]
+"""
+
+import argparse
+import time
+
+import constants
+from backend_logic.dependency_detection.dependency_detection_bert import build_hypotheses
+from backend_logic.dependency_detection.inference_pool import InferencePool, configure_torch_threads
+from backend_logic.dependency_detection.nli_scoring import run_nli_model
+from benchmarks.fixtures import synthetic_project
+
+
+def parse_config(config: str) -> tuple[int, int]:
+    workers, threads = config.lower().split("x")
+    return int(workers), int(threads)
+
+
+def fixture_pairs(size: int) -> list[tuple[str, str]]:
+    """Every (premise, hypothesis) pair dependency_detection_bert scores for a synthetic project."""
+    tasks = synthetic_project(size)
+    pairs = []
+    for task_A, description in tasks.items():
+        for task_B in tasks:
+            if task_A != task_B:
+                for hypotheses in build_hypotheses(task_A, task_B):
+                    pairs.extend((description, hypothesis) for hypothesis in hypotheses)
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--configs", nargs="+", default=["1x8", "2x4", "4x2", "8x1"])
+    parser.add_argument("--size", type=int, default=20)
+    parser.add_argument("--shard-size", type=int, default=constants.INFERENCE.SHARD_SIZE)
+    parser.add_argument("--in-process", action="store_true", help="Also time scoring without a pool")
+    args = parser.parse_args()
+
+    pairs = fixture_pairs(args.size)
+    model_name = constants.MODELS.NLI_MODEL
+    batch_size = constants.MODELS.NLI_BATCH_SIZE
+
+    print(f"{len(pairs)} pairs")
+    print(f"{'config':>10} {'seconds':>8} {'pairs/s':>9}")
+
+    if args.in_process:
+        configure_torch_threads(None, None)
+        run_nli_model(model_name, pairs[:batch_size], batch_size)  # Warm up
+
+        started = time.perf_counter()
+        run_nli_model(model_name, pairs, batch_size)
+        seconds = time.perf_counter() - started
+        print(f"{'process':>10} {seconds:>8.2f} {len(pairs) / seconds:>9.1f}")
+
+    for config in args.configs:
+        workers, threads = parse_config(config)
+        pool = InferencePool(workers=workers, threads=threads, interop_threads=1, shard_size=args.shard_size)
+        try:
+            # Load the model in every worker before timing
+            pool.score_nli(model_name, pairs[: workers * args.shard_size], batch_size)
+
+            started = time.perf_counter()
+            pool.score_nli(model_name, pairs, batch_size)
+            seconds = time.perf_counter() - started
+        finally:
+            pool.shutdown()
+
+        print(f"{config:>10} {seconds:>8.2f} {len(pairs) / seconds:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
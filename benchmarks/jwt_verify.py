@@ -0,0 +1,49 @@
+"""
+Times verifying an access token, per request, with each JWT backend: a full decode every time, and
+decode_jwt answering repeated tokens from the verified-token cache. Backends that are not installed are skipped.
+
+Usage: python -m benchmarks.jwt_verify [--requests 20000] [--tokens 100]
+"""
+
+import argparse
+import importlib.util
+import time
+import uuid
+
+import constants
+from services.auth_service import JWT_BACKENDS, create_access_token, decode_jwt, token_cache, verify_jwt
+
+BACKEND_MODULES = {"jose": "jose", "pyjwt": "jwt"}
+
+
+def per_request_us(verify, tokens: list[str], requests: int) -> float:
+    """Average microseconds per call of verify, cycling through tokens."""
+    started = time.perf_counter()
+    for i in range(requests):
+        verify(tokens[i % len(tokens)])
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--tokens", type=int, default=100, help="Distinct tokens in use, as if from that many clients")
+    args = parser.parse_args()
+
+    tokens = [create_access_token({"sub": uuid.uuid4()}) for _ in range(args.tokens)]
+
+    print(f"{'backend':>8} {'decode us':>10} {'cached us':>10} {'speedup':>8}")
+    for backend in JWT_BACKENDS:
+        if importlib.util.find_spec(BACKEND_MODULES[backend]) is None:
+            print(f"{backend:>8} not installed")
+            continue
+
+        constants.AUTH.JWT_BACKEND = backend
+        decode = per_request_us(verify_jwt, tokens, args.requests)
+        token_cache.clear()
+        cached = per_request_us(decode_jwt, tokens, args.requests)
+        print(f"{backend:>8} {decode:>10.1f} {cached:>10.1f} {decode / cached:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Fires concurrent requests at a running server and reports latency percentiles per endpoint.
+
+Start the server first (uvicorn main:app), then point this at it with an account to log in as.
+Every endpoint is hit with --concurrency requests in flight at once, --requests times in total.
+
+Usage: python -m benchmarks.load_test --email EMAIL --password PASSWORD [--url http://127.0.0.1:8000]
+       [--requests 2000] [--concurrency 500] [--project-id ID]
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+import numpy as np
+
+
+async def hit(client: httpx.AsyncClient, path: str, headers: dict, total: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path, headers=headers)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    seconds = time.perf_counter() - started
+
+    latencies = np.array(latencies) * 1000
+    return {
+        "requests": total,
+        "errors": errors,
+        "per_second": total / seconds,
+        "p50": np.percentile(latencies, 50),
+        "p99": np.percentile(latencies, 99),
+        "max": latencies.max(),
+    }
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=120) as client:
+        response = await client.post("/login", data={"username": args.email, "password": args.password})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        paths = ["/accounts/self", "/verify-login", "/projects/get-projects"]
+        if args.project_id:
+            paths.append(f"/projects/{args.project_id}/")
+
+        print(f"{'endpoint':>24} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for path in paths:
+            result = await hit(client, path, headers, args.requests, args.concurrency)
+            print(
+                f"{path[:24]:>24} {result['requests']:>8} {result['errors']:>6} {result['per_second']:>8.0f} "
+                f"{result['p50']:>8.1f} {result['p99']:>8.1f} {result['max']:>8.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--project-id")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
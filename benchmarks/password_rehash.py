@@ -0,0 +1,42 @@
+"""
+Checks that needs_rehash flags stored hashes whose work factor differs from the configured rounds in either
+direction, and leaves hashes at the configured rounds alone. Hashes are made at a few rounds below and above
+--rounds, so keep it low. Exits with status 1 on any failure.
+
+Usage: python -m benchmarks.password_rehash [--scheme bcrypt] [--rounds 6]
+"""
+
+import argparse
+import sys
+
+from constants import PASSWORDS
+from utils.password_utils import build_context
+
+PASSWORD = "correct horse battery staple"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scheme", default=PASSWORDS.SCHEME)
+    parser.add_argument("--rounds", type=int, default=6, help="Configured rounds; hashes are made one below and above")
+    args = parser.parse_args()
+
+    context = build_context(args.scheme, args.rounds)
+    # A context without a rounds policy, so it can make hashes at any work factor
+    unrestricted = build_context(args.scheme, None)
+
+    failures = 0
+    for rounds in (args.rounds - 1, args.rounds, args.rounds + 1):
+        hashed = unrestricted.hash(PASSWORD, rounds=rounds)
+        expected = rounds != args.rounds
+        stale = context.needs_update(hashed)
+        ok = stale is expected and context.verify(PASSWORD, hashed)
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':>4} {rounds:>8} rounds needs rehash {stale}")
+
+    print(f"{failures} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
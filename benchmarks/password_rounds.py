@@ -0,0 +1,83 @@
+"""
+Picks the work factor for a password hashing scheme that brings one verify as close as possible to a target
+latency on this machine, without going over. Run it on each class of node and set PASSWORD_ROUNDS to the result.
+
+Rounds are timed from the scheme's minimum upwards. For schemes whose cost doubles with every round (bcrypt)
+the search stops at the first round count over the target; for schemes with a linear cost (pbkdf2_sha256,
+argon2) the count is scaled up from one timing and then checked.
+
+Usage: python -m benchmarks.password_rounds [--scheme bcrypt] [--target-ms 250] [--repeat 5]
+"""
+
+import argparse
+import statistics
+import time
+
+from constants import PASSWORDS
+from utils.password_utils import build_context
+
+PASSWORD = "correct horse battery staple"
+
+
+def verify_ms(scheme: str, rounds: int, repeat: int) -> float:
+    """Median milliseconds to verify a password hashed with scheme at rounds."""
+    context = build_context(scheme, rounds)
+    hashed = context.hash(PASSWORD)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        context.verify(PASSWORD, hashed)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def pick_rounds(scheme: str, target_ms: float, repeat: int) -> tuple[int, float]:
+    """
+    :return: The largest round count whose verify time stays under target_ms, and that time.
+    """
+    handler = build_context(scheme, None).handler(scheme)
+    if "rounds" not in handler.setting_kwds:
+        raise ValueError(f"{scheme} has no configurable rounds")
+
+    rounds = handler.min_rounds
+    elapsed = verify_ms(scheme, rounds, repeat)
+    print(f"{rounds:>10} rounds {elapsed:>10.1f} ms")
+
+    if handler.rounds_cost == "log2":
+        while rounds < handler.max_rounds:
+            next_elapsed = verify_ms(scheme, rounds + 1, repeat)
+            print(f"{rounds + 1:>10} rounds {next_elapsed:>10.1f} ms")
+            if next_elapsed > target_ms:
+                break
+            rounds, elapsed = rounds + 1, next_elapsed
+        return rounds, elapsed
+
+    while rounds < handler.max_rounds:
+        estimate = min(int(rounds * target_ms / max(elapsed, 1e-3)), handler.max_rounds)
+        if estimate <= rounds:
+            break
+        estimate_elapsed = verify_ms(scheme, estimate, repeat)
+        print(f"{estimate:>10} rounds {estimate_elapsed:>10.1f} ms")
+        if estimate_elapsed > target_ms:
+            # Fixed costs made the estimate overshoot; aim 10% under it and check again
+            target_ms *= 0.9
+            continue
+        rounds, elapsed = estimate, estimate_elapsed
+    return rounds, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scheme", default=PASSWORDS.SCHEME)
+    parser.add_argument("--target-ms", type=float, default=PASSWORDS.TARGET_VERIFY_MS)
+    parser.add_argument("--repeat", type=int, default=5, help="Verifies timed per round count")
+    args = parser.parse_args()
+
+    rounds, elapsed = pick_rounds(args.scheme, args.target_ms, args.repeat)
+    if elapsed > args.target_ms:
+        print(f"Even the minimum of {rounds} rounds takes {elapsed:.1f} ms, over the {args.target_ms:.0f} ms target")
+    print(f"\nPASSWORD_SCHEME={args.scheme} PASSWORD_ROUNDS={rounds}  ({elapsed:.1f} ms per verify)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Times serializing the /projects/{project_id}/ and /projects/get-projects responses for a large generated
+project, and compares payload sizes, between the previous path (project.__dict__ and the task tree with
+stringified keys through FastAPI's jsonable_encoder) and the orjson responses built from column values.
+Runs against a temporary SQLite database, never the app's own.
+
+Usage: python -m benchmarks.project_serialization [--size 5000] [--fanout 10] [--repeat 20]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from collections import OrderedDict
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from benchmarks.recursive_delete import build_project
+from models import Base, Project
+from services.db_service import convert_uuid_keys_to_str
+from services.project_service import load_projects, serialize_project
+from services.task_service import load_project_tasks
+
+
+def render_ms(render, repeat: int) -> tuple[float, int]:
+    """
+    :return: Median milliseconds to render the response body, and the body's size in bytes,
+        or (None, 0) if the response cannot be rendered.
+    """
+    timings = []
+    body = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            body = render()
+        except Exception as e:
+            print(f"    failed: {type(e).__name__}: {str(e)[:100]}")
+            return None, 0
+        timings.append((time.perf_counter() - started) * 1000)
+    return sorted(timings)[len(timings) // 2], len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--fanout", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'benchmark.db')}")
+        Base.metadata.create_all(bind=engine)
+
+        with Session(engine) as db:
+            project_id, _ = build_project(db, args.size, args.fanout)
+            project = db.get(Project, project_id)
+            account_id = project.project_manager
+            tasks = load_project_tasks(account_id=account_id, project_id=project_id, db=db)
+            projects = load_projects(account_id=account_id, db=db)
+            project = db.get(Project, project_id)
+
+            legacy_projects = OrderedDict(
+                (key, {**project.__dict__, "tasks_remaining": value["tasks_remaining"]})
+                for key, value in projects.items()
+            )
+            runs = [
+                (
+                    "project legacy",
+                    lambda: JSONResponse(
+                        jsonable_encoder({"project": project.__dict__, "tasks": convert_uuid_keys_to_str(tasks)})
+                    ).body,
+                ),
+                (
+                    "project orjson",
+                    lambda: ORJSONResponse({"project": serialize_project(project), "tasks": tasks}).body,
+                ),
+                ("list legacy", lambda: JSONResponse(jsonable_encoder(legacy_projects)).body),
+                ("list orjson", lambda: ORJSONResponse(projects).body),
+            ]
+
+            print(f"{'response':>15} {'tasks':>6} {'bytes':>10} {'ms':>8}")
+            for name, render in runs:
+                milliseconds, size = render_ms(render, args.repeat)
+                if milliseconds is not None:
+                    print(f"{name:>15} {args.size:>6} {size:>10} {milliseconds:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
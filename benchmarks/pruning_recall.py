@@ -0,0 +1,57 @@
+"""
+Reports how many dependencies the candidate prefilter loses compared with scoring every pair.
+
+Usage: python -m benchmarks.pruning_recall [--detector similarity|nli] [--k 2 5 10] [--size 20]
+"""
+
+import argparse
+import time
+
+from backend_logic.dependency_detection.detect_dependencies import candidate_pairs
+from benchmarks.fixtures import synthetic_project
+
+
+def edges(dependencies: dict) -> set[tuple]:
+    return {(task, dep) for task, deps in dependencies.items() for dep in deps}
+
+
+def recall(full: dict, pruned: dict) -> float:
+    """Fraction of the edges found by the full run that the pruned run also found."""
+    expected = edges(full)
+    if not expected:
+        return 1.0
+    return len(expected & edges(pruned)) / len(expected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--detector", choices=["similarity", "nli"], default="similarity")
+    parser.add_argument("--k", type=int, nargs="+", default=[2, 5, 10])
+    parser.add_argument("--size", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.detector == "similarity":
+        from backend_logic.dependency_detection.detect_dependencies import detect_dependencies
+    else:
+        from backend_logic.dependency_detection.dependency_detection_bert import detect_dependencies
+
+    tasks = synthetic_project(args.size)
+    pairs = len(tasks) * (len(tasks) - 1)
+
+    started = time.perf_counter()
+    full = detect_dependencies(tasks, top_k=None)
+    full_seconds = time.perf_counter() - started
+
+    print(f"{'top_k':>6} {'pairs':>8} {'edges':>6} {'recall':>7} {'seconds':>8}")
+    print(f"{'all':>6} {pairs:>8} {len(edges(full)):>6} {1.0:>7.3f} {full_seconds:>8.2f}")
+
+    for k in args.k:
+        started = time.perf_counter()
+        pruned = detect_dependencies(tasks, top_k=k)
+        seconds = time.perf_counter() - started
+        kept = len(candidate_pairs(list(tasks.values()), k))
+        print(f"{k:>6} {kept:>8} {len(edges(pruned)):>6} {recall(full, pruned):>7.3f} {seconds:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Compares the fp32 and int8 inference backends on the sample project: detection time, model load
+time and memory, and how many of the fp32 dependencies the int8 run still finds.
+
+Usage: python -m benchmarks.quantization [--detector similarity|nli] [--size 20]
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import constants
+from backend_logic.dependency_detection import detect_dependencies as similarity
+from backend_logic.dependency_detection.embedding_store import EmbeddingStore
+from backend_logic.dependency_detection.model_registry import registry
+from backend_logic.dependency_detection.quantization import BACKENDS, backend_model_name
+from benchmarks.fixtures import SAMPLE_PROJECT, synthetic_project
+from benchmarks.pruning_recall import edges
+
+
+def reset(cache_dir: str):
+    """Drop every loaded model and cached result so the next run starts cold with the current backend."""
+    for name in registry.stats():
+        registry.unload(name)
+
+    similarity._classification_cache.clear()
+    similarity._embedding_store = EmbeddingStore(
+        backend_model_name(constants.MODELS.SIMILARITY_MODEL),
+        registry.get(constants.MODELS.SIMILARITY_MODEL).get_sentence_embedding_dimension(),
+        path=cache_dir,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--detector", choices=["similarity", "nli"], default="similarity")
+    parser.add_argument("--size", type=int, default=len(SAMPLE_PROJECT))
+    args = parser.parse_args()
+
+    if args.detector == "similarity":
+        detect_dependencies = similarity.detect_dependencies
+        clear_scores = lambda: None
+    else:
+        from backend_logic.dependency_detection import dependency_detection_bert
+
+        detect_dependencies = dependency_detection_bert.detect_dependencies
+        clear_scores = dependency_detection_bert.scorer._cache.clear
+
+    tasks = synthetic_project(args.size)
+    descriptions = list(tasks.values())
+    results = {}
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for backend in BACKENDS:
+            constants.INFERENCE.BACKEND = backend
+            reset(cache_dir)
+            clear_scores()
+
+            started = time.perf_counter()
+            dependencies = detect_dependencies(tasks)
+            seconds = time.perf_counter() - started
+
+            model_stats = registry.stats()
+            results[backend] = {
+                "edges": edges(dependencies),
+                "seconds": seconds,
+                "load_seconds": sum(stats["load_seconds"] for stats in model_stats.values()),
+                "rss_bytes": sum(stats["rss_delta_bytes"] for stats in model_stats.values()),
+                "embeddings": similarity.encode_descriptions(descriptions),
+            }
+
+    baseline = results["fp32"]
+    print(f"{'backend':>8} {'seconds':>8} {'load s':>7} {'rss MiB':>8} {'edges':>6} {'recall':>7} {'precision':>9} {'max cos diff':>12}")
+    for backend, result in results.items():
+        shared = len(baseline["edges"] & result["edges"])
+        recall = shared / len(baseline["edges"]) if baseline["edges"] else 1.0
+        precision = shared / len(result["edges"]) if result["edges"] else 1.0
+        cosine_diff = np.abs(
+            result["embeddings"] @ result["embeddings"].T - baseline["embeddings"] @ baseline["embeddings"].T
+        ).max()
+        print(
+            f"{backend:>8} {result['seconds']:>8.2f} {result['load_seconds']:>7.2f} "
+            f"{result['rss_bytes'] / 2**20:>8.0f} {len(result['edges']):>6} {recall:>7.3f} "
+            f"{precision:>9.3f} {cosine_diff:>12.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Times deleting a task subtree and a whole project on a large generated project, counting the SQL
+statements each delete issues. Runs against a temporary SQLite database, never the app's own.
+
+--legacy-size also times the previous implementation, which deleted a project one task at a time,
+on a smaller project since it needs a quadratic number of queries.
+
+Usage: python -m benchmarks.recursive_delete [--size 10000] [--fanout 10] [--legacy-size 1000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+
+from models import Account, Base, Project, ProjectProgress, Task
+from models import task_account_association, task_dependency_association
+from services.progress_service import refresh_project_progress
+from services.project_service import delete_project
+from services.task_service import delete_task
+
+
+def build_project(db: Session, size: int, fanout: int) -> tuple[uuid.UUID, list[uuid.UUID]]:
+    """
+    Insert a project whose tasks form a tree with fanout subtasks per task, breadth first,
+    with every task assigned to one account and depending on the task before it.
+
+    :return: The project ID and the IDs of the top level tasks.
+    """
+    account = Account(name="Benchmark", email=f"{uuid.uuid4()}@benchmark", password_hash="x")
+    db.add(account)
+    db.flush()
+    project = Project(name="Benchmark", project_manager=account.id)
+    db.add(project)
+    db.flush()
+
+    ids = [uuid.uuid4() for _ in range(size)]
+    tasks = [
+        {
+            "id": task_id,
+            "name": f"Task {i}",
+            "description": f"Task {i}",
+            "project_id": project.id,
+            "assigned_to": account.id,
+            "parent_task_id": ids[(i - fanout) // fanout] if i >= fanout else None,
+            "order": i % fanout,
+        }
+        for i, task_id in enumerate(ids)
+    ]
+    db.execute(insert(Task), tasks)
+    db.execute(
+        insert(task_account_association),
+        [{"task_id": task_id, "account_id": account.id} for task_id in ids],
+    )
+    db.execute(
+        insert(task_dependency_association),
+        [{"task_id": ids[i], "dependency_id": ids[i - 1]} for i in range(1, size)],
+    )
+    refresh_project_progress([project.id], db)
+    db.commit()
+    return project.id, ids[:fanout]
+
+
+def legacy_delete_project(project_id: uuid.UUID, db: Session):
+    """The previous delete_project: one delete_task per task, re-reading the project after each one."""
+    tasks = db.query(Task).filter(Task.project_id == project_id).all()
+    for task in tasks:
+        db.query(Task).filter(Task.parent_task_id == task.id).delete()
+        db.query(Task).filter(Task.id == task.id).delete()
+        db.query(task_account_association).filter(
+            task_account_association.c.task_id == task.id
+        ).delete()
+        db.query(task_dependency_association).filter(
+            (task_dependency_association.c.task_id == task.id)
+            | (task_dependency_association.c.dependency_id == task.id)
+        ).delete()
+        db.commit()
+        tasks = db.query(Task).filter(Task.project_id == project_id).all()
+
+    db.query(ProjectProgress).filter(ProjectProgress.project_id == project_id).delete()
+    db.query(Project).filter(Project.id == project_id).delete()
+    db.commit()
+
+
+def measure(engine, function) -> tuple[float, int]:
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    started = time.perf_counter()
+    try:
+        function()
+    finally:
+        seconds = time.perf_counter() - started
+        event.remove(engine, "before_cursor_execute", count)
+    return seconds, statements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--fanout", type=int, default=10)
+    parser.add_argument("--legacy-size", type=int, default=1000, help="0 skips the previous implementation")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'benchmark.db')}")
+        Base.metadata.create_all(bind=engine)
+
+        runs = [("subtree", args.size), ("project", args.size)]
+        if args.legacy_size:
+            runs.append(("legacy project", args.legacy_size))
+
+        print(f"{'delete':>15} {'tasks':>6} {'deleted':>8} {'statements':>10} {'seconds':>8}")
+        for name, size in runs:
+            with Session(engine) as db:
+                project_id, roots = build_project(db, size, args.fanout)
+
+                if name == "subtree":
+                    run = lambda: delete_task(roots[0], db)
+                elif name == "project":
+                    run = lambda: delete_project(project_id, db)
+                else:
+                    run = lambda: legacy_delete_project(project_id, db)
+
+                before = db.query(Task).filter(Task.project_id == project_id).count()
+                seconds, statements = measure(engine, run)
+                deleted = before - db.query(Task).filter(Task.project_id == project_id).count()
+                delete_project(project_id, db)
+
+            print(f"{name:>15} {size:>6} {deleted:>8} {statements:>10} {seconds:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
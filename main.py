@@ -1,5 +1,3 @@
-import asyncio
-import os
 from fastapi import (
     FastAPI,
     WebSocket,
@@ -8,39 +6,81 @@ from fastapi import (
     HTTPException,
     status,
 )
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import false
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
+import logging
 from datetime import datetime, timezone
+from typing import Dict
+from uuid import UUID
+from constants import PASSWORDS
+from models import Account, Base, Task
 from schemas import account_model, api_schemas, project_model, task_model, company_model
 
 from services import (
     load_task,
     create_task,
-    load_project_tasks,
+    load_project_tasks_async,
     delete_task,
+    apply_task_update,
+    parse_task_update,
+    changes_detection_fields,
+    create_tasks,
+    update_tasks,
     load_company,
     load_project,
+    load_project_async,
     create_project,
-    load_projects,
+    load_projects_async,
+    serialize_project,
+    visible_project_ids,
+    can_view_project,
     delete_project,
     create_access_token,
     create_refresh_token,
     decode_jwt,
+    token_cache,
+    current_account,
+    current_account_async,
+    authenticate_token,
+    principal_cache,
     get_db,
-    fetch_table_data,
-    save_table_to_file,
-    convert_uuid_keys_to_str,
+    get_async_db,
+    async_engine,
+    stream_table,
+    EXPORTABLE_TABLES,
+    EXPORT_MEDIA_TYPES,
     load_account,
     create_account,
-    authenticate_account,
+    authenticate_account_async,
     load_accounts,
     create_company,
+    connection_manager,
+    resolve_channel,
+    job_manager,
+    JobQueueFull,
+    password_hasher,
+    PasswordHasherBusy,
 )
+from utils import configure_logging, logging_stats, shutdown_logging
 
-from utils import password_utils
+configure_logging()
+logger = logging.getLogger(__name__)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Close pooled async connections, whose driver threads would otherwise keep the process alive
+    await async_engine.dispose()
+    shutdown_logging()
+
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -49,36 +89,60 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-os.makedirs("tables", exist_ok=True)
-
 # ? WebSocket Routing Functions
 
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()  # Accept the WebSocket connection
-    print("Connected to Client")
-    tables = [
-        "tasks",
-        "projects",
-        "accounts",
-        "companies",
-    ]  # Adjust to your table names
+async def websocket_endpoint(websocket: WebSocket, token: str = None):
+    """
+    Pushes row changes to the client as they are committed.
+
+    Connect with ?token=<access token>, then send {"action": "subscribe", "project_id": ...}
+    or {"action": "subscribe", "company_id": ...}, and "unsubscribe" with the same keys to stop.
+    Every commit touching a subscribed project or company arrives as a single "changes" message.
+    """
+    try:
+        payload = decode_jwt(token)
+    except Exception:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await connection_manager.connect(websocket)  # Accept the WebSocket connection
+    logger.info("WebSocket connected", extra={"account_id": payload["sub"]})
 
     try:
         while True:
-            for table in tables:
-                # Fetch the table data
-                table_data = fetch_table_data(table)
-                print("Sending Table Data")
-                # Save the table data to a file
-                save_table_to_file(table, table_data)
-
-            # Wait for 1 second before updating again
-            await asyncio.sleep(1)
+            try:
+                message = dict(await websocket.receive_json())
+            except (ValueError, TypeError):
+                connection_manager.send(websocket, {"type": "error", "detail": "Messages must be JSON objects"})
+                continue
+
+            action = message.get("action")
+
+            if action not in ("subscribe", "unsubscribe"):
+                connection_manager.send(websocket, {"type": "error", "detail": f"Unknown action: {action}"})
+                continue
+
+            try:
+                channel = resolve_channel(
+                    payload["sub"],
+                    project_id=message.get("project_id"),
+                    company_id=message.get("company_id"),
+                )
+            except (ValueError, PermissionError) as e:
+                connection_manager.send(websocket, {"type": "error", "detail": str(e)})
+                continue
+
+            if action == "subscribe":
+                connection_manager.subscribe(websocket, channel)
+            else:
+                connection_manager.unsubscribe(websocket, channel)
+            connection_manager.send(websocket, {"type": f"{action}d", "channel": channel})
     except WebSocketDisconnect:
-        print("WebSocket disconnected")
+        logger.info("WebSocket disconnected", extra={"account_id": payload["sub"]})
+    finally:
+        connection_manager.disconnect(websocket)
 
 
 @app.get("/")
@@ -86,18 +150,42 @@ async def root():
     return {"message": "API is working"}
 
 
+@app.get("/metrics")
+async def metrics():
+    """Live /ws connection and send queue figures, detection job counts by status, token and principal cache hit rates, password hashing and log queue depths."""
+    return {
+        "notifications": connection_manager.stats(),
+        "detection_jobs": job_manager.stats(),
+        "token_cache": token_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "logging": logging_stats(),
+    }
+
+
 # ? Verification Endpoints
 
 
+def _password_hasher_busy(detail: str) -> HTTPException:
+    """A 429 for requests refused because too many password checks are pending."""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(PASSWORDS.RETRY_AFTER_SECONDS)},
+    )
+
+
 @app.post("/login", response_model=api_schemas.TokenResponse)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     try:
-        user = authenticate_account(
+        user = await authenticate_account_async(
             email=form_data.username, password=form_data.password, db=db
         )
+    except PasswordHasherBusy:
+        raise _password_hasher_busy("Too many login attempts, try again shortly")
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -118,18 +206,13 @@ async def login(
     response_model=account_model.AccountResponse,
 )
 async def verify_login(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_async_db),
+    account: Account = Depends(current_account_async),
 ):
-    try:
-        payload = decode_jwt(token)
-        account = load_account(account_id=payload["sub"], db=db)
-        account.last_login = datetime.now(timezone.utc)
-        db.commit()
-        db.refresh(account)
-    except Exception as e:
-        raise HTTPException(
-            status_code=401, detail=f"Token is invalid or expired: {str(e)}"
-        )
+    account.last_login = datetime.now(timezone.utc)
+    # The async session does not expire on commit, so the account keeps the company Account.manager reads;
+    # db.refresh would drop it and leave a lazy load the async session cannot do
+    await db.commit()
     return account
 
 
@@ -145,15 +228,18 @@ async def set_password(
             detail="Invalid Link, Account ID not found",
         )
 
-    if not password_utils.verify_password(
-        form_data["temporary_password"], user.password_hash
-    ):
+    try:
+        await password_hasher.verify(form_data.temporary_password, user.password_hash)
+        new_password_hash = await password_hasher.hash(form_data.new_password)
+    except PasswordHasherBusy:
+        raise _password_hasher_busy("Too many password changes, try again shortly")
+    except ValueError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid temporary password",
         )
 
-    user.password_hash = password_utils.hash_password(form_data["new_password"])
+    user.password_hash = new_password_hash
     db.commit()
     return {"message": "Password created successfully"}
 
@@ -168,17 +254,7 @@ async def refresh_token(
     if not refresh_token:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
 
-    try:
-        payload = decode_jwt(refresh_token)
-    except Exception as e:
-        raise HTTPException(
-            status_code=401, detail=f"Token is invalid or expired: {str(e)}"
-        )
-
-    try:
-        account = load_account(account_id=payload["sub"], db=db)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Account not found")
+    account = authenticate_token(refresh_token, db)
 
     new_access_token = create_access_token(data={"sub": account.id})
     new_refresh_token = create_refresh_token(data={"sub": account.id})
@@ -192,19 +268,7 @@ async def refresh_token(
     "/accounts/self",
     response_model=account_model.AccountResponse,
 )
-async def get_self(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
-    try:
-        payload = decode_jwt(token)
-    except Exception as e:
-        raise HTTPException(
-            status_code=401, detail=f"Token is invalid or expired: {str(e)}"
-        )
-
-    try:
-        account = load_account(account_id=payload["sub"], db=db)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Account not found")
-
+async def get_self(account: Account = Depends(current_account_async)):
     return account
 
 
@@ -221,14 +285,18 @@ async def register_account(
         existing_account = None
 
     if existing_account:
-        print(existing_account)
         raise HTTPException(
             status_code=400, detail="An account already exists with that email"
         )
 
     try:
-        account = create_account(account_data=account_data, db=db)
-        print("account created: ", account.__dict__)
+        password_hash = await password_hasher.hash(account_data.password)
+    except PasswordHasherBusy:
+        raise _password_hasher_busy("Too many registrations, try again shortly")
+
+    try:
+        account = create_account(account_data=account_data, db=db, password_hash=password_hash)
+        logger.info("Account created", extra={"account_id": account.id})
         return account
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error creating account: {str(e)}")
@@ -243,7 +311,12 @@ async def register_employee(
 ):
     """API endpoint for registering a new employee"""
     try:
-        create_account(employee_data=employee_data, db=db)
+        password_hash = await password_hasher.hash(employee_data.password)
+    except PasswordHasherBusy:
+        raise _password_hasher_busy("Too many registrations, try again shortly")
+
+    try:
+        create_account(account_data=employee_data, db=db, password_hash=password_hash)
         return {"message": "Employee registered successfully"}
     except Exception as e:
         raise HTTPException(
@@ -253,11 +326,9 @@ async def register_employee(
 
 @app.get("/accounts/get-accounts")
 async def get_accounts(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+    db: Session = Depends(get_db), manager: Account = Depends(current_account)
 ):
-    payload = decode_jwt(token)
     try:
-        manager = load_account(account_id=payload["sub"], db=db)
         accounts = load_accounts(manager, db=db)
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Error getting accounts: {str(e)}")
@@ -272,27 +343,16 @@ async def get_accounts(
 async def get_account(
     account_id: str,
     db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
+    account: Account = Depends(current_account),
 ):
     try:
-        payload = decode_jwt(token)
-    except Exception as e:
-        raise HTTPException(
-            status_code=401, detail=f"Token is invalid or expired: {str(e)}"
-        )
-
-    try:
-        load_account(account_id=payload["sub"], db=db)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Account not found")
-
-    try:
-        account = load_account(account_id_str=account_id, db=db)
+        # The requesting account is already loaded
+        if UUID(account_id) == account.id:
+            return account
+        return load_account(account_id_str=account_id, db=db)
     except Exception:
         raise HTTPException(status_code=404, detail="That account was not found")
 
-    return account
-
 
 @app.patch(
     "/accounts/update-account",
@@ -301,42 +361,28 @@ async def get_account(
 async def update_account(
     account_data: account_model.AccountUpdate,
     db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
+    account: Account = Depends(current_account),
 ):
     """API endpoint for updating an existing account"""
     try:
-        payload = decode_jwt(token)
-    except Exception as e:
-        raise HTTPException(
-            status_code=401, detail=f"Token is invalid or expired: {str(e)}"
-        )
-
-    try:
-        load_account(account_id=payload["sub"], db=db)
+        if UUID(account_data.id) == account.id:
+            existing_account = account
+        else:
+            existing_account = load_account(account_id_str=account_data.id, db=db)
     except Exception:
         raise HTTPException(status_code=404, detail="Account not found")
 
-    try:
-        existing_account = load_account(account_id_str=account_data.id, db=db)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Account not found")
-
-    from uuid import UUID
-
     update_data = account_data.model_dump(exclude_unset=True, exclude={"manager"})
 
     update_data["id"] = UUID(update_data["id"])
     if update_data["manager_id"]:
-        print("updating manager id")
         update_data["manager_id"] = UUID(update_data["manager_id"])
     if update_data["company_id"]:
-        print("updating company id")
         update_data["company_id"] = UUID(update_data["company_id"])
 
-    print(update_data)
+    logger.debug("Updating account %s: %s", existing_account.id, update_data)
 
     for key, value in update_data.items():
-        print("setting: ", key, value)
         setattr(existing_account, key, value)
 
     db.commit()
@@ -351,20 +397,8 @@ async def update_account(
 def create_new_project(
     request: project_model.ProjectCreate,
     db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
+    account: Account = Depends(current_account),
 ):
-    try:
-        payload = decode_jwt(token)
-    except Exception as e:
-        raise HTTPException(
-            status_code=401, detail=f"Token is invalid or expired: {str(e)}"
-        )
-
-    try:
-        load_account(account_id=payload["sub"], db=db)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Account not found")
-
     project = create_project(project_data=request, db=db)
     return project
 
@@ -374,20 +408,8 @@ def edit_project(
     request: project_model.ProjectCreate,
     project_id: str,
     db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
+    account: Account = Depends(current_account),
 ):
-    try:
-        payload = decode_jwt(token)
-    except Exception as e:
-        raise HTTPException(
-            status_code=401, detail=f"Token is invalid or expired: {str(e)}"
-        )
-
-    try:
-        load_account(account_id=payload["sub"], db=db)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Account not found")
-
     project = load_project(project_id_str=project_id, db=db)
 
     update_data = request.dict(exclude_unset=True)
@@ -400,56 +422,35 @@ def edit_project(
     return project
 
 
-@app.get("/projects/{project_id}/")
+@app.get(
+    "/projects/{project_id}/",
+    response_model=project_model.ProjectTasksResponse,
+    response_class=ORJSONResponse,
+)
 async def get_project(
     project_id: str,
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+    account: Account = Depends(current_account_async),
 ):
-    try:
-        payload = decode_jwt(token)
-    except Exception as e:
-        raise HTTPException(
-            status_code=401, detail=f"Token is invalid or expired: {str(e)}"
-        )
-
-    try:
-        account = load_account(account_id=payload["sub"], db=db)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Account not found")
-
-    project = load_project(project_id_str=project_id, db=db)
+    project = await load_project_async(project_id_str=project_id, db=db)
 
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    display_tasks = load_project_tasks(
+    display_tasks = await load_project_tasks_async(
         project_id=project.id, account_id=account.id, db=db
     )
 
-    display_tasks_json = convert_uuid_keys_to_str(display_tasks)
-
-    return {"project": project.__dict__, "tasks": display_tasks_json}
+    # Returned as a response so FastAPI neither validates nor re-encodes the task tree; orjson writes the UUID keys itself
+    return ORJSONResponse({"project": serialize_project(project), "tasks": display_tasks})
 
 
 @app.delete("/projects/{project_id}", response_model=api_schemas.MessageResponse)
 def delete__project(
     project_id: str,
     db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
+    account: Account = Depends(current_account),
 ):
-    try:
-        payload = decode_jwt(token)
-    except Exception as e:
-        raise HTTPException(
-            status_code=401, detail=f"Token is invalid or expired: {str(e)}"
-        )
-
-    try:
-        load_account(account_id=payload["sub"], db=db)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Account not found")
-
     project = load_project(project_id_str=project_id, db=db)
 
     delete_project(project_id=project.id, db=db)
@@ -460,25 +461,81 @@ def delete__project(
     return {"message": "Project deleted successfully"}
 
 
-@app.get("/projects/get-projects")
+@app.get(
+    "/projects/get-projects",
+    response_model=Dict[UUID, project_model.ProjectSummary],
+    response_class=ORJSONResponse,
+)
 async def get_projects(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+    db: AsyncSession = Depends(get_async_db),
+    account: Account = Depends(current_account_async),
 ):
-    try:
-        payload = decode_jwt(token)
-    except Exception as e:
-        raise HTTPException(
-            status_code=401, detail=f"Token is invalid or expired: {str(e)}"
-        )
+    assigned_projects = await load_projects_async(account_id=account.id, db=db)
 
+    return ORJSONResponse(assigned_projects)
+
+
+@app.post("/projects/{project_id}/detect-dependencies")
+def queue_dependency_detection(
+    project_id: str,
+    db: Session = Depends(get_db),
+    account: Account = Depends(current_account),
+):
+    """
+    Queue dependency detection for a project. If detection is already queued or running for the project, that job is returned instead.
+    Progress is pushed to /ws clients subscribed to the project as "dependency_detection" messages.
+    """
     try:
-        account = load_account(account_id=payload["sub"], db=db)
+        project = load_project(project_id_str=project_id, db=db)
     except Exception:
-        raise HTTPException(status_code=404, detail="Account not found")
+        raise HTTPException(status_code=404, detail="Project not found")
+    if not can_view_project(account, project.id, db):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    try:
+        job = job_manager.submit(project.id)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {"job": job.to_dict()}
 
-    assigned_projects = load_projects(account_id=account.id, db=db)
 
-    return assigned_projects
+# ? Job Endpoints
+
+
+def _load_job(job_id: str, account: Account, db: Session):
+    """Return a job, or raise 404 if it does not exist or belongs to a project the account may not see."""
+    try:
+        job = job_manager.get(UUID(job_id))
+    except ValueError:
+        job = None
+
+    if not job or not can_view_project(account, job.project_id, db):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job
+
+
+@app.get("/jobs/{job_id}")
+def get_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    account: Account = Depends(current_account),
+):
+    job = _load_job(job_id, account, db)
+
+    return {"job": job.to_dict()}
+
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    account: Account = Depends(current_account),
+):
+    job = job_manager.cancel(_load_job(job_id, account, db).id)
+
+    return {"job": job.to_dict()}
 
 
 # ? Task Endpoints
@@ -488,43 +545,77 @@ async def get_projects(
 def create_new_task(
     request: task_model.TaskCreate,
     db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
+    account: Account = Depends(current_account),
+):
+    task = create_task(task=request, db=db)
+    _queue_detection([task])
+
+    return task
+
+
+@app.post("/tasks/bulk-create", response_model=task_model.TaskBulkResponse)
+def bulk_create_tasks(
+    request: task_model.TaskBulkCreate,
+    db: Session = Depends(get_db),
+    account: Account = Depends(current_account),
 ):
+    """
+    Create many tasks in one transaction. Tasks can reference a parent created in the same batch
+    through parent_task_ref. Dependencies of the new tasks are re-detected in one job per affected project.
+    """
     try:
-        payload = decode_jwt(token)
-    except Exception as e:
-        raise HTTPException(
-            status_code=401, detail=f"Token is invalid or expired: {str(e)}"
-        )
+        tasks, refs = create_tasks(tasks=request.tasks, db=db)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+    _queue_detection(tasks)
+
+    return {"tasks": tasks, "refs": refs}
+
 
+@app.patch("/tasks/bulk-update", response_model=task_model.TaskBulkResponse)
+def bulk_update_tasks(
+    request: task_model.TaskBulkUpdate,
+    db: Session = Depends(get_db),
+    account: Account = Depends(current_account),
+):
+    """
+    Apply many task updates in one transaction. Dependencies of renamed or redescribed tasks are re-detected in one job per project.
+    """
     try:
-        load_account(account_id=payload["sub"], db=db)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Account not found")
+        tasks, redescribed = update_tasks(requests=request.tasks, db=db)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
 
-    task = create_task(task=request, db=db)
+    _queue_detection([task for task in tasks if task.id in redescribed])
+
+    return {"tasks": tasks}
 
-    return task
+
+def _queue_detection(tasks: list[Task]):
+    """
+    Queue incremental dependency detection for new or edited tasks after a write, one job per project.
+    A full queue is not an error for the write.
+    """
+    task_ids: dict[UUID, set] = {}
+    for task in tasks:
+        task_ids.setdefault(task.project_id, set()).add(task.id)
+
+    for project_id, project_task_ids in task_ids.items():
+        try:
+            job_manager.submit(project_id, project_task_ids)
+        except JobQueueFull:
+            pass
 
 
 @app.delete("/tasks/{task_id}", response_model=api_schemas.MessageResponse)
 def delete__task(
     task_id: str,
     db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
+    account: Account = Depends(current_account),
 ):
-    try:
-        payload = decode_jwt(token)
-    except Exception as e:
-        raise HTTPException(
-            status_code=401, detail=f"Token is invalid or expired: {str(e)}"
-        )
-
-    try:
-        load_account(account_id=payload["sub"], db=db)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Account not found")
-
     task = load_task(task_id_str=task_id, db=db)
 
     delete_task(task_id=task.id, db=db)
@@ -539,20 +630,8 @@ def delete__task(
 def get_task(
     task_id: str,
     db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
+    account: Account = Depends(current_account),
 ):
-    try:
-        payload = decode_jwt(token)
-    except Exception as e:
-        raise HTTPException(
-            status_code=401, detail=f"Token is invalid or expired: {str(e)}"
-        )
-
-    try:
-        load_account(account_id=payload["sub"], db=db)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Account not found")
-
     task = load_task(task_id_str=task_id, db=db)
 
     if not task:
@@ -565,36 +644,17 @@ def get_task(
 def update_task(
     request: task_model.TaskUpdate,
     db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
+    account: Account = Depends(current_account),
 ):
-    try:
-        payload = decode_jwt(token)
-    except Exception as e:
-        raise HTTPException(
-            status_code=401, detail=f"Token is invalid or expired: {str(e)}"
-        )
-
-    try:
-        load_account(account_id=payload["sub"], db=db)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Account not found")
-
     task = load_task(task_id_str=request.id, db=db)
+    update_data = parse_task_update(request)
+    redescribed = changes_detection_fields(task, update_data)
 
-    from uuid import UUID
+    task = apply_task_update(task_id=task.id, update_data=update_data, db=db)
 
-    update_data = request.model_dump(exclude_unset=True)
-    update_data["id"] = UUID(update_data["id"])
-    update_data["project_id"] = UUID(update_data["project_id"])
-    update_data["assigned_to"] = UUID(update_data["assigned_to"])
-    if update_data.get("parent_task_id"):
-        update_data["parent_task_id"] = UUID(update_data["parent_task_id"])
+    if redescribed:
+        _queue_detection([task])
 
-    for key, value in update_data.items():
-        setattr(task, key, value)
-
-    db.commit()
-    db.refresh(task)
     return task
 
 
@@ -605,20 +665,8 @@ def update_task(
 def create_new_company(
     company_data: company_model.CompanyCreate,
     db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
+    account: Account = Depends(current_account),
 ):
-    try:
-        payload = decode_jwt(token)
-    except Exception as e:
-        raise HTTPException(
-            status_code=401, detail=f"Token is invalid or expired: {str(e)}"
-        )
-
-    try:
-        load_account(account_id=payload["sub"], db=db)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Account not found")
-
     company = create_company(company_data=company_data, db=db)
     return company
 
@@ -626,23 +674,51 @@ def create_new_company(
 @app.get("/companies/logo")
 def get_company_logo(
     db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
+    account: Account = Depends(current_account),
 ):
-    try:
-        payload = decode_jwt(token)
-    except Exception as e:
-        raise HTTPException(
-            status_code=401, detail=f"Token is invalid or expired: {str(e)}"
-        )
-
-    try:
-        account = load_account(account_id=payload["sub"], db=db)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Account not found")
-
     try:
         company = load_company(company_id=account.company_id, db=db)
     except Exception:
         return ""
 
     return company.logo
+
+
+# ? Export Endpoints
+
+
+def _export_scope(table_name: str, account: Account):
+    """Condition limiting an export to the rows the account may see: its projects and their tasks, and its own company."""
+    table = Base.metadata.tables[table_name]
+    if table_name == "projects":
+        return table.c.id.in_(visible_project_ids(account))
+    if table_name == "tasks":
+        return table.c.project_id.in_(visible_project_ids(account))
+    if account.company_id is None:
+        return table.c.id == account.id if table_name == "accounts" else false()
+    if table_name == "accounts":
+        return table.c.company_id == account.company_id
+    return table.c.id == account.company_id
+
+
+@app.get("/export/{table_name}")
+def export_table(
+    table_name: str,
+    format: str = "pipe",
+    db: Session = Depends(get_db),
+    account: Account = Depends(current_account),
+):
+    """
+    Stream a table as pipe separated text, CSV or NDJSON. Rows are read in chunks and sent as they
+    are formatted, so the whole table is never held in memory.
+    Only the rows the account may see are exported, see _export_scope.
+    """
+    if table_name not in EXPORTABLE_TABLES:
+        raise HTTPException(status_code=404, detail="Table not found")
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown export format: {format}")
+
+    return StreamingResponse(
+        stream_table(table_name, format, where=_export_scope(table_name, account)),
+        media_type=EXPORT_MEDIA_TYPES[format],
+    )
@@ -1,3 +1,3 @@
-from .models import Company, Account, Project, Task, task_account_association, Base
+from .models import Company, Account, Project, Task, task_account_association, task_dependency_association, task_detected_dependency_association, ProjectProgress, Base
 
-__all__ = ["Company", "Account", "Project", "Task", "task_account_association", "Base"]
\ No newline at end of file
+__all__ = ["Company", "Account", "Project", "Task", "task_account_association", "task_dependency_association", "task_detected_dependency_association", "ProjectProgress", "Base"]
\ No newline at end of file
@@ -7,7 +7,10 @@ from sqlalchemy import (
     ForeignKey,
     DateTime,
     Boolean,
+    Index,
     Table,
+    UniqueConstraint,
+    text,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -28,6 +31,27 @@ task_account_association = Table(
 This table is used to create a many-to-many relationship between Task and Account.
 """
 
+task_dependency_association = Table(
+    "task_dependency_association",
+    Base.metadata,
+    Column("task_id", UUID(as_uuid=True), ForeignKey("tasks.id"), index=True),
+    Column("dependency_id", UUID(as_uuid=True), ForeignKey("tasks.id"), index=True),
+)
+"""
+This table stores the detected dependency graph. Each row links a task to one of the tasks listed as its dependencies.
+"""
+
+task_detected_dependency_association = Table(
+    "task_detected_dependency_association",
+    Base.metadata,
+    Column("task_id", UUID(as_uuid=True), ForeignKey("tasks.id"), index=True),
+    Column("dependency_id", UUID(as_uuid=True), ForeignKey("tasks.id"), index=True),
+)
+"""
+This table stores every edge the detectors found, before cycles are broken and transitive edges removed.
+Incremental detection merges into this graph and reduces it again, so an edge implied by a path that later goes away is kept.
+"""
+
 
 class Account(Base):
     """
@@ -221,4 +245,40 @@ class Company(Base):
     
     task_limit = Column(Integer, default=0, nullable=False)
     
-    logo = Column(String, nullable=True)
\ No newline at end of file
+    logo = Column(String, nullable=True)
+
+class ProjectProgress(Base):
+    """
+    Task counters of a project, kept up to date by every task write so dashboards never recount the task tree.
+    There is one row for the whole project, as its manager sees it, and one row per account with tasks assigned in it.
+
+    Attributes:
+        id (int): Primary key.
+        project_id (UUID): Foreign key referencing the project the counters belong to.
+        account_id (UUID, optional): Account whose assigned tasks are counted, None for every task in the project.
+
+        total_tasks (int): Number of tasks.
+        finished_tasks (int): Number of finished tasks without subtasks.
+        remaining_tasks (int): Number of top level tasks that still have work left in them.
+    """
+
+    __tablename__ = "project_progress"
+    __table_args__ = (
+        UniqueConstraint("project_id", "account_id"),
+        # NULLs never compare equal, so the constraint above allows any number of project-wide rows
+        Index(
+            "uq_project_progress_project",
+            "project_id",
+            unique=True,
+            sqlite_where=text("account_id IS NULL"),
+            postgresql_where=text("account_id IS NULL"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id"), nullable=False, index=True)
+    account_id = Column(UUID(as_uuid=True), ForeignKey("accounts.id"), nullable=True)
+
+    total_tasks = Column(Integer, default=0, nullable=False)
+    finished_tasks = Column(Integer, default=0, nullable=False)
+    remaining_tasks = Column(Integer, default=0, nullable=False)
@@ -1,6 +1,6 @@
 from datetime import datetime
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, Optional
 from uuid import UUID
 
 class ProjectBase(BaseModel):
@@ -55,4 +55,23 @@ class ProjectResponse(ProjectBase):
         is_finished (bool): Boolean indicating if the project is finished.
     """
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ProjectSummary(ProjectResponse):
+    """
+    A project as listed by /projects/get-projects.
+
+    Attributes:
+        tasks_remaining (int): Number of top level tasks not yet completed that the account can see.
+    """
+    tasks_remaining: int
+
+
+class ProjectTasksResponse(BaseModel):
+    """
+    Attributes:
+        project (ProjectResponse): The project.
+        tasks (dict): Task IDs of the top level tasks the account can see, each mapped to the same structure for its subtasks, in order.
+    """
+    project: ProjectResponse
+    tasks: Dict[UUID, dict]
@@ -110,4 +110,41 @@ class TaskUpdate(BaseModel):
     is_finished: Optional[bool]
     
     task_human_estimated_man_hours: Optional[float]
-    task_AI_estimated_man_hours: Optional[float]
\ No newline at end of file
+    task_AI_estimated_man_hours: Optional[float]
+
+class TaskBulkCreateItem(TaskCreate):
+    """
+    Attributes:
+        ref (str, optional): Client chosen reference that other tasks in the same batch can use as their parent_task_ref.
+        parent_task_ref (str, optional): ref of another task in the same batch that is the parent of this task.
+        parent_task_id (str, optional): Foreign key referencing an existing parent task. Cannot be combined with parent_task_ref.
+    """
+    ref: Optional[str] = None
+    parent_task_ref: Optional[str] = None
+    parent_task_id: Optional[str] = None
+
+
+class TaskBulkCreate(BaseModel):
+    """
+    Attributes:
+        tasks (List[TaskBulkCreateItem]): Tasks to create in a single transaction.
+    """
+    tasks: list[TaskBulkCreateItem]
+
+
+class TaskBulkUpdate(BaseModel):
+    """
+    Attributes:
+        tasks (List[TaskUpdate]): Task updates to apply in a single transaction.
+    """
+    tasks: list[TaskUpdate]
+
+
+class TaskBulkResponse(BaseModel):
+    """
+    Attributes:
+        tasks (List[TaskResponse]): The created or updated tasks, in request order.
+        refs (Dict[str, UUID]): IDs of the created tasks, keyed by their ref.
+    """
+    tasks: list[TaskResponse]
+    refs: dict[str, UUID] = {}
@@ -1,39 +1,91 @@
 """ This module is used to import all the services in the application. """
 
-from .auth_service import create_access_token, create_refresh_token, decode_jwt
-from .db_service import get_db, fetch_table_data, save_table_to_file, custom_serializer, convert_to_json, convert_uuid_keys_to_str
+from .auth_service import create_access_token, create_refresh_token, decode_jwt, token_cache
+from .db_service import get_db, get_async_db, async_engine, fetch_table_data, save_table_to_file, stream_table, EXPORTABLE_TABLES, EXPORT_MEDIA_TYPES, column_serializer, custom_serializer, convert_to_json, convert_uuid_keys_to_str
 from .email_service import send_email
-from .account_service import load_account, create_account, authenticate_account, load_accounts
-from .project_service import load_project, create_project, load_projects, update_project, delete_project
-from .task_service import load_task, create_task, load_project_tasks, delete_task
+from .account_service import load_account, load_account_async, create_account, authenticate_account, authenticate_account_async, load_accounts
+from .project_service import load_project, load_project_async, create_project, load_projects, load_projects_async, update_project, delete_project, serialize_project, visible_project_ids, can_view_project
+from .task_service import load_task, create_task, load_project_tasks, load_project_tasks_async, delete_task, delete_task_rows, build_task_tree, load_task_subtree, apply_task_update, parse_task_update, changes_detection_fields, create_tasks, update_tasks
 from .company_service import load_company, create_company, fetch_logo, create_company_with_details
+from .progress_service import refresh_project_progress, load_project_progress, repair_project_progress, snapshot_progress, apply_progress_delta
+from .notification_service import connection_manager, project_channel, company_channel
+from .change_service import resolve_channel
+from .principal_service import oauth2_scheme, current_account, current_account_async, authenticate_token, principal_cache
+from .password_service import password_hasher, PasswordHasherBusy
+from .detection_job_service import job_manager, JobQueueFull
+from .dependency_service import load_project_dependencies, save_project_dependencies, detect_project_dependencies, update_task_dependencies
 
 __all__ = [
     "load_account",
+    "load_account_async",
     "load_project",
+    "load_project_async",
     "load_task",
     "load_accounts",
     "load_company",
     "load_projects",
+    "load_projects_async",
     "load_project_tasks",
+    "load_project_tasks_async",
+    "build_task_tree",
+    "load_task_subtree",
+    "apply_task_update",
+    "parse_task_update",
+    "changes_detection_fields",
+    "create_tasks",
+    "update_tasks",
     "create_account",
     "create_project",
     "create_task",
     "create_access_token",
     "create_refresh_token",
     "decode_jwt",
+    "token_cache",
+    "oauth2_scheme",
+    "current_account",
+    "current_account_async",
+    "authenticate_token",
+    "principal_cache",
+    "password_hasher",
+    "PasswordHasherBusy",
     "get_db",
+    "get_async_db",
+    "async_engine",
     "send_email",
     "authenticate_account",
+    "authenticate_account_async",
     "fetch_table_data",
     "save_table_to_file",
+    "stream_table",
+    "EXPORTABLE_TABLES",
+    "EXPORT_MEDIA_TYPES",
     "update_project",
     "custom_serializer",
     "convert_to_json",
     "convert_uuid_keys_to_str",
+    "column_serializer",
+    "serialize_project",
+    "visible_project_ids",
+    "can_view_project",
     "delete_task",
+    "delete_task_rows",
     "delete_project",
     "fetch_logo",
     "create_company",
     "create_company_with_details",
+    "load_project_dependencies",
+    "save_project_dependencies",
+    "detect_project_dependencies",
+    "update_task_dependencies",
+    "refresh_project_progress",
+    "load_project_progress",
+    "repair_project_progress",
+    "snapshot_progress",
+    "apply_progress_delta",
+    "connection_manager",
+    "project_channel",
+    "company_channel",
+    "resolve_channel",
+    "job_manager",
+    "JobQueueFull",
 ]
\ No newline at end of file
@@ -1,30 +1,35 @@
 from typing import Optional
 from fastapi import Depends
-from sqlalchemy.orm import Session
-from models import Account
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from models import Account, Company
 from utils import hash_password
 from schemas import account_model
 import uuid
-from .db_service import get_db
+from .db_service import get_async_db, get_db
 from .company_service import load_company, create_company_with_details
+from .password_service import password_hasher
 from schemas.company_model import CompanyBase
 
-from utils import verify_password
+from utils import needs_rehash, verify_password
 
 
 def create_account(
     account_data: account_model.AccountCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    password_hash: Optional[str] = None,
 ) -> Account:
     """
     Create a new account in the database.
     This is for creating any account, whether it is a company account or not.
+    password_hash may be passed if the password has already been hashed, e.g. by password_hasher.
     """
     
     new_account = Account(
         name=account_data.name,
         email=account_data.email,
-        password_hash=hash_password(account_data.password),
+        password_hash=password_hash or hash_password(account_data.password),
         position=account_data.position,
         free_plan=account_data.free_plan,
         task_limit=account_data.task_limit,
@@ -88,6 +93,42 @@ def load_account(
     return query
 
 
+def account_response_options():
+    """
+    Loader options for everything AccountResponse reads: Account.manager walks the account's company and its accounts.
+    Built on call, since Account.company is a backref that only exists once the mappers are configured.
+    """
+    return selectinload(Account.company).selectinload(Company.accounts)
+
+
+async def load_account_async(
+    account_id: Optional[uuid.UUID] = None,
+    account_id_str: Optional[str] = None,
+    email: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+) -> Account:
+    """
+    Async version of load_account, for handlers that must not block the event loop.
+    The account's company and its accounts are loaded with it, since async sessions cannot lazy-load them.
+    """
+    if account_id_str:
+        account_id = uuid.UUID(account_id_str)
+
+    statement = select(Account).options(account_response_options())
+    account = None
+    if account_id:
+        account = await db.scalar(statement.where(Account.id == account_id))
+    elif email:
+        account = await db.scalar(statement.where(Account.email == email))
+
+    if not account:
+        raise ValueError(
+            "Account not found: ", account_id if account_id else email
+        )
+
+    return account
+
+
 def create_password(form_data: dict, db: Session = Depends(get_db)):
     """
     This function is used to create a password for a pre-existing account. It will throw an error if the account does not exist.
@@ -113,6 +154,27 @@ def authenticate_account(email: str, password: str, db):
         plain_password=password, hashed_password=account.password_hash
     )
 
+    if needs_rehash(account.password_hash):
+        password_hasher.rehash_later(account.id, password, account.password_hash)
+
+    return account
+
+
+async def authenticate_account_async(email: str, password: str, db: AsyncSession):
+    """
+    Async version of authenticate_account. The password is checked on password_hasher's worker pool.
+
+    :raises PasswordHasherBusy: If too many password checks are already pending.
+    """
+    account = await load_account_async(email=email, db=db)
+
+    await password_hasher.verify(
+        plain_password=password, hashed_password=account.password_hash
+    )
+
+    if needs_rehash(account.password_hash):
+        password_hasher.rehash_later(account.id, password, account.password_hash)
+
     return account
 
 
@@ -1,9 +1,91 @@
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from fastapi import HTTPException
+from collections import OrderedDict
+from typing import Optional
 from constants import AUTH
+import hashlib
+import threading
+import time
 import uuid
 
+# "jose" verifies with python-jose, "pyjwt" with PyJWT (pip install PyJWT), which is faster per token
+JWT_BACKENDS = ("jose", "pyjwt")
+
+
+def get_jwt_backend() -> str:
+    backend = AUTH.JWT_BACKEND
+    if backend not in JWT_BACKENDS:
+        raise ValueError(f"Unknown JWT backend {backend!r}, expected one of {JWT_BACKENDS}")
+    return backend
+
+
+class VerifiedTokenCache:
+    """
+    Payloads of tokens whose signature has already been verified, so a token presented again skips the decode.
+
+    Entries are keyed by a digest of the whole token, signature included, so only the exact token that was
+    verified can hit. An entry lives until the token's own exp, and the least recently used entry is evicted
+    once the cache is full. Tokens without an exp are never cached. Clear the cache if the secret key changes.
+
+    Attributes:
+        size (int): Maximum number of cached tokens.
+        hits (int): Tokens answered from the cache.
+        misses (int): Tokens that had to be decoded.
+    """
+
+    def __init__(self, size: int = AUTH.TOKEN_CACHE_SIZE):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, key: bytes) -> Optional[dict]:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None or payload["exp"] <= time.time():
+                if payload is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(payload)
+
+    def put(self, key: bytes, payload: dict):
+        if payload.get("exp") is None or self.size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = dict(payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+token_cache = VerifiedTokenCache()
+
+
 def create_access_token(data: dict):
     expires_delta = timedelta(minutes=AUTH.ACCESS_TOKEN_EXPIRE_MINUTES)
     expire = datetime.now(timezone.utc) + expires_delta
@@ -16,12 +98,35 @@ def create_refresh_token(data: dict):
     to_encode = {"sub": str(data["sub"]), "exp": expire}
     return jwt.encode(to_encode, AUTH.SECRET_KEY, algorithm=AUTH.ALGORITHM)
 
+def verify_jwt(token: str) -> dict:
+    """
+    Check a token's signature and expiry with the configured backend and return its raw payload, never using the cache.
+
+    :raises JWTError: If the token is invalid or expired, whichever backend checked it.
+    """
+    if get_jwt_backend() == "pyjwt":
+        import jwt as pyjwt
+
+        try:
+            return pyjwt.decode(token, AUTH.SECRET_KEY, algorithms=[AUTH.ALGORITHM])
+        except pyjwt.PyJWTError as e:
+            raise JWTError(str(e))
+
+    return jwt.decode(token, AUTH.SECRET_KEY, algorithms=[AUTH.ALGORITHM])
+
 def decode_jwt(token: str) -> dict:
-    """Decode a JWT token and return the payload with the user swapped for a UUID"""
+    """Decode a JWT token and return the payload with the user swapped for a UUID. Tokens seen before are served from token_cache."""
+    key = token_cache.key(token)
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
+
     try:
-        payload = jwt.decode(token, AUTH.SECRET_KEY, algorithms=[AUTH.ALGORITHM])
+        payload = verify_jwt(token)
         id: uuid.UUID = uuid.UUID(payload.pop("sub"))
         payload["sub"] = id
-        return payload
     except JWTError as e:
         raise HTTPException(status_code=401, detail=f"Invalid or expired token: {e}")
+
+    token_cache.put(key, payload)
+    return payload
@@ -0,0 +1,186 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from models import Account, Company, Project, Task
+from .db_service import SessionLocal
+from .notification_service import company_channel, connection_manager, project_channel
+
+# Columns that are never sent to clients
+EXCLUDED_COLUMNS = {"password_hash"}
+
+_PENDING_KEY = "pending_changes"
+
+
+def _channels(model, values: dict) -> list[str]:
+    """Return the channels that should hear about a change to a row of a model."""
+    if model is Task:
+        return [project_channel(values["project_id"])] if values.get("project_id") else []
+    if model is Project:
+        channels = [project_channel(values["id"])]
+        if values.get("company_id"):
+            channels.append(company_channel(values["company_id"]))
+        return channels
+    if model is Account:
+        return [company_channel(values["company_id"])] if values.get("company_id") else []
+    if model is Company:
+        return [company_channel(values["id"])]
+    return []
+
+
+def _serialize(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _change(instance, operation: str) -> dict:
+    """
+    Describe a flushed row change: every column for inserts, the changed columns for updates
+    and only the ID for deletes. Only attributes already loaded on the instance are read,
+    so building the change never queries the database mid-flush.
+    """
+    state = inspect(instance)
+    loaded = dict(state.dict)
+    if state.identity:
+        loaded.setdefault("id", state.identity[0])
+
+    columns = [
+        attribute.key
+        for attribute in state.mapper.column_attrs
+        if attribute.key not in EXCLUDED_COLUMNS
+    ]
+    if operation == "insert":
+        # Columns left unset were inserted as NULL
+        row = {key: _serialize(loaded.get(key)) for key in columns}
+    elif operation == "update":
+        row = {
+            key: _serialize(loaded[key])
+            for key in columns
+            if key in loaded and state.attrs[key].history.has_changes()
+        }
+        row["id"] = _serialize(loaded["id"])
+    else:
+        row = None
+
+    return {
+        "table": state.mapper.local_table.name,
+        "operation": operation,
+        "id": _serialize(loaded["id"]),
+        "row": row,
+        "channels": _channels(type(instance), loaded),
+    }
+
+
+def record_bulk_changes(session: Session, model, operation: str, rows: list[dict]):
+    """
+    Record rows written with Core statements, which bypass the flush listeners, so they are
+    published with the rest of the transaction. Rows must include the id.
+    """
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    columns = [
+        column.key
+        for column in model.__mapper__.column_attrs
+        if column.key not in EXCLUDED_COLUMNS
+    ]
+
+    for values in rows:
+        if operation == "insert":
+            row = {key: _serialize(values.get(key)) for key in columns}
+        else:
+            row = {key: _serialize(values[key]) for key in columns if key in values}
+        change = {
+            "table": model.__tablename__,
+            "operation": operation,
+            "id": _serialize(values["id"]),
+            "row": row if operation != "delete" else None,
+            "channels": _channels(model, values),
+        }
+        pending[(change["table"], change["id"])] = change
+
+
+def _record_changes(session: Session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    tracked = (Account, Company, Project, Task)
+
+    for operation, instances in (
+        ("insert", session.new),
+        ("update", session.dirty),
+        ("delete", session.deleted),
+    ):
+        for instance in instances:
+            if not isinstance(instance, tracked):
+                continue
+            if operation == "update" and not session.is_modified(instance, include_collections=False):
+                continue
+
+            change = _change(instance, operation)
+            key = (change["table"], change["id"])
+            previous = pending.get(key)
+            # Several flushes in one transaction are merged into a single change per row
+            if previous and previous["operation"] != "delete" and operation == "update":
+                change["operation"] = previous["operation"]
+                change["row"] = {**previous["row"], **change["row"]}
+            pending[key] = change
+
+
+def _publish_changes(session: Session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        connection_manager.publish_changes(pending.values())
+
+
+def _discard_changes(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def register_change_listeners(session_factory=SessionLocal):
+    """
+    Record the rows changed by every flush of sessions made by session_factory, and push
+    them to subscribed /ws clients once the transaction commits. Rolled back changes are never sent.
+    """
+    if event.contains(session_factory, "after_flush", _record_changes):
+        return
+
+    event.listen(session_factory, "after_flush", _record_changes)
+    event.listen(session_factory, "after_commit", _publish_changes)
+    event.listen(session_factory, "after_rollback", _discard_changes)
+
+
+def resolve_channel(account_id, project_id: str = None, company_id: str = None) -> str:
+    """
+    Return the channel an account wants to subscribe to, checking that it may see it.
+    Opens its own session, so no transaction is held open while the socket idles.
+
+    :raises ValueError: If the account, project or company does not exist.
+    :raises PermissionError: If the account is not part of the project or company.
+    """
+    from .project_service import can_view_project
+
+    with SessionLocal() as db:
+        account = db.get(Account, uuid.UUID(str(account_id)))
+        if account is None:
+            raise ValueError("Account not found")
+
+        if project_id:
+            project = db.get(Project, uuid.UUID(str(project_id)))
+            if project is None:
+                raise ValueError("Project not found")
+            if not can_view_project(account, project.id, db):
+                raise PermissionError("Not a member of this project")
+            return project_channel(project.id)
+
+        if company_id:
+            company = db.get(Company, uuid.UUID(str(company_id)))
+            if company is None:
+                raise ValueError("Company not found")
+            if company.id != account.company_id:
+                raise PermissionError("Not a member of this company")
+            return company_channel(company.id)
+
+    raise ValueError("Either project_id or company_id is required")
+
+
+register_change_listeners()
@@ -0,0 +1,84 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from constants import DATABASE
+
+# Drivers used by the async engine for each database
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def async_url(url: str) -> str:
+    """Swap the driver of a database URL for its asyncio driver, e.g. sqlite:// for sqlite+aiosqlite://."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for {backend} databases")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def engine_options(url: str, asyncio: bool = False) -> dict:
+    """
+    Keyword arguments for create_engine, or for create_async_engine if asyncio is set.
+
+    File databases, SQLite included, get a QueuePool sized by DATABASE.POOL_SIZE and DATABASE.MAX_OVERFLOW.
+    PostgreSQL connections are also checked before use and recycled before the server drops them.
+    """
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        options = {"connect_args": {"check_same_thread": False}}
+        if url.database in (None, "", ":memory:"):
+            # In-memory databases live and die with their one connection
+            return options
+    else:
+        options = {"pool_pre_ping": True, "pool_recycle": DATABASE.POOL_RECYCLE}
+
+    options.update(
+        poolclass=AsyncAdaptedQueuePool if asyncio else QueuePool,
+        pool_size=DATABASE.POOL_SIZE,
+        max_overflow=DATABASE.MAX_OVERFLOW,
+        pool_timeout=DATABASE.POOL_TIMEOUT,
+    )
+    return options
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, value in DATABASE.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+    finally:
+        cursor.close()
+
+
+def configure_engine(engine: Engine) -> Engine:
+    """Apply DATABASE.SQLITE_PRAGMAS to every connection a SQLite engine opens. Other engines are returned as is."""
+    if engine.dialect.name == "sqlite" and not event.contains(engine, "connect", _apply_sqlite_pragmas):
+        event.listen(engine, "connect", _apply_sqlite_pragmas)
+    return engine
+
+
+def create_database_engine(url: str = None) -> Engine:
+    """
+    Create the engine every synchronous session and raw connection of the application goes through.
+
+    :param url: Database URL, DATABASE.URL by default.
+    """
+    url = url or DATABASE.URL
+    return configure_engine(create_engine(url, **engine_options(url)))
+
+
+def create_async_database_engine(url: str = None) -> AsyncEngine:
+    """
+    Create the asyncio engine for the same database, with aiosqlite or asyncpg as the driver.
+
+    :param url: Synchronous database URL, DATABASE.URL by default.
+    """
+    url = url or DATABASE.URL
+    engine = create_async_engine(async_url(url), **engine_options(url, asyncio=True))
+    configure_engine(engine.sync_engine)
+    return engine
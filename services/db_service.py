@@ -1,16 +1,35 @@
-from sqlalchemy import create_engine
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from models import Base
-from constants import DATABASE
-import sqlite3
+from constants import EXPORT
+from operator import attrgetter
+from typing import Callable, Iterator
+import csv
+import io
+import json
+import logging
 import os
 from collections import OrderedDict
 import uuid
 from sqlalchemy.ext.declarative import DeclarativeMeta
 
-engine = create_engine(DATABASE.URL, connect_args={"check_same_thread": False})
+from .db_config import create_async_database_engine, create_database_engine
+
+logger = logging.getLogger(__name__)
+
+engine = create_database_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async sessions share the listeners registered on SessionLocal through its session class
+async_engine = create_async_database_engine()
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    sync_session_class=SessionLocal.class_,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base.metadata.create_all(bind=engine)
 
 def get_db():
@@ -21,53 +40,143 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Tables that may be exported, and columns that are never exported
+EXPORTABLE_TABLES = {"tasks", "projects", "accounts", "companies"}
+EXCLUDED_EXPORT_COLUMNS = {"password_hash"}
+
+EXPORT_MEDIA_TYPES = {
+    "pipe": "text/plain",
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _format_pipe(columns: list[str], rows, header: bool) -> str:
+    lines = []
+    if header:
+        lines.append(" | ".join(columns))
+        lines.append("-" * 100)  # To visually separate headers
+    lines.extend(" | ".join(str(value) for value in row) for row in rows)
+    return "".join(line + "\n" for line in lines)
+
+
+def _format_csv(columns: list[str], rows, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows(
+        ["" if value is None else str(value) for value in row] for row in rows
+    )
+    return buffer.getvalue()
+
+
+def _format_ndjson(columns: list[str], rows, header: bool) -> str:
+    return "".join(
+        json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows
+    )
+
+
+_EXPORT_FORMATTERS = {
+    "pipe": _format_pipe,
+    "csv": _format_csv,
+    "ndjson": _format_ndjson,
+}
+
+
+def stream_table(
+    table_name: str, format: str = "pipe", chunk_size: int = EXPORT.CHUNK_SIZE, where=None
+) -> Iterator[str]:
+    """
+    Yield a table export chunk by chunk, reading chunk_size rows from the cursor at a time,
+    so memory use does not grow with the size of the table.
+
+    :param table_name: One of EXPORTABLE_TABLES.
+    :param format: "pipe" (the original | separated text), "csv" or "ndjson".
+    :param where: Optional condition on the table's columns limiting the rows exported.
+    :raises ValueError: If the table or format is not supported.
+    """
+    if table_name not in EXPORTABLE_TABLES:
+        raise ValueError(f"Table cannot be exported: {table_name}")
+    if format not in _EXPORT_FORMATTERS:
+        raise ValueError(f"Unknown export format: {format}")
+
+    table = Base.metadata.tables[table_name]
+    columns = [column for column in table.columns if column.name not in EXCLUDED_EXPORT_COLUMNS]
+    names = [column.name for column in columns]
+    formatter = _EXPORT_FORMATTERS[format]
+    query = select(*columns) if where is None else select(*columns).where(where)
+
+    with engine.connect() as connection:
+        result = connection.execution_options(yield_per=chunk_size).execute(query)
+        rows = result.fetchmany(chunk_size)
+        yield formatter(names, rows, True)
+        while rows:
+            rows = result.fetchmany(chunk_size)
+            yield formatter(names, rows, False)
+
+
 def fetch_table_data(table_name):
     """
-    This function fetches the table data from SQLite database and formats it as a string.
-    The table name is passed in, so you can dynamically query any table.
+    This function fetches the table data from the database and formats it as a pipe separated string.
+    Prefer stream_table for large tables, which never holds the whole table in memory.
     """
-    conn = sqlite3.connect("chello.db")
-    cursor = conn.cursor()
-    
-    # Query the table data dynamically based on the table name
-    cursor.execute(f"SELECT * FROM {table_name}")
-    rows = cursor.fetchall()
-
-    # Format the rows into a string
-    formatted_data = " | ".join([description[0] for description in cursor.description]) + "\n"
-    formatted_data += "-" * 100 + "\n"  # To visually separate headers
-    for row in rows:
-        formatted_data += " | ".join(str(value) for value in row) + "\n"
-
-    conn.close()
-    return formatted_data
-
-def save_table_to_file(table_name, data):
+    return "".join(stream_table(table_name))
+
+
+def save_table_to_file(table_name, data=None, format: str = "pipe"):
     """
     This function saves the table data to a text file named after the table.
+    data may be a string or an iterable of chunks; if it is omitted the table is streamed straight to the file.
+    """
+    if data is None:
+        data = stream_table(table_name, format)
+    elif isinstance(data, str):
+        data = [data]
+
+    extension = "txt" if format == "pipe" else format
+    os.makedirs(EXPORT.DIRECTORY, exist_ok=True)
+    file_path = os.path.join(EXPORT.DIRECTORY, f"{table_name}.{extension}")
+    with open(file_path, "w", buffering=EXPORT.WRITE_BUFFER_SIZE, newline="") as file:
+        for chunk in data:
+            file.write(chunk)
+
+
+def column_serializer(model) -> Callable[[object], dict]:
     """
-    file_path = os.path.join("tables", f"{table_name}.txt")
-    with open(file_path, "w") as file:
-        file.write(data)
+    Build a function that returns the column values of an instance of model as a dictionary, looking the columns up once
+    instead of on every call. Unlike instance.__dict__, the result never includes SQLAlchemy's _sa_instance_state,
+    and it holds only UUIDs, datetimes and plain values, which orjson serializes natively.
+    """
+    keys = tuple(attribute.key for attribute in inspect(model).column_attrs)
+    getter = attrgetter(*keys)
+    if len(keys) == 1:
+        return lambda instance: {keys[0]: getter(instance)}
+    return lambda instance: dict(zip(keys, getter(instance)))
+
 
 def custom_serializer(obj):
-    print("Custom serializer called")
     obj_type = type(obj)
-    print(f"Serializing object of type {obj_type}")
+    logger.debug("Serializing object of type %s", obj_type)
     if isinstance(obj, OrderedDict):
-        print(f"Serializing OrderedDict: {obj}")
+        logger.debug("Serializing OrderedDict: %s", obj)
         return {custom_serializer(k): custom_serializer(v) for k, v in obj.items()}
     if isinstance(obj, uuid.UUID):
-        print(f"Serializing UUID: {obj}")
+        logger.debug("Serializing UUID: %s", obj)
         return str(obj)
     if isinstance(obj.__class__, DeclarativeMeta):
         # SQLAlchemy model instance
-        print(f"Serializing SQLAlchemy model: {obj}")
+        logger.debug("Serializing SQLAlchemy model: %s", obj)
         return {c.name: getattr(obj, c.name) for c in obj.__table__.columns}
     if hasattr(obj, '__dict__'):
-        print(f"Serializing object with __dict__: {obj}")
+        logger.debug("Serializing object with __dict__: %s", obj)
         return obj.__dict__
-    print(f"TypeError: Object of type {obj.__class__.__name__} is not JSON serializable")
+    logger.warning("Object of type %s is not JSON serializable", obj.__class__.__name__)
     raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
 
 def convert_uuid_keys_to_str(data):
@@ -80,10 +189,9 @@ def convert_uuid_keys_to_str(data):
 
 def convert_to_json(data):
     try:
-        print("Converting to JSON")
-        print(f"Data to be serialized: {data}")
+        logger.debug("Converting to JSON: %s", data)
         data_with_str_keys = convert_uuid_keys_to_str(data)
         return data_with_str_keys
     except TypeError as e:
-        print(f"Serialization error: {e}")
+        logger.error("Serialization error: %s", e)
         raise e
\ No newline at end of file
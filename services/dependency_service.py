@@ -0,0 +1,116 @@
+import uuid
+from typing import Callable, Optional
+from fastapi import Depends
+from sqlalchemy.orm import Session
+from models import Task, task_dependency_association, task_detected_dependency_association
+from .db_service import get_db, SessionLocal
+from .task_service import load_task
+
+
+def load_project_dependencies(
+    project_id: uuid.UUID, db: Session = Depends(get_db), table=task_dependency_association
+) -> dict[uuid.UUID, list[uuid.UUID]]:
+    """
+    Load the stored dependency graph of a project.
+    Every task in the project is a key, even if it has no dependencies.
+    Pass table=task_detected_dependency_association for the unreduced graph.
+    """
+    task_ids = [
+        task_id for (task_id,) in db.query(Task.id).filter(Task.project_id == project_id)
+    ]
+    dependencies = {task_id: [] for task_id in task_ids}
+
+    rows = (
+        db.query(table)
+        .filter(table.c.task_id.in_(task_ids))
+        .all()
+    )
+    for task_id, dependency_id in rows:
+        dependencies[task_id].append(dependency_id)
+
+    return dependencies
+
+
+def _replace_project_rows(project_id: uuid.UUID, dependencies: dict, table, db: Session):
+    project_tasks = db.query(Task.id).filter(Task.project_id == project_id)
+
+    db.query(table).filter(
+        table.c.task_id.in_(project_tasks.scalar_subquery())
+    ).delete(synchronize_session=False)
+
+    rows = [
+        {"task_id": task_id, "dependency_id": dependency_id}
+        for task_id, deps in dependencies.items()
+        for dependency_id in deps
+    ]
+    if rows:
+        db.execute(table.insert().values(rows))
+
+
+def save_project_dependencies(
+    project_id: uuid.UUID,
+    dependencies: dict[uuid.UUID, list[uuid.UUID]],
+    db: Session = Depends(get_db),
+    detected: Optional[dict[uuid.UUID, list[uuid.UUID]]] = None,
+):
+    """
+    Replace the stored dependency graph of a project in a single transaction.
+    detected is the unreduced graph it was built from, stored alongside it for incremental detection to merge into.
+    """
+    _replace_project_rows(project_id, dependencies, task_dependency_association, db)
+    if detected is not None:
+        _replace_project_rows(project_id, detected, task_detected_dependency_association, db)
+
+    db.commit()
+
+
+def _project_task_texts(project_id: uuid.UUID, db: Session):
+    """Return the descriptions and names of every task in a project, keyed by task ID."""
+    tasks = db.query(Task).filter(Task.project_id == project_id).all()
+    descriptions = {task.id: task.description or task.name for task in tasks}
+    names = {task.id: task.name for task in tasks}
+    return descriptions, names
+
+
+def detect_project_dependencies(
+    project_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    progress: Optional[Callable[[int, int], None]] = None,
+):
+    """
+    Run full dependency detection over a project and store the result.
+    progress is called with (pairs scored, total pairs) while the models run.
+    """
+    from backend_logic.dependency_detection.detect_dependencies import detect_raw_dependencies
+    from backend_logic.dependency_detection.graph_postprocessing import postprocess_dependencies
+
+    descriptions, names = _project_task_texts(project_id, db)
+    detected = detect_raw_dependencies(descriptions, names=names, progress=progress)
+    dependencies = postprocess_dependencies(detected)
+    save_project_dependencies(project_id, dependencies, db, detected=detected)
+    return dependencies
+
+
+def update_task_dependencies(task_id: uuid.UUID):
+    """
+    Incrementally re-detect the dependencies of one new or edited task and merge them into the stored graph of its project.
+    Opens its own session, since it is meant to run after the response has been sent.
+    """
+    from backend_logic.dependency_detection.detect_dependencies import detect_task_dependencies
+
+    db = SessionLocal()
+    try:
+        task = load_task(task_id=task_id, db=db)
+        descriptions, names = _project_task_texts(task.project_id, db)
+        detected = load_project_dependencies(task.project_id, db, table=task_detected_dependency_association)
+        if not any(detected.values()):
+            # Graphs stored before the unreduced edges were kept have only the reduced graph to merge into
+            detected = load_project_dependencies(task.project_id, db)
+
+        detected, dependencies = detect_task_dependencies(
+            task.id, descriptions, detected, names=names
+        )
+        save_project_dependencies(task.project_id, dependencies, db, detected=detected)
+        return dependencies
+    finally:
+        db.close()
@@ -0,0 +1,222 @@
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Iterable, Optional
+from constants import JOBS
+from .db_service import SessionLocal
+from .dependency_service import detect_project_dependencies, update_task_dependencies
+from .notification_service import connection_manager, project_channel
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once it has been cancelled."""
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class DetectionJob:
+    """
+    Attributes:
+        id (UUID): Unique identifier for the job.
+        project_id (UUID): Project whose dependencies are being detected.
+        task_ids (set, optional): New or edited tasks to re-detect incrementally, None to detect the whole project.
+        status (str): One of "queued", "running", "completed", "failed" or "cancelled".
+        done (int): Number of task pairs scored so far, or of tasks re-detected for an incremental job.
+        total (int): Number of task pairs to score, or of tasks to re-detect, 0 until the work starts.
+        error (str, optional): Error message if the job failed.
+        created (DateTime): Date and time the job was submitted.
+        finished (DateTime, optional): Date and time the job stopped.
+    """
+
+    ACTIVE = ("queued", "running")
+
+    def __init__(self, project_id: uuid.UUID, task_ids: Optional[Iterable[uuid.UUID]] = None):
+        self.id = uuid.uuid4()
+        self.project_id = project_id
+        self.task_ids = None if task_ids is None else set(task_ids)
+        self.status = "queued"
+        self.done = 0
+        self.total = 0
+        self.error = None
+        self.created = datetime.now(timezone.utc)
+        self.finished = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        return self.status in self.ACTIVE
+
+    def to_dict(self) -> dict:
+        return {
+            "id": str(self.id),
+            "project_id": str(self.project_id),
+            "task_ids": None if self.task_ids is None else [str(task_id) for task_id in self.task_ids],
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "progress": (
+                f"scored {self.done}/{self.total} pairs" if self.task_ids is None
+                else f"re-detected {self.done}/{self.total} tasks"
+            ),
+            "error": self.error,
+            "created": self.created.isoformat(),
+            "finished": self.finished.isoformat() if self.finished else None,
+        }
+
+
+class DetectionJobManager:
+    """
+    Runs dependency detection jobs on a bounded worker pool. Every write of a project's dependency graph,
+    full or incremental, goes through here, and jobs of the same project run one at a time so none overwrites another's result.
+
+    Submitting a project that already has a queued job merges into that job, and submitting full detection while it
+    is running returns the running job, instead of starting another. Incremental detection submitted while a job
+    is running is queued behind it, since the running job may have read the tasks before the edit.
+    Progress and status changes are pushed to /ws clients subscribed to the project.
+    """
+
+    def __init__(
+        self,
+        workers: int = JOBS.WORKERS,
+        max_pending: int = JOBS.MAX_PENDING,
+        history: int = JOBS.HISTORY,
+        notify: Callable[[dict, str], None] = connection_manager.publish,
+    ):
+        self.max_pending = max_pending
+        self.history = history
+        self.notify = notify
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="detection-job")
+        self._jobs: OrderedDict[uuid.UUID, DetectionJob] = OrderedDict()
+        self._by_project: dict[uuid.UUID, DetectionJob] = {}
+        self._project_locks: dict[uuid.UUID, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self, project_id: uuid.UUID, task_ids: Optional[Iterable[uuid.UUID]] = None
+    ) -> DetectionJob:
+        """
+        Queue detection for a project, or return the job that will cover it.
+
+        :param task_ids: New or edited tasks to re-detect incrementally. None detects the whole project.
+        """
+        with self._lock:
+            existing = self._by_project.get(project_id)
+            if existing and existing.cancel_event.is_set():
+                existing = None
+            if existing and existing.status == "queued":
+                # Full detection covers every edit, and incremental edits of a queued job are re-detected together
+                if task_ids is None or existing.task_ids is None:
+                    existing.task_ids = None
+                else:
+                    existing.task_ids.update(task_ids)
+                return existing
+            if existing and existing.active and task_ids is None and existing.task_ids is None:
+                return existing
+
+            pending = sum(1 for job in self._jobs.values() if job.active)
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"{pending} detection jobs are already queued")
+
+            job = DetectionJob(project_id, task_ids)
+            self._jobs[job.id] = job
+            self._by_project[project_id] = job
+            self._project_locks.setdefault(project_id, threading.Lock())
+            self._prune()
+
+        self._executor.submit(self._run, job)
+        self._publish(job)
+        return job
+
+    def get(self, job_id: uuid.UUID) -> Optional[DetectionJob]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: uuid.UUID) -> Optional[DetectionJob]:
+        """Ask a job to stop. Queued jobs never start; running jobs stop at their next progress report."""
+        job = self._jobs.get(job_id)
+        if job and job.active:
+            job.cancel_event.set()
+        return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {status: statuses.count(status) for status in set(statuses)}
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the history limit."""
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[: max(len(self._jobs) - self.history, 0)]:
+            job = self._jobs.pop(job_id)
+            if self._by_project.get(job.project_id) is job:
+                del self._by_project[job.project_id]
+                del self._project_locks[job.project_id]
+
+    def _publish(self, job: DetectionJob):
+        self.notify({"type": "dependency_detection", "job": job.to_dict()}, project_channel(job.project_id))
+
+    def _run(self, job: DetectionJob):
+        # Held for the whole job, so a job queued behind another of the same project waits for it to write its result
+        with self._project_locks[job.project_id]:
+            with self._lock:
+                if job.cancel_event.is_set():
+                    job.status = "cancelled"
+                else:
+                    # Submissions stop merging into the job once it is running
+                    job.status = "running"
+                task_ids = None if job.task_ids is None else list(job.task_ids)
+
+            if job.status == "cancelled":
+                self._finish(job, "cancelled")
+                return
+            self._publish(job)
+
+            def progress(done: int, total: int):
+                if job.cancel_event.is_set():
+                    raise JobCancelled()
+                job.done, job.total = done, total
+                self._publish(job)
+
+            try:
+                if task_ids is None:
+                    self._detect_project(job, progress)
+                else:
+                    self._detect_tasks(task_ids, progress)
+                self._finish(job, "completed")
+            except JobCancelled:
+                self._finish(job, "cancelled")
+            except Exception as e:
+                job.error = str(e)
+                self._finish(job, "failed")
+
+    def _detect_project(self, job: DetectionJob, progress: Callable[[int, int], None]):
+        db = SessionLocal()
+        try:
+            detect_project_dependencies(job.project_id, db, progress=progress)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _detect_tasks(self, task_ids: list[uuid.UUID], progress: Callable[[int, int], None]):
+        progress(0, len(task_ids))
+        for done, task_id in enumerate(task_ids, 1):
+            try:
+                update_task_dependencies(task_id)
+            except ValueError:
+                # Deleted since it was edited, which leaves nothing to re-detect
+                pass
+            progress(done, len(task_ids))
+
+    def _finish(self, job: DetectionJob, status: str):
+        with self._lock:
+            job.status = status
+        job.finished = datetime.now(timezone.utc)
+        self._publish(job)
+
+
+job_manager = DetectionJobManager()
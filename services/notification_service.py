@@ -0,0 +1,255 @@
+import asyncio
+import uuid
+from collections import deque
+from typing import Iterable, Optional
+from fastapi import WebSocket
+from constants import NOTIFICATIONS
+
+
+def project_channel(project_id: uuid.UUID) -> str:
+    return f"project:{project_id}"
+
+
+def company_channel(company_id: uuid.UUID) -> str:
+    return f"company:{company_id}"
+
+
+def _coalesce(queued: dict, message: dict) -> Optional[dict]:
+    """
+    Merge message into a queued message that it supersedes, or return None if it does not supersede it.
+    Messages are shared between clients, so neither is modified.
+
+    Two "changes" messages of the same channel merge into one, keeping the latest change of each row.
+    A "dependency_detection" message replaces the queued status of the same job.
+    """
+    if queued.get("type") != message.get("type") or queued.get("channel") != message.get("channel"):
+        return None
+
+    if message["type"] == "changes":
+        changes = {(change["table"], change["id"]): change for change in queued["changes"]}
+        for change in message["changes"]:
+            key = (change["table"], change["id"])
+            previous = changes.get(key)
+            if previous and previous["row"] is not None and change["row"] is not None:
+                change = {**change, "operation": previous["operation"], "row": {**previous["row"], **change["row"]}}
+            changes[key] = change
+        return {**queued, "changes": list(changes.values())}
+
+    if message["type"] == "dependency_detection" and queued["job"]["id"] == message["job"]["id"]:
+        return message
+
+    return None
+
+
+class Client:
+    """
+    A connected /ws socket with its own bounded send queue, drained by a dedicated sender task.
+
+    When the queue is full a new message is first coalesced into a queued message it supersedes.
+    If nothing can be coalesced, or the policy is "drop", the oldest queued message is dropped.
+
+    Attributes:
+        websocket (WebSocket): The client's socket.
+        channels (set[str]): Channels the client is subscribed to.
+        queue_size (int): Maximum number of messages waiting to be sent.
+        policy (str): "coalesce" or "drop".
+        sent (int): Messages sent.
+        coalesced (int): Messages merged into one already queued.
+        dropped (int): Messages discarded because the client fell behind.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        queue_size: int = NOTIFICATIONS.CLIENT_QUEUE_SIZE,
+        policy: str = NOTIFICATIONS.OVERFLOW_POLICY,
+    ):
+        self.websocket = websocket
+        self.channels: set[str] = set()
+        self.queue_size = queue_size
+        self.policy = policy
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self._queue: deque[dict] = deque()
+        self._ready = asyncio.Event()
+        self._sender: asyncio.Task = None
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def start(self, on_error):
+        self._sender = asyncio.create_task(self._send_loop(on_error))
+
+    def stop(self):
+        if self._sender:
+            self._sender.cancel()
+
+    def offer(self, message: dict):
+        """Queue a message without waiting, applying the overflow policy if the queue is full."""
+        if len(self._queue) >= self.queue_size:
+            if self.policy == "coalesce":
+                for i in range(len(self._queue) - 1, -1, -1):
+                    merged = _coalesce(self._queue[i], message)
+                    if merged is not None:
+                        self._queue[i] = merged
+                        self.coalesced += 1
+                        return
+            self._queue.popleft()
+            self.dropped += 1
+
+        self._queue.append(message)
+        self._ready.set()
+
+    async def _send_loop(self, on_error):
+        try:
+            while True:
+                await self._ready.wait()
+                while self._queue:
+                    await self.websocket.send_json(self._queue.popleft())
+                    self.sent += 1
+                self._ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            on_error(self.websocket)
+
+
+class Channel:
+    """
+    Subscribers of one project or company. A single fan-out task hands every published
+    message to each subscriber's queue, so a slow client never delays the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.subscribers: set[Client] = set()
+        self.published = 0
+        self._inbox: asyncio.Queue[dict] = asyncio.Queue()
+        self._fan_out = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            message = await self._inbox.get()
+            for client in list(self.subscribers):
+                client.offer(message)
+
+    def put(self, message: dict):
+        self.published += 1
+        self._inbox.put_nowait(message)
+
+    def close(self):
+        self._fan_out.cancel()
+
+
+class ConnectionManager:
+    """
+    Keeps track of the connected /ws clients and the channels each one is subscribed to.
+
+    Messages can be published from worker threads; they are handed to the event loop that
+    accepted the sockets. Channels exist only while they have subscribers.
+    """
+
+    def __init__(self):
+        self.clients: dict[WebSocket, Client] = {}
+        self.channels: dict[str, Channel] = {}
+        self.loop: asyncio.AbstractEventLoop = None
+        # Counters of clients that have since disconnected
+        self._closed = {"sent": 0, "coalesced": 0, "dropped": 0}
+
+    @property
+    def connections(self) -> set[WebSocket]:
+        return set(self.clients)
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        self.loop = asyncio.get_running_loop()
+        client = Client(websocket)
+        self.clients[websocket] = client
+        client.start(self.disconnect)
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.clients.pop(websocket, None)
+        if client is None:
+            return
+
+        for channel in list(client.channels):
+            self.unsubscribe(websocket, channel, client)
+        client.stop()
+        for counter in self._closed:
+            self._closed[counter] += getattr(client, counter)
+
+    def subscribe(self, websocket: WebSocket, channel: str):
+        client = self.clients[websocket]
+        if channel not in self.channels:
+            self.channels[channel] = Channel(channel)
+        self.channels[channel].subscribers.add(client)
+        client.channels.add(channel)
+
+    def unsubscribe(self, websocket: WebSocket, channel: str, client: Client = None):
+        client = client or self.clients.get(websocket)
+        subscribed = self.channels.get(channel)
+        if client is None or subscribed is None:
+            return
+
+        client.channels.discard(channel)
+        subscribed.subscribers.discard(client)
+        if not subscribed.subscribers:
+            subscribed.close()
+            del self.channels[channel]
+
+    def send(self, websocket: WebSocket, message: dict):
+        """Queue a message for one client. Replies go through the queue so they never interleave with pushes."""
+        client = self.clients.get(websocket)
+        if client:
+            client.offer(message)
+
+    def _dispatch(self, message: dict, channel: Optional[str]):
+        if channel is None:
+            for client in list(self.clients.values()):
+                client.offer(message)
+        elif channel in self.channels:
+            self.channels[channel].put(message)
+
+    def publish(self, message: dict, channel: Optional[str] = None):
+        """
+        Thread-safe, non-blocking send to every client subscribed to channel, or to every client if channel is None.
+        Does nothing until a client has connected.
+        """
+        if self.loop is None or not self.clients:
+            return
+        self.loop.call_soon_threadsafe(self._dispatch, message, channel)
+
+    def publish_changes(self, changes: Iterable[dict]):
+        """
+        Push committed row changes to the clients subscribed to the channels they affect.
+        Each channel receives a single "changes" message per commit.
+        """
+        by_channel: dict[str, list[dict]] = {}
+        for change in changes:
+            for channel in change.pop("channels"):
+                by_channel.setdefault(channel, []).append(change)
+
+        for channel, channel_changes in by_channel.items():
+            self.publish({"type": "changes", "channel": channel, "changes": channel_changes}, channel)
+
+    def stats(self) -> dict:
+        """Return connection counts and backpressure figures for the send queues."""
+        clients = list(self.clients.values())
+        depths = [client.depth for client in clients]
+        return {
+            "clients": len(clients),
+            "channels": len(self.channels),
+            "subscriptions": sum(len(channel.subscribers) for channel in self.channels.values()),
+            "queued": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "full_queues": sum(1 for client in clients if client.depth >= client.queue_size),
+            **{
+                counter: total + sum(getattr(client, counter) for client in clients)
+                for counter, total in self._closed.items()
+            },
+        }
+
+
+connection_manager = ConnectionManager()
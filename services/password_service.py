@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from constants import PASSWORDS
+from models import Account
+from utils import hash_password, verify_password
+from .db_service import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when a password is submitted for hashing while the hasher is at capacity."""
+
+
+class PasswordHasher:
+    """
+    Hashes and verifies passwords on a bounded thread pool, so a slow bcrypt call never blocks the event loop.
+
+    bcrypt releases the GIL while it works, so workers run in parallel with each other and with request handlers.
+    At most max_pending calls are accepted at once, running or waiting for a worker; beyond that calls are
+    refused straight away, so a burst of logins is shed instead of queueing up behind itself.
+    Stale hashes are rehashed on the same workers after the login that found them has been answered.
+
+    Attributes:
+        workers (int): Number of worker threads.
+        max_pending (int): Calls accepted at once before new ones are refused.
+        completed (int): Calls that have finished.
+        rejected (int): Calls refused because the hasher was at capacity.
+        rehashed (int): Stored hashes replaced because they fell short of the password policy.
+    """
+
+    def __init__(self, workers: int = PASSWORDS.WORKERS, max_pending: int = PASSWORDS.MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self._pending = 0
+        self._peak = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+
+    async def hash(self, password: str) -> str:
+        """
+        :raises PasswordHasherBusy: If the hasher is at capacity.
+        """
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> str:
+        """
+        Verify a password off the event loop, like verify_password.
+
+        :raises ValueError: If the password is incorrect.
+        :raises PasswordHasherBusy: If the hasher is at capacity.
+        """
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "in_flight": self._pending,
+                "queued": max(self._pending - self.workers, 0),
+                "peak_in_flight": self._peak,
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+            }
+
+    def rehash_later(self, account_id: uuid.UUID, plain_password: str, stale_hash: str) -> bool:
+        """
+        Replace an account's stored hash with one made under the current policy, in the background.
+        The hash is only replaced if it is still stale_hash, so a password changed in the meantime is kept.
+
+        :return: False if the hasher is at capacity, in which case the account is rehashed after a later login.
+        """
+        try:
+            self._submit(self._rehash, account_id, plain_password, stale_hash)
+        except PasswordHasherBusy:
+            return False
+        return True
+
+    async def _run(self, function, *args):
+        return await asyncio.wrap_future(self._submit(function, *args))
+
+    def _submit(self, function, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy(f"{self._pending} password checks are already pending")
+            self._pending += 1
+            self._peak = max(self._peak, self._pending)
+
+        # Counted down when the work finishes, not when the caller stops waiting, so a disconnected
+        # client's hash still counts against the limit while it occupies a worker
+        future = self._executor.submit(function, *args)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _rehash(self, account_id: uuid.UUID, plain_password: str, stale_hash: str):
+        password_hash = hash_password(plain_password)
+        db = SessionLocal()
+        try:
+            account = db.get(Account, account_id)
+            if account is None or account.password_hash != stale_hash:
+                return
+            account.password_hash = password_hash
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Error rehashing password of account %s", account_id, extra={"account_id": account_id})
+            return
+        finally:
+            db.close()
+
+        with self._lock:
+            self.rehashed += 1
+
+    def _finished(self, future):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,214 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from constants import AUTH
+from models import Account, Company
+from .account_service import load_account, load_account_async
+from .auth_service import decode_jwt
+from .db_service import SessionLocal, get_async_db, get_db
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+
+_STALE_KEY = "stale_principals"
+
+
+def _snapshot(account: Account) -> Account:
+    """Copy the columns of a loaded account into a detached instance that no session owns."""
+    copy = Account(
+        **{attribute.key: getattr(account, attribute.key) for attribute in Account.__mapper__.column_attrs}
+    )
+    make_transient_to_detached(copy)
+    return copy
+
+
+class PrincipalCache:
+    """
+    Accounts recently authenticated by a token, so requests carrying the same token skip loading the account.
+
+    Entries are keyed by the token's subject and expiry, live for at most ttl seconds and never past the
+    token's own expiry, and the least recently used entry is evicted once the cache is full. Cached
+    accounts are detached snapshots; each request attaches its own copy to its session.
+
+    Attributes:
+        size (int): Maximum number of cached accounts.
+        ttl (float): Seconds an entry stays valid.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that had to load the account.
+        invalidations (int): Entries dropped because their account was updated or deleted.
+    """
+
+    def __init__(self, size: int = AUTH.PRINCIPAL_CACHE_SIZE, ttl: float = AUTH.PRINCIPAL_CACHE_TTL_SECONDS):
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: OrderedDict[tuple, tuple[float, Account]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, account_id: uuid.UUID, expires: Optional[float]) -> Optional[Account]:
+        key = (account_id, expires)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, account: Account, expires: Optional[float]):
+        valid_until = time.time() + self.ttl
+        if expires is not None:
+            valid_until = min(valid_until, expires)
+
+        snapshot = _snapshot(account)
+        with self._lock:
+            self._entries[(account.id, expires)] = (valid_until, snapshot)
+            self._entries.move_to_end((account.id, expires))
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, account_ids):
+        """Drop every entry of the accounts, whichever token they were cached under."""
+        account_ids = set(account_ids)
+        if not account_ids:
+            return
+
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in account_ids]:
+                del self._entries[key]
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+principal_cache = PrincipalCache()
+
+
+def _token_principal(token: str) -> tuple[uuid.UUID, Optional[float]]:
+    """Return the account ID and expiry of a token, or raise a 401 if it is invalid or expired."""
+    try:
+        payload = decode_jwt(token)
+    except Exception as e:
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        raise HTTPException(status_code=401, detail=f"Token is invalid or expired: {detail}")
+    return payload["sub"], payload.get("exp")
+
+
+def authenticate_token(token: str, db: Session = Depends(get_db)) -> Account:
+    """
+    Return the account a token belongs to, attached to db. Accounts are served from the principal
+    cache when possible, in which case no query is made.
+
+    :raises HTTPException: 401 if the token is invalid or expired, 404 if the account does not exist.
+    """
+    account_id, expires = _token_principal(token)
+    cached = principal_cache.get(account_id, expires)
+    if cached is not None:
+        return db.merge(cached, load=False)
+
+    try:
+        account = load_account(account_id=account_id, db=db)
+    except Exception:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+    principal_cache.put(account, expires)
+    return account
+
+
+async def authenticate_token_async(token: str, db: AsyncSession = Depends(get_async_db)) -> Account:
+    """
+    Async version of authenticate_token, attaching the account to an async session.
+    """
+    account_id, expires = _token_principal(token)
+    cached = principal_cache.get(account_id, expires)
+    if cached is not None:
+        account = await db.merge(cached, load=False)
+        if account.company_id is not None:
+            # The snapshot holds columns only. Load the company and its accounts, which Account.manager reads,
+            # since the async session cannot lazy-load them
+            company = await db.scalar(
+                select(Company)
+                .where(Company.id == account.company_id)
+                .options(selectinload(Company.accounts))
+            )
+            set_committed_value(account, "company", company)
+        return account
+
+    try:
+        account = await load_account_async(account_id=account_id, db=db)
+    except Exception:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+    principal_cache.put(account, expires)
+    return account
+
+
+def current_account(
+    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+) -> Account:
+    """FastAPI dependency returning the account that made the request, attached to the request's session."""
+    return authenticate_token(token, db)
+
+
+async def current_account_async(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)
+) -> Account:
+    """current_account for async handlers, attached to the request's async session."""
+    return await authenticate_token_async(token, db)
+
+
+def _record_stale_accounts(session: Session, flush_context):
+    stale = session.info.setdefault(_STALE_KEY, set())
+    for instance in list(session.dirty) + list(session.deleted):
+        if isinstance(instance, Account):
+            stale.add(instance.id)
+    # Dropped right away as well, so this session never reads its own stale entry
+    principal_cache.invalidate(stale)
+
+
+def _invalidate_stale_accounts(session: Session):
+    # Dropped again once committed, in case another request cached the old row in between
+    principal_cache.invalidate(session.info.pop(_STALE_KEY, ()))
+
+
+def _discard_stale_accounts(session: Session):
+    session.info.pop(_STALE_KEY, None)
+
+
+def register_principal_listeners(session_factory=SessionLocal):
+    """Invalidate cached accounts whenever a session made by session_factory updates or deletes them."""
+    if event.contains(session_factory, "after_flush", _record_stale_accounts):
+        return
+
+    event.listen(session_factory, "after_flush", _record_stale_accounts)
+    event.listen(session_factory, "after_commit", _invalidate_stale_accounts)
+    event.listen(session_factory, "after_rollback", _discard_stale_accounts)
+
+
+register_principal_listeners()
@@ -0,0 +1,340 @@
+import uuid
+from typing import Iterable, Optional
+from fastapi import Depends
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models import Project, ProjectProgress, Task
+from .db_service import get_db
+
+COUNTERS = ("total_tasks", "finished_tasks", "remaining_tasks")
+
+
+def count_remaining_tasks(tasks) -> int:
+    """
+    Count the top level tasks that still have work left in them.
+
+    A task without subtasks has work left if it is not finished, and a task with subtasks has work
+    left if any of its subtasks does. Tasks whose parent is not among tasks are grouped under that
+    parent, which counts as a single top level task.
+
+    :param tasks: Rows with id, parent_task_id and is_finished attributes.
+    """
+    tasks = list(tasks)
+    ids = {task.id for task in tasks}
+    children: dict[uuid.UUID, list] = {}
+    for task in tasks:
+        if task.parent_task_id is not None:
+            children.setdefault(task.parent_task_id, []).append(task)
+
+    remaining: dict[uuid.UUID, bool] = {}
+
+    def has_work_left(task) -> bool:
+        if task.id not in remaining:
+            subtasks = children.get(task.id)
+            remaining[task.id] = (
+                any(has_work_left(subtask) for subtask in subtasks)
+                if subtasks
+                else not task.is_finished
+            )
+        return remaining[task.id]
+
+    count = sum(1 for task in tasks if task.parent_task_id is None and has_work_left(task))
+    count += sum(
+        1
+        for parent_id, subtasks in children.items()
+        if parent_id not in ids and any(has_work_left(subtask) for subtask in subtasks)
+    )
+    return count
+
+
+def _counters(tasks: list) -> dict[str, int]:
+    parents = {task.parent_task_id for task in tasks}
+    return {
+        "total_tasks": len(tasks),
+        "finished_tasks": sum(1 for task in tasks if task.is_finished and task.id not in parents),
+        "remaining_tasks": count_remaining_tasks(tasks),
+    }
+
+
+def compute_project_progress(
+    project_id: uuid.UUID, db: Session = Depends(get_db)
+) -> dict[Optional[uuid.UUID], dict[str, int]]:
+    """
+    Count the tasks of a project from scratch, for the whole project (key None) and for every assigned account.
+    Pending changes in the session are flushed first, so uncommitted writes are counted.
+    """
+    db.flush()
+    tasks = (
+        db.query(Task.id, Task.parent_task_id, Task.is_finished, Task.assigned_to)
+        .filter(Task.project_id == project_id)
+        .all()
+    )
+
+    by_account: dict[uuid.UUID, list] = {}
+    for task in tasks:
+        by_account.setdefault(task.assigned_to, []).append(task)
+
+    progress = {None: _counters(tasks)}
+    for account_id, account_tasks in by_account.items():
+        progress[account_id] = _counters(account_tasks)
+    return progress
+
+
+def refresh_project_progress(
+    project_ids: Iterable[uuid.UUID], db: Session = Depends(get_db)
+):
+    """
+    Recount the progress rows of projects from scratch inside the caller's transaction. The caller commits.
+    Task writes use snapshot_progress and apply_progress_delta instead, which only recount the trees they change.
+    """
+    for project_id in set(project_ids):
+        if project_id is None:
+            continue
+
+        progress = compute_project_progress(project_id, db)
+        rows = {
+            row.account_id: row
+            for row in db.query(ProjectProgress).filter(ProjectProgress.project_id == project_id)
+        }
+
+        for account_id, counters in progress.items():
+            row = rows.pop(account_id, None)
+            if row is None:
+                row = ProjectProgress(project_id=project_id, account_id=account_id)
+                db.add(row)
+            for counter, value in counters.items():
+                setattr(row, counter, value)
+
+        # Accounts that no longer have tasks in the project
+        for row in rows.values():
+            db.delete(row)
+    db.flush()
+
+
+def _tree_rows(task_ids: set[uuid.UUID], db: Session) -> list:
+    """
+    Load every task in the task trees containing task_ids with two recursive queries, one up to the top level
+    task of each tree and one back down. Each row carries the ID of its tree's top level task as root.
+    """
+    if not task_ids:
+        return []
+
+    ancestors = (
+        select(Task.id, Task.parent_task_id)
+        .where(Task.id.in_(task_ids))
+        .cte("ancestors", recursive=True)
+    )
+    # UNION rather than UNION ALL, so a parent cycle ends the walk instead of repeating forever
+    ancestors = ancestors.union(
+        select(Task.id, Task.parent_task_id).where(Task.id == ancestors.c.parent_task_id)
+    )
+    tree = (
+        select(ancestors.c.id, ancestors.c.id.label("root"))
+        .where(ancestors.c.parent_task_id.is_(None))
+        .cte("tree", recursive=True)
+    )
+    tree = tree.union(select(Task.id, tree.c.root).where(Task.parent_task_id == tree.c.id))
+
+    return (
+        db.query(
+            Task.id, Task.parent_task_id, Task.is_finished, Task.assigned_to, Task.project_id, tree.c.root
+        )
+        .join(tree, Task.id == tree.c.id)
+        .all()
+    )
+
+
+def _tree_counters(rows: list) -> dict[tuple, dict[str, int]]:
+    """
+    Count tasks like compute_project_progress, keyed by (project ID, account ID or None). Every counter is a sum
+    over top level trees, so counting a few whole trees gives exactly their share of the stored counters.
+    """
+    groups: dict[tuple, list] = {}
+    for row in rows:
+        groups.setdefault((row.project_id, None), []).append(row)
+        groups.setdefault((row.project_id, row.assigned_to), []).append(row)
+    return {key: _counters(tasks) for key, tasks in groups.items()}
+
+
+def snapshot_progress(task_ids: Iterable[uuid.UUID], db: Session = Depends(get_db)) -> dict:
+    """
+    Count the task trees a write is about to change, for apply_progress_delta to compare against afterwards.
+
+    :param task_ids: The existing tasks about to be updated or deleted, and the parents new or moved tasks are about to get.
+    """
+    db.flush()
+    rows = _tree_rows({task_id for task_id in task_ids if task_id is not None}, db)
+    return {"roots": {row.root for row in rows}, "counters": _tree_counters(rows)}
+
+
+def apply_progress_delta(
+    snapshot: dict, task_ids: Iterable[uuid.UUID], db: Session = Depends(get_db)
+):
+    """
+    Recount the task trees changed by a write and add the difference from snapshot to the stored counters,
+    inside the caller's transaction. The caller commits.
+    Projects that have never been counted, or whose changed trees were not all in snapshot, are recounted from scratch.
+
+    :param snapshot: Returned by snapshot_progress before the write.
+    :param task_ids: The tasks that were created, updated or deleted.
+    """
+    task_ids = set(task_ids)
+    db.flush()
+    rows = _tree_rows(task_ids | snapshot["roots"], db)
+    before, after = snapshot["counters"], _tree_counters(rows)
+
+    # A top level task missing from the snapshot is new, or became top level in this write, unless the caller
+    # left out a parent that gained tasks, in which case that tree's earlier counters are unknown
+    recount = {
+        row.project_id for row in rows if row.root not in snapshot["roots"] and row.root not in task_ids
+    }
+    # Tasks in a parent cycle belong to no tree, so only a recount sees them
+    counted_ids = {row.id for row in rows}
+    recount.update(
+        project_id
+        for task_id, project_id in db.query(Task.id, Task.project_id).filter(Task.id.in_(task_ids))
+        if task_id not in counted_ids
+    )
+    projects = {project_id for project_id, _ in before.keys() | after.keys()}
+    counted = {
+        project_id
+        for (project_id,) in db.query(ProjectProgress.project_id).filter(
+            ProjectProgress.project_id.in_(projects), ProjectProgress.account_id.is_(None)
+        )
+    }
+    recount |= projects - counted
+
+    zero = dict.fromkeys(COUNTERS, 0)
+    for key in before.keys() | after.keys():
+        if key[0] in recount:
+            continue
+        delta = {
+            counter: after.get(key, zero)[counter] - before.get(key, zero)[counter] for counter in COUNTERS
+        }
+        if any(delta.values()):
+            _add_to_row(*key, delta, db)
+
+    # Accounts that no longer have tasks in the project
+    db.query(ProjectProgress).filter(
+        ProjectProgress.project_id.in_(projects - recount),
+        ProjectProgress.account_id.is_not(None),
+        ProjectProgress.total_tasks == 0,
+    ).delete(synchronize_session="fetch")
+
+    refresh_project_progress(recount, db)
+
+
+def _add_to_row(project_id: uuid.UUID, account_id: Optional[uuid.UUID], delta: dict[str, int], db: Session):
+    """Add delta to a progress row in the database, so concurrent writes never overwrite each other's counts."""
+    row = db.query(ProjectProgress).filter(ProjectProgress.project_id == project_id)
+    row = row.filter(
+        ProjectProgress.account_id.is_(None) if account_id is None else ProjectProgress.account_id == account_id
+    )
+    values = {
+        getattr(ProjectProgress, counter): getattr(ProjectProgress, counter) + value
+        for counter, value in delta.items()
+    }
+    if row.update(values, synchronize_session="fetch"):
+        return
+
+    # The account has no tasks left over from before, so its counts start from the delta
+    try:
+        with db.begin_nested():
+            db.add(ProjectProgress(project_id=project_id, account_id=account_id, **delta))
+    except IntegrityError:
+        # Another transaction added the row first
+        row.update(values, synchronize_session="fetch")
+
+
+def load_project_progress(
+    account_id: uuid.UUID,
+    project_ids: list[uuid.UUID],
+    managed: set[uuid.UUID],
+    db: Session = Depends(get_db),
+) -> dict[uuid.UUID, dict[str, int]]:
+    """
+    Load the stored counters of several projects as an account sees them: every task of the projects it manages,
+    and only its own tasks elsewhere. Projects that have never been counted are counted and stored first.
+    """
+    rows = (
+        db.query(ProjectProgress)
+        .filter(ProjectProgress.project_id.in_(project_ids))
+        .filter(
+            ProjectProgress.account_id.is_(None)
+            | (ProjectProgress.account_id == account_id)
+        )
+        .all()
+    )
+    counted = {row.project_id for row in rows if row.account_id is None}
+    missing = [project_id for project_id in project_ids if project_id not in counted]
+    if missing:
+        try:
+            refresh_project_progress(missing, db)
+            db.commit()
+        except IntegrityError:
+            # Another request counted the same projects first, so their rows exist now
+            db.rollback()
+        return load_project_progress(account_id, project_ids, managed, db)
+
+    empty = dict.fromkeys(COUNTERS, 0)
+    progress = {project_id: empty for project_id in project_ids}
+    for row in rows:
+        if (row.account_id is None) == (row.project_id in managed):
+            progress[row.project_id] = {counter: getattr(row, counter) for counter in COUNTERS}
+    return progress
+
+
+def repair_project_progress(
+    db: Session = Depends(get_db), dry_run: bool = False
+) -> list[dict]:
+    """
+    Recount every project from scratch and report the stored counters that had drifted.
+
+    :param dry_run: Only report drift, without storing the recounted values.
+    :return: List of {project_id, account_id, counter, stored, actual} entries.
+    """
+    stored = {
+        (row.project_id, row.account_id): row for row in db.query(ProjectProgress).all()
+    }
+    drift = []
+
+    project_ids = [project_id for (project_id,) in db.query(Project.id)]
+    for project_id in project_ids:
+        for account_id, counters in compute_project_progress(project_id, db).items():
+            row = stored.pop((project_id, account_id), None)
+            for counter, actual in counters.items():
+                value = getattr(row, counter) if row else None
+                if value != actual:
+                    drift.append(
+                        {
+                            "project_id": project_id,
+                            "account_id": account_id,
+                            "counter": counter,
+                            "stored": value,
+                            "actual": actual,
+                        }
+                    )
+
+    # Rows left over belong to accounts that no longer have tasks in the project, or to deleted projects
+    for (project_id, account_id), row in stored.items():
+        for counter in COUNTERS:
+            drift.append(
+                {
+                    "project_id": project_id,
+                    "account_id": account_id,
+                    "counter": counter,
+                    "stored": getattr(row, counter),
+                    "actual": None,
+                }
+            )
+
+    if not dry_run:
+        db.query(ProjectProgress).filter(
+            ProjectProgress.project_id.notin_(project_ids)
+        ).delete(synchronize_session=False)
+        refresh_project_progress(project_ids, db)
+        db.commit()
+
+    return drift
+
@@ -1,14 +1,20 @@
 import uuid
 from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from schemas import project_model
-from .db_service import get_db
+from .db_service import column_serializer, get_async_db, get_db
 from .account_service import load_account
 from .company_service import load_company
-from .task_service import load_task, load_project_tasks, delete_task
-from sqlalchemy import func
+from .task_service import delete_task_rows
+from .change_service import record_bulk_changes
+from .progress_service import load_project_progress
+from sqlalchemy import func, select
 from collections import OrderedDict
-from models import Project, Task, task_account_association
+from models import Account, Project, ProjectProgress, Task, task_account_association
+
+# Column values of a project, for responses
+serialize_project = column_serializer(Project)
 
 
 def create_project(
@@ -60,90 +66,133 @@ def load_project(
     return query
 
 
-def load_projects(
-    account_id: uuid.UUID, db: Session = Depends(get_db)
-):
+async def load_project_async(
+    project_id_str: str = None,
+    project_id: uuid.UUID = None,
+    db: AsyncSession = Depends(get_async_db),
+) -> Project:
     """
-    Load all projects that the account is assigned to or is managing.
+    Async version of load_project, for handlers that must not block the event loop.
     """
-    task_counts = (
-        db.query(Project.id, func.count(Task.id).label("task_count"))
+    if project_id_str:
+        project_id = uuid.UUID(project_id_str)
+
+    project = await db.get(Project, project_id) if project_id else None
+
+    if not project:
+        raise ValueError(
+            "Project not found: ", project_id
+        )
+
+    return project
+
+
+def _account_project_ids(account_id: uuid.UUID):
+    """IDs of the projects an account is assigned to or is managing, the ones with the most of its tasks first."""
+    return (
+        select(Project.id)
         .outerjoin(Task, Project.id == Task.project_id)
         .outerjoin(
             task_account_association, Task.id == task_account_association.c.task_id
         )
-        .filter(
+        .where(
             (task_account_association.c.account_id == account_id)
             | (Project.project_manager == account_id)
         )
         .group_by(Project.id)
         .order_by(func.count(Task.id).desc())
-        .all()
     )
 
+
+def visible_project_ids(account: Account):
+    """
+    Select of the IDs of the projects an account may see: those it manages, those it has tasks assigned in,
+    and those of its company.
+    """
+    visible = (Project.project_manager == account.id) | Project.id.in_(
+        select(Task.project_id)
+        .join(task_account_association, Task.id == task_account_association.c.task_id)
+        .where(task_account_association.c.account_id == account.id)
+    )
+    if account.company_id is not None:
+        visible |= Project.company_id == account.company_id
+    return select(Project.id).where(visible)
+
+
+def can_view_project(account: Account, project_id: uuid.UUID, db: Session = Depends(get_db)) -> bool:
+    return db.scalar(visible_project_ids(account).where(Project.id == project_id)) is not None
+
+
+def _project_dicts(
+    account_id: uuid.UUID, project_ids: list[uuid.UUID], projects: list[Project]
+) -> tuple[OrderedDict, set[uuid.UUID]]:
+    """Order the loaded projects like project_ids, as dictionaries, and pick out the ones the account manages."""
+    loaded = {project.id: project for project in projects}
+    managed = {
+        project_id
+        for project_id, project in loaded.items()
+        if project.project_manager == account_id
+    }
+
     # Create an ordered dictionary of projects based on the task count
-    projects = OrderedDict()
-    for project_id, task_count in task_counts:
-        if task_count == 0:
-            project = load_project(project_id=project_id, db=db)
-            if project.project_manager == account_id:
-                projects[project_id] = project.__dict__
-
-        project = db.query(Project).filter(Project.id == project_id).first()
-        if not project:
-            raise Exception(f"Project with ID {project_id} not found.")
-
-        tasks = load_project_tasks(
-            account_id=account_id, project_id=project_id, db=db
-        )
+    ordered = OrderedDict(
+        (project_id, serialize_project(loaded[project_id])) for project_id in project_ids
+    )
+    return ordered, managed
 
-        def get_task_count(
-            project: OrderedDict[uuid.UUID, OrderedDict[uuid.UUID, any]],
-        ) -> int:
-            count = 0
-            for parent_task_id, child_tasks in project.items():
-                parent_task = load_task(task_id=parent_task_id, db=db)
-                master_task_count = 0
-
-                if len(child_tasks) > 0:
-                    for child_id, child_child_task_id_or_dict in child_tasks.items():
-                        child_task = load_task(task_id=child_id, db=db)
-                        child_completion_count = 0
-                        if isinstance(
-                            child_child_task_id_or_dict, OrderedDict
-                        ):  # Will always be true
-                            if len(child_child_task_id_or_dict) > 0:
-                                child_completion_count += get_task_count(
-                                    child_child_task_id_or_dict
-                                )
-                            else:  # If there are no subtasks
-                                if not child_task.is_finished:
-                                    child_completion_count += 1
-
-                        if not child_completion_count == 0:
-                            master_task_count += 1
-                        else:
-                            child_task.is_finished = True
-                else:
-                    if not parent_task.is_finished:
-                        master_task_count += 1
-
-                if master_task_count > 0:
-                    count += 1
-                    parent_task.is_finished = False
-                else:
-                    parent_task.is_finished = True
-
-            return count
-
-        task_count = get_task_count(tasks)
-        project_dict = project.__dict__
-        project_dict["tasks_remaining"] = task_count
-        projects[project_id] = project_dict
 
+def _add_tasks_remaining(projects: OrderedDict, progress: dict) -> OrderedDict:
+    for project_id, project_dict in projects.items():
+        project_dict["tasks_remaining"] = progress[project_id]["remaining_tasks"]
     return projects
 
 
+def load_projects(
+    account_id: uuid.UUID, db: Session = Depends(get_db)
+):
+    """
+    Load all projects that the account is assigned to or is managing, with the number of top level tasks remaining in each.
+    Managers see every task of their projects, other accounts only the tasks assigned to them.
+    Counts come from the stored project progress counters, so the number of queries does not depend on the number of projects or tasks.
+    """
+    project_ids = list(db.scalars(_account_project_ids(account_id)))
+    if not project_ids:
+        return OrderedDict()
+
+    projects, managed = _project_dicts(
+        account_id,
+        project_ids,
+        db.scalars(select(Project).where(Project.id.in_(project_ids))).all(),
+    )
+
+    # Copied first, since counting projects for the first time commits and expires them
+    progress = load_project_progress(account_id, project_ids, managed, db)
+    return _add_tasks_remaining(projects, progress)
+
+
+async def load_projects_async(
+    account_id: uuid.UUID, db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Async version of load_projects, for handlers that must not block the event loop.
+    """
+    project_ids = list(await db.scalars(_account_project_ids(account_id)))
+    if not project_ids:
+        return OrderedDict()
+
+    projects, managed = _project_dicts(
+        account_id,
+        project_ids,
+        (await db.scalars(select(Project).where(Project.id.in_(project_ids)))).all(),
+    )
+
+    # Projects counted for the first time are counted on the sync session behind db
+    progress = await db.run_sync(
+        lambda session: load_project_progress(account_id, project_ids, managed, session)
+    )
+    return _add_tasks_remaining(projects, progress)
+
+
 def update_project(
     project_id: uuid.UUID,
     project: project_model.ProjectCreate,
@@ -159,11 +208,19 @@ def update_project(
 
 
 def delete_project(project_id: uuid.UUID, db: Session = Depends(get_db)):
-    tasks = db.query(Task).filter(Task.project_id == project_id).all()
-    for task in tasks:
-        delete_task(task.id, db)
-        tasks = db.query(Task).filter(Task.project_id == project_id).all()
-        
-    db.query(Project).filter(Project.id == project_id).delete()
+    """
+    Delete a project with all of its tasks and progress counters, with one statement per table, in a single transaction.
+    """
+    project = db.query(Project.id, Project.company_id).filter(Project.id == project_id).first()
+    if project is None:
+        return True
+
+    delete_task_rows(select(Task.id).where(Task.project_id == project_id), db)
+    db.query(ProjectProgress).filter(ProjectProgress.project_id == project_id).delete(
+        synchronize_session=False
+    )
+    db.query(Project).filter(Project.id == project_id).delete(synchronize_session="fetch")
+    # Subscribers of the project learn that its tasks are gone from the project itself
+    record_bulk_changes(db, Project, "delete", [project._asdict()])
     db.commit()
     return True
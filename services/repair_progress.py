@@ -0,0 +1,32 @@
+"""
+Recounts the stored project progress counters from scratch and reports any that had drifted.
+
+Usage: python -m services.repair_progress [--dry-run]
+"""
+
+import argparse
+from .db_service import SessionLocal
+from .progress_service import repair_project_progress
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Report drift without fixing it")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        drift = repair_project_progress(db, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    for entry in drift:
+        print(
+            f"project {entry['project_id']} account {entry['account_id'] or '*'}: "
+            f"{entry['counter']} stored {entry['stored']}, actual {entry['actual']}"
+        )
+    projects = len({entry["project_id"] for entry in drift})
+    action = "found" if args.dry_run else "repaired"
+    print(f"{len(drift)} drifted counters {action} across {projects} projects")
@@ -1,14 +1,20 @@
 from collections import OrderedDict
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Iterable, Optional
 import uuid
 
-from models import Task, Project
+from constants import BULK
+from models import Account, Task, Project
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import Depends
 from schemas import task_model
-from .db_service import get_db
+from .db_service import get_async_db, get_db
 from .account_service import load_account
-from models import task_account_association
+from .progress_service import apply_progress_delta, snapshot_progress
+from .change_service import record_bulk_changes
+from models import task_account_association, task_dependency_association, task_detected_dependency_association
 
 
 def create_task(
@@ -40,16 +46,18 @@ def create_task(
         load_task(task_id=parent_task_id, db=db)
         new_task.parent_task_id = parent_task_id
 
+    progress = snapshot_progress([new_task.parent_task_id], db)
     db.add(new_task)
-    db.commit()
-    db.refresh(new_task)
+    db.flush()
 
     db.execute(
         task_account_association.insert().values(
             task_id=new_task.id, account_id=new_task.assigned_to
         )
     )
+    apply_progress_delta(progress, [new_task.id], db)
     db.commit()
+    db.refresh(new_task)
 
     return new_task
 
@@ -77,50 +85,53 @@ def load_task(
     return query
 
 
-# Code for creating the dictionary
-def build_task_dict(
-    project: OrderedDict[uuid.UUID, OrderedDict[uuid.UUID, any]], task: Task
-):
-    """Recursively build an ordered dictionary of tasks to their subtasks."""
-
-    def sort_recursive_dict(d: OrderedDict):
-        """Recursively sort an OrderedDict by the 'order' attribute of the keys."""
-        sorted_dict = OrderedDict()
-        for key, value in sorted(
-            d.items(),
-            key=lambda item: item[1].order if isinstance(item[1], Task) else 0,
-        ):
-            if isinstance(value, OrderedDict):
-                sorted_dict[key] = sort_recursive_dict(value)
-            else:
-                sorted_dict[key] = value
-        return sorted_dict
-
-    if not task.parent_task_id:
-        project[task.id] = OrderedDict()
-
-    else:
-
-        def recursive_insert(project, task):
-            for id, value in project.items():
-                if task.parent_task_id == id:
-                    if isinstance(value, OrderedDict):
-                        value[task.id] = OrderedDict()
-                        return True
-                elif isinstance(value, OrderedDict):
-                    if recursive_insert(value, task):
-                        return True
-            return False
-
-        if not recursive_insert(project, task):
-            # Add the parent task to the project dictionary if not found
-            project[task.parent_task_id] = OrderedDict()
-            project[task.parent_task_id][task.id] = OrderedDict()
-
-    # ! Does not work
-
-    # sort_recursive_dict(project)
-    return project
+def build_task_tree(tasks: Iterable[Task]) -> OrderedDict[uuid.UUID, OrderedDict]:
+    """
+    Build an ordered dictionary of task IDs to their subtasks, nested to any depth, in a single pass.
+
+    Siblings are sorted by their order. A task whose parent is not among tasks is placed under an
+    entry for the parent ID at the top level, after the top level tasks.
+    """
+    tasks = list(tasks)
+    subtrees = {task.id: OrderedDict() for task in tasks}
+
+    children: dict[Optional[uuid.UUID], list[Task]] = {None: []}
+    for task in tasks:
+        children.setdefault(task.parent_task_id, []).append(task)
+
+    tree = OrderedDict()
+    for parent_id, siblings in children.items():
+        if parent_id is None:
+            parent = tree
+        elif parent_id in subtrees:
+            parent = subtrees[parent_id]
+        else:
+            parent = tree.setdefault(parent_id, OrderedDict())
+
+        for task in sorted(siblings, key=lambda task: task.order):
+            parent[task.id] = subtrees[task.id]
+
+    return tree
+
+
+def _subtree(roots):
+    """
+    Recursive CTE of the IDs of the tasks selected by roots and all of their subtasks, to any depth.
+
+    :param roots: Select of Task.id for the top of each subtree.
+    """
+    subtree = roots.cte("subtree", recursive=True)
+    return subtree.union_all(
+        select(Task.id).where(Task.parent_task_id == subtree.c.id)
+    )
+
+
+def load_task_subtree(task_id: uuid.UUID, db: Session = Depends(get_db)) -> list[Task]:
+    """
+    Load a task and all of its subtasks, to any depth, with one recursive query.
+    """
+    subtree = _subtree(select(Task.id).where(Task.id == task_id))
+    return db.query(Task).join(subtree, Task.id == subtree.c.id).all()
 
 
 def load_project_tasks(
@@ -144,80 +155,327 @@ def load_project_tasks(
 
     The function recursively builds the dictionary to include all subtasks and their subtasks, and so on. If account_id is provided, only subtasks assigned to the account are included.
     """
+    tasks = db.scalars(_project_tasks_statement(account_id, project_id)).all()
+    return _group_project_tasks(tasks, project_id)
 
-    query = db.query(Task)
+
+async def load_project_tasks_async(
+    account_id=None,
+    project_id=None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Async version of load_project_tasks, for handlers that must not block the event loop.
+    """
+    tasks = (await db.scalars(_project_tasks_statement(account_id, project_id))).all()
+    return _group_project_tasks(tasks, project_id)
+
+
+def _project_tasks_statement(account_id=None, project_id=None):
+    statement = select(Task)
 
     if account_id and project_id:
-        # If the project specified happens to be managed by the employee, return all tasks in the project
-        if project_id in [
-            pid
-            for (pid,) in db.query(Project.id)
-            .filter(Project.project_manager == account_id)
-            .all()
-        ]:
-            query = query.filter(Task.project_id == project_id)
-
-        # If the account is not a project manager, check if the account is assigned to any tasks
-        else:
-            query = (
-                db.query(Task)
-                .filter(Task.project_id == project_id)
-                .filter(Task.assigned_to == account_id)
-            )
+        # Managers of the project see all of its tasks, other accounts only the tasks assigned to them
+        managed = select(Project.id).where(Project.project_manager == account_id)
+        statement = statement.where(Task.project_id == project_id).where(
+            Task.project_id.in_(managed) | (Task.assigned_to == account_id)
+        )
 
     elif account_id and not project_id:
-        query = query.filter(Task.assigned_to == account_id)
+        statement = statement.where(Task.assigned_to == account_id)
 
     elif not account_id and project_id:
-        query = query.filter(Task.project_id == project_id)
+        statement = statement.where(Task.project_id == project_id)
 
-    query = query.order_by(Task.project_id, Task.parent_task_id, Task.order)
+    return statement.order_by(Task.project_id, Task.order)
 
-    tasks = query.all()
 
-    if account_id and project_id:
-        # Order the project based on the accounts role in the project.
-        project = OrderedDict()
-        for task in tasks:
-            project.update(build_task_dict(project, task))
-        return project
+def _group_project_tasks(tasks: list[Task], project_id=None):
+    if project_id:
+        # Sort all the tasks the account can see in one project
+        return build_task_tree(tasks)
 
-    elif account_id and not project_id:
-        # Separate tasks into each project the account is part of
-        projects = OrderedDict()
-        for task in tasks:
-            if task.project_id not in projects:
-                projects[task.project_id] = OrderedDict()
-            projects[task.project_id].update(
-                build_task_dict(projects[task.project_id], task)
-            )
-        return projects
+    # Separate tasks into each project
+    by_project: OrderedDict[uuid.UUID, list[Task]] = OrderedDict()
+    for task in tasks:
+        by_project.setdefault(task.project_id, []).append(task)
 
-    elif not account_id and project_id:
-        # Sort all the tasks for one whole project
-        project = OrderedDict()
-        for task in tasks:
-            project.update(build_task_dict(project, task))
-        return project
-
-    else:
-        # Separate tasks into each project
-        projects = OrderedDict()
-        for task in tasks:
-            if task.project_id not in projects:
-                projects[task.project_id] = OrderedDict()
-            projects[task.project_id].update(build_task_dict(projects, task))
-        return projects
+    return OrderedDict(
+        (project, build_task_tree(project_tasks))
+        for project, project_tasks in by_project.items()
+    )
+
+
+def delete_task_rows(task_ids, db: Session = Depends(get_db)):
+    """
+    Delete tasks together with their account and dependency rows, with one statement per table.
+    Nothing is loaded, and the caller commits.
+
+    :param task_ids: Select of Task.id for the tasks to delete.
+    """
+    db.execute(
+        task_account_association.delete().where(
+            task_account_association.c.task_id.in_(task_ids)
+        )
+    )
+    db.execute(
+        task_dependency_association.delete().where(
+            task_dependency_association.c.task_id.in_(task_ids)
+            | task_dependency_association.c.dependency_id.in_(task_ids)
+        )
+    )
+    db.execute(
+        task_detected_dependency_association.delete().where(
+            task_detected_dependency_association.c.task_id.in_(task_ids)
+            | task_detected_dependency_association.c.dependency_id.in_(task_ids)
+        )
+    )
+    db.query(Task).filter(Task.id.in_(task_ids)).delete(synchronize_session="fetch")
 
 
 def delete_task(task_id: uuid.UUID, db: Session = Depends(get_db)):
     """
-    Delete a task from the database. This will also delete all subtasks of the task.
+    Delete a task from the database. This will also delete all subtasks of the task, to any depth.
+    The subtree is collected with a recursive query and deleted with one statement per table, in a single transaction.
     """
-    db.query(Task).filter(Task.parent_task_id == task_id).delete()
-    db.query(Task).filter(Task.id == task_id).delete()
-    db.query(task_account_association).filter(
-        task_account_association.c.task_id == task_id
-    ).delete()
+    subtree = _subtree(select(Task.id).where(Task.id == task_id))
+    deleted = [
+        {"id": id, "project_id": project_id}
+        for id, project_id in db.query(Task.id, Task.project_id).join(
+            subtree, Task.id == subtree.c.id
+        )
+    ]
+    if not deleted:
+        return True
+
+    progress = snapshot_progress([task_id], db)
+    delete_task_rows(select(subtree.c.id), db)
+    record_bulk_changes(db, Task, "delete", deleted)
+    apply_progress_delta(progress, [task["id"] for task in deleted], db)
     db.commit()
     return True
+
+
+def apply_task_update(
+    task_id: uuid.UUID, update_data: dict, db: Session = Depends(get_db)
+) -> Task:
+    """
+    Set the given attributes on a task and update the progress of its old and new project in the same transaction.
+    """
+    task = load_task(task_id=task_id, db=db)
+    progress = snapshot_progress([task.id, update_data.get("parent_task_id")], db)
+
+    for key, value in update_data.items():
+        setattr(task, key, value)
+
+    apply_progress_delta(progress, [task.id], db)
+    db.commit()
+    db.refresh(task)
+    return task
+
+
+def _chunks(items: list, size: int = BULK.CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _existing_ids(column, ids: set, db: Session) -> set:
+    """Return which of ids exist in a primary key column, with one IN query per chunk."""
+    found = set()
+    for chunk in _chunks(list(ids)):
+        found.update(value for (value,) in db.query(column).filter(column.in_(chunk)))
+    return found
+
+
+def _check_references(
+    project_ids: set, account_ids: set, parent_task_ids: set, db: Session
+):
+    """Raise a ValueError naming the first referenced project, account or task that does not exist."""
+    for column, ids, label in (
+        (Project.id, project_ids, "Project"),
+        (Account.id, account_ids, "Account"),
+        (Task.id, parent_task_ids, "Parent task"),
+    ):
+        missing = ids - _existing_ids(column, ids, db)
+        if missing:
+            raise ValueError(f"{label} not found: {next(iter(missing))}")
+
+
+def _parents_first(items: list, parent_index: list[Optional[int]]) -> list[int]:
+    """Order batch positions so that every task comes after its parent in the batch. Raises ValueError on cycles."""
+    children: dict[Optional[int], list[int]] = {}
+    for i, parent in enumerate(parent_index):
+        children.setdefault(parent, []).append(i)
+
+    order = list(children.get(None, []))
+    for i in order:
+        order.extend(children.get(i, []))
+
+    if len(order) != len(items):
+        raise ValueError("parent_task_ref values form a cycle")
+    return order
+
+
+def create_tasks(
+    tasks: list[task_model.TaskBulkCreateItem],
+    db: Session = Depends(get_db),
+) -> tuple[list[Task], dict[str, uuid.UUID]]:
+    """
+    Create many tasks in a single transaction.
+
+    Every referenced project, account and parent task is checked with one IN query per table, and the
+    tasks and their account associations are written with multi-row inserts. A task can name another task
+    of the same batch as its parent through parent_task_ref.
+
+    :return: The created tasks in request order, and their IDs keyed by ref.
+    :raises ValueError: If a reference is malformed or does not exist.
+    """
+    if len(tasks) > BULK.MAX_TASKS:
+        raise ValueError(f"At most {BULK.MAX_TASKS} tasks can be created at once")
+
+    refs: dict[str, int] = {}
+    for i, task in enumerate(tasks):
+        if task.ref is not None:
+            if task.ref in refs:
+                raise ValueError(f"Duplicate ref: {task.ref}")
+            refs[task.ref] = i
+
+    parent_index: list[Optional[int]] = []
+    for task in tasks:
+        if task.parent_task_ref is not None:
+            if task.parent_task_id:
+                raise ValueError("parent_task_id and parent_task_ref cannot both be set")
+            if task.parent_task_ref not in refs:
+                raise ValueError(f"Unknown parent_task_ref: {task.parent_task_ref}")
+            parent_index.append(refs[task.parent_task_ref])
+        else:
+            parent_index.append(None)
+
+    ids = [uuid.uuid4() for _ in tasks]
+    now = datetime.now(timezone.utc)
+    rows = []
+    for i, task in enumerate(tasks):
+        if parent_index[i] is not None:
+            parent_task_id = ids[parent_index[i]]
+        else:
+            parent_task_id = uuid.UUID(task.parent_task_id) if task.parent_task_id else None
+
+        rows.append(
+            {
+                "id": ids[i],
+                "name": task.name,
+                "description": task.description,
+                "project_id": uuid.UUID(task.project_id),
+                "assigned_to": uuid.UUID(task.assigned_to),
+                "parent_task_id": parent_task_id,
+                "order": task.order,
+                "task_created": now,
+                "is_finished": False,
+            }
+        )
+
+    _check_references(
+        project_ids={row["project_id"] for row in rows},
+        account_ids={row["assigned_to"] for row in rows},
+        parent_task_ids={
+            uuid.UUID(task.parent_task_id)
+            for task in tasks
+            if task.parent_task_id and task.parent_task_ref is None
+        },
+        db=db,
+    )
+
+    progress = snapshot_progress({row["parent_task_id"] for row in rows} - set(ids), db)
+
+    # Parents are inserted before their children, so foreign keys hold after every statement
+    ordered = [rows[i] for i in _parents_first(tasks, parent_index)]
+    for chunk in _chunks(ordered):
+        db.execute(Task.__table__.insert().values(chunk))
+    for chunk in _chunks(ordered):
+        db.execute(
+            task_account_association.insert().values(
+                [{"task_id": row["id"], "account_id": row["assigned_to"]} for row in chunk]
+            )
+        )
+
+    record_bulk_changes(db, Task, "insert", rows)
+    apply_progress_delta(progress, ids, db)
+    db.commit()
+
+    created = {}
+    for chunk in _chunks(ids):
+        created.update((task.id, task) for task in db.query(Task).filter(Task.id.in_(chunk)))
+
+    return [created[task_id] for task_id in ids], {ref: ids[i] for ref, i in refs.items()}
+
+
+# Fields the dependency detectors read. Other edits, such as finishing a task, never change its dependencies
+DETECTION_FIELDS = ("name", "description")
+
+
+def changes_detection_fields(task: Task, update_data: dict) -> bool:
+    """
+    Whether applying update_data would change a field the dependency detectors read. Call it before the update is applied.
+    TaskUpdate requires every field, so clients resend unchanged names and descriptions; only a different value counts.
+    """
+    return any(
+        key in update_data and update_data[key] != getattr(task, key)
+        for key in DETECTION_FIELDS
+    )
+
+
+def parse_task_update(request: task_model.TaskUpdate) -> dict:
+    """Return the fields a task update sets, with IDs converted to UUIDs."""
+    update_data = request.model_dump(exclude_unset=True)
+    update_data.pop("id", None)
+    for key in ("project_id", "assigned_to", "parent_task_id"):
+        if update_data.get(key):
+            update_data[key] = uuid.UUID(update_data[key])
+    return update_data
+
+
+def update_tasks(
+    requests: list[task_model.TaskUpdate],
+    db: Session = Depends(get_db),
+) -> tuple[list[Task], set]:
+    """
+    Apply many task updates in a single transaction. The tasks and every project, account and parent
+    task they now reference are loaded or checked with one IN query per table.
+
+    :return: The updated tasks in request order, and the IDs of the tasks whose name or description changed.
+    :raises ValueError: If a task or reference is malformed or does not exist.
+    """
+    if len(requests) > BULK.MAX_TASKS:
+        raise ValueError(f"At most {BULK.MAX_TASKS} tasks can be updated at once")
+
+    updates = [(uuid.UUID(request.id), parse_task_update(request)) for request in requests]
+    task_ids = {task_id for task_id, _ in updates}
+
+    tasks = {}
+    for chunk in _chunks(list(task_ids)):
+        tasks.update((task.id, task) for task in db.query(Task).filter(Task.id.in_(chunk)))
+    missing = task_ids - tasks.keys()
+    if missing:
+        raise ValueError(f"Task not found: {next(iter(missing))}")
+
+    _check_references(
+        project_ids={data["project_id"] for _, data in updates if data.get("project_id")},
+        account_ids={data["assigned_to"] for _, data in updates if data.get("assigned_to")},
+        parent_task_ids={data["parent_task_id"] for _, data in updates if data.get("parent_task_id")},
+        db=db,
+    )
+
+    progress = snapshot_progress(
+        task_ids | {data.get("parent_task_id") for _, data in updates}, db
+    )
+    redescribed = set()
+    for task_id, update_data in updates:
+        if changes_detection_fields(tasks[task_id], update_data):
+            redescribed.add(task_id)
+        for key, value in update_data.items():
+            setattr(tasks[task_id], key, value)
+
+    apply_progress_delta(progress, task_ids, db)
+    db.commit()
+
+    return [tasks[task_id] for task_id, _ in updates], redescribed
@@ -1,4 +1,5 @@
-from .password_utils import hash_password, verify_password
+from .password_utils import hash_password, verify_password, needs_rehash
 from .time_utils import display_current_day_time
+from .logging_utils import configure_logging, shutdown_logging, logging_stats
 
-__all__ = ["hash_password", "verify_password", "display_current_day_time", "create_password"]
\ No newline at end of file
+__all__ = ["hash_password", "verify_password", "needs_rehash", "display_current_day_time", "configure_logging", "shutdown_logging", "logging_stats", "create_password"]
\ No newline at end of file
@@ -0,0 +1,113 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from constants import LOGGING
+
+# Attributes every LogRecord has; anything else on a record was passed with extra= and is written as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_lock = threading.Lock()
+_listener = None
+_handler = None
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line, with the fields passed through extra= alongside the message."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES
+        )
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on a bounded queue for a background thread to write, so logging never waits on stdout.
+    When the writer falls behind and the queue is full, records are dropped and counted instead of blocking the caller.
+
+    Attributes:
+        dropped (int): Records dropped because the queue was full.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments into the message now, since they may change before the writer gets to them,
+        # but keep the traceback apart from the message so the JSON output can give it a field of its own
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging():
+    """
+    Route every logger through a DroppingQueueHandler whose records are written to stderr by a QueueListener thread,
+    as JSON lines or as text depending on LOGGING.FORMAT. The root level is LOGGING.LEVEL, and LOGGING.MODULE_LEVELS
+    overrides it per logger name, e.g. {"backend_logic": "DEBUG"}. Calling this again does nothing.
+
+    Records below a logger's level are discarded before their message is formatted, so disabled logging costs one level check.
+    """
+    global _listener, _handler
+    with _lock:
+        if _listener is not None:
+            return
+
+        stream = logging.StreamHandler(sys.stderr)
+        if LOGGING.FORMAT == "json":
+            stream.setFormatter(JSONFormatter())
+        else:
+            stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+        _handler = DroppingQueueHandler(queue.Queue(LOGGING.QUEUE_SIZE))
+        root = logging.getLogger()
+        root.handlers = [_handler]
+        root.setLevel(LOGGING.LEVEL)
+        for name, level in LOGGING.MODULE_LEVELS.items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = logging.handlers.QueueListener(_handler.queue, stream, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Write out the records still queued and stop the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def logging_stats() -> dict:
+    return {
+        "queued": _handler.queue.qsize() if _handler else 0,
+        "dropped": _handler.dropped if _handler else 0,
+    }
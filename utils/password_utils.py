@@ -1,6 +1,22 @@
 from passlib.context import CryptContext
+from constants import PASSWORDS
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def build_context(scheme: str = PASSWORDS.SCHEME, rounds: int = PASSWORDS.ROUNDS) -> CryptContext:
+    """
+    Build the password hashing policy: new hashes use scheme with rounds, PASSWORDS.LEGACY_SCHEMES still verify,
+    and hashes of a legacy scheme or with any other number of rounds need an update.
+    """
+    schemes = [scheme] + [legacy for legacy in PASSWORDS.LEGACY_SCHEMES if legacy != scheme]
+    settings = {}
+    if rounds is not None:
+        settings[f"{scheme}__default_rounds"] = rounds
+        settings[f"{scheme}__min_rounds"] = rounds
+        settings[f"{scheme}__max_rounds"] = rounds
+    return CryptContext(schemes=schemes, deprecated="auto", **settings)
+
+
+pwd_context = build_context()
 
 
 def hash_password(password: str) -> str:
@@ -14,5 +30,12 @@ def verify_password(plain_password: str, hashed_password: str) -> str:
     password_is_good = pwd_context.verify(plain_password, hashed_password)
     if not password_is_good:
         raise ValueError("Password is incorrect")
-    
+
     return plain_password
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """
+    Whether a stored hash falls short of the current policy, by scheme or by rounds. This only parses the hash, it does not hash anything.
+    """
+    return pwd_context.needs_update(hashed_password)